@@ -0,0 +1,124 @@
+"""Synthetic payloads of realistic size for the benchmarks.
+
+Run the benchmarks with pytest-benchmark:
+
+    $ python -m pytest benchmarks
+
+The objects are generated by `xero.fake.FakeXero`, so they have the shape
+(and the date formats) of real Xero responses.
+"""
+
+import datetime
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from xero.fake import FakeXero, xero_date
+from xero.manager import Manager
+
+
+@pytest.fixture(scope="session")
+def fake():
+    return FakeXero(contacts=200, invoices=1000, journals=0)
+
+
+@pytest.fixture
+def credentials():
+    return Mock(base_url="https://api.xero.com", user_agent=None, tenant_id=None)
+
+
+@pytest.fixture
+def invoices(credentials):
+    return Manager("Invoices", credentials)
+
+
+@pytest.fixture(scope="session")
+def invoice_page(fake):
+    """The JSON text of a page of 1000 invoices."""
+    return json.dumps(
+        {
+            "Id": "2b7a1b5c-4c1c-4e0b-9a59-5f6c8a8c2b1e",
+            "Status": "OK",
+            "ProviderName": "pyxero",
+            "DateTimeUTC": xero_date(datetime.datetime(2024, 1, 1)),
+            "Invoices": fake.objects("Invoices"),
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def date_strings(fake):
+    """Every string value in a page of 1000 invoices, dates and otherwise."""
+    strings = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            for item in value.values():
+                collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+        elif isinstance(value, str):
+            strings.append(value)
+
+    collect(fake.objects("Invoices"))
+    return strings
+
+
+@pytest.fixture(scope="session")
+def invoice_batch(fake):
+    """A batch of 50 new invoices, as they would be passed to `save()`."""
+    batch = []
+    for invoice in fake.objects("Invoices")[:50]:
+        batch.append(
+            {
+                "Type": invoice["Type"],
+                "Contact": {"ContactID": invoice["Contact"]["ContactID"]},
+                "Date": datetime.date(2024, 1, 1),
+                "DueDate": datetime.date(2024, 1, 31),
+                "Reference": invoice["Reference"],
+                "LineAmountTypes": "Exclusive",
+                "Status": "DRAFT",
+                "LineItems": [
+                    {
+                        "Description": item["Description"],
+                        "Quantity": item["Quantity"],
+                        "UnitAmount": item["UnitAmount"],
+                        "AccountCode": item["AccountCode"],
+                        "TaxType": item["TaxType"],
+                        "Tracking": [{"Name": "Region", "Option": "North"}],
+                    }
+                    for item in invoice["LineItems"]
+                ],
+            }
+        )
+    return batch
+
+
+@pytest.fixture(scope="session")
+def validation_errors():
+    """A 400 response reporting validation errors for 50 invoices."""
+    text = json.dumps(
+        {
+            "ErrorNumber": 10,
+            "Type": "ValidationException",
+            "Message": "A validation exception occurred",
+            "Elements": [
+                {
+                    "InvoiceNumber": f"INV-{i:05}",
+                    "ValidationErrors": [
+                        {"Message": f"Account code '{code}' is not a valid code."}
+                        for code in range(10)
+                    ],
+                }
+                for i in range(50)
+            ],
+        }
+    )
+    return Mock(
+        status_code=400,
+        headers={"content-type": "application/json; charset=utf-8"},
+        text=text,
+        encoding="utf-8",
+    )
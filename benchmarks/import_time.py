@@ -0,0 +1,71 @@
+"""Measure how long `import xero` takes in a fresh interpreter.
+
+Usage:
+
+    python benchmarks/import_time.py [--runs N]
+
+Each run starts a new interpreter, so the measurement includes loading (but
+not compiling) every module that `import xero` pulls in. The median and best
+times are reported, along with any of the optional heavy modules that were
+imported as a side effect.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that are only needed for OAuth1, the PKCE callback server, XML
+# payloads, or error handling; a plain `import xero` shouldn't load them.
+DEFERRED = [
+    "requests_oauthlib",
+    "oauthlib",
+    "http.server",
+    "webbrowser",
+    "xml.dom.minidom",
+    "xml.etree.ElementTree",
+]
+
+SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import xero
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [name for name in {DEFERRED!r} if name in sys.modules],
+}}))
+"""
+
+
+def measure(runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        results.append(json.loads(output))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    # Make sure bytecode has been compiled before the first measurement.
+    measure(1)
+    results = measure(args.runs)
+    timings = [result["elapsed"] * 1000 for result in results]
+
+    print(f"import xero: median {statistics.median(timings):.1f} ms, ", end="")
+    print(f"best {min(timings):.1f} ms ({args.runs} runs)")
+    print(f"deferred modules loaded: {', '.join(results[0]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import json
+
+from xero import utils
+
+
+def test_json_load_object_hook(benchmark, invoice_page):
+    data = benchmark(json.loads, invoice_page, object_hook=utils.json_load_object_hook)
+
+    assert len(data["Invoices"]) == 1000
+
+
+def test_interning_object_hook(benchmark, invoice_page):
+    object_hook = utils.make_object_hook()
+    data = benchmark(json.loads, invoice_page, object_hook=object_hook)
+
+    assert len(data["Invoices"]) == 1000
+
+
+def test_parse_date_cold(benchmark, date_strings):
+    """Every string is parsed with an empty date cache."""
+
+    def run():
+        utils._parse_date.cache_clear()
+        for string in date_strings:
+            utils.parse_date(string)
+
+    benchmark(run)
+
+
+def test_parse_date_warm(benchmark, date_strings):
+    """Every string is parsed, with the dates already cached."""
+
+    def run():
+        for string in date_strings:
+            utils.parse_date(string)
+
+    run()
+    benchmark(run)
@@ -0,0 +1,118 @@
+"""Compare `parse_date` with the implementation it replaced.
+
+    $ python -m pytest benchmarks/test_parse_date.py
+
+Each group times the previous implementation (kept here) next to the current
+one, on the same strings, so the speedup can be reproduced.
+"""
+
+import datetime
+import random
+import re
+import sys
+
+import pytest
+
+from xero import utils
+
+DATE = re.compile(
+    r"^(\/Date\((?P<timestamp>-?\d+)((?P<offset_h>[-+]\d\d)(?P<offset_m>\d\d))?\)\/)"
+    r"|"
+    r"((?P<year>\d{4})-(?P<month>[0-2]\d)-0?(?P<day>[0-3]\d)"
+    r"T"
+    r"(?P<hour>[0-5]\d):(?P<minute>[0-5]\d):(?P<second>[0-6]\d))$"
+)
+
+
+def previous_parse_date(string, force_datetime=False):
+    """`xero.utils.parse_date` before it was rewritten."""
+    matches = DATE.match(string)
+    if not matches:
+        return None
+
+    values = {
+        k: v if v[0] in "+-" else int(v)
+        for k, v in matches.groupdict().items()
+        if v and int(v)
+    }
+
+    if "timestamp" in values:
+        if sys.version_info < (3, 11):
+            value = datetime.datetime.utcfromtimestamp(0) + datetime.timedelta(
+                hours=int(values.get("offset_h", 0)),
+                minutes=int(values.get("offset_m", 0)),
+                seconds=int(values["timestamp"]) / 1000.0,
+            )
+        else:
+            value = datetime.datetime.fromtimestamp(
+                0, datetime.UTC
+            ) + datetime.timedelta(
+                hours=int(values.get("offset_h", 0)),
+                minutes=int(values.get("offset_m", 0)),
+                seconds=int(values["timestamp"]) / 1000.0,
+            )
+        return value
+
+    if len(values) > 3 or force_datetime:
+        return datetime.datetime(**values)
+
+    if not values:
+        return None
+
+    return datetime.date(**values)
+
+
+IMPLEMENTATIONS = {
+    "previous": previous_parse_date,
+    "current": utils.parse_date,
+}
+
+
+@pytest.fixture(scope="session")
+def distinct_dates():
+    """10,000 different dates, in both of Xero's formats."""
+    rng = random.Random(0)
+    start = datetime.datetime(2000, 1, 1)
+    strings = []
+    for i in range(10000):
+        value = start + datetime.timedelta(seconds=rng.randrange(30 * 365 * 86400))
+        if i % 2:
+            strings.append(value.strftime("%Y-%m-%dT%H:%M:%S"))
+        else:
+            ms = int((value - datetime.datetime(1970, 1, 1)).total_seconds()) * 1000
+            strings.append(f"/Date({ms}+0000)/")
+    return strings
+
+
+def test_same_results(date_strings, distinct_dates):
+    """The implementations agree, so the timings compare like with like."""
+    for string in date_strings + distinct_dates:
+        assert utils.parse_date(string) == previous_parse_date(string), string
+
+
+@pytest.mark.benchmark(group="parse_date: a page of invoices")
+@pytest.mark.parametrize("implementation", ["previous", "current"])
+def test_page(benchmark, date_strings, implementation):
+    """Every string value in a page of invoices, where dates repeat."""
+    parse = IMPLEMENTATIONS[implementation]
+
+    def run():
+        for string in date_strings:
+            parse(string)
+
+    benchmark(run)
+
+
+@pytest.mark.benchmark(group="parse_date: distinct dates")
+@pytest.mark.parametrize("implementation", ["previous", "current"])
+def test_distinct(benchmark, distinct_dates, implementation):
+    """Dates that are all different, with an empty cache for the current
+    implementation."""
+    parse = IMPLEMENTATIONS[implementation]
+
+    def run():
+        utils._parse_date.cache_clear()
+        for string in distinct_dates:
+            parse(string)
+
+    benchmark(run)
@@ -0,0 +1,41 @@
+import datetime
+
+from xero import Xero
+from xero.exceptions import XeroBadRequest
+
+
+def test_filter(benchmark, invoices):
+    """Build the query for a filter with many conditions."""
+    kwargs = {
+        "Status": "AUTHORISED",
+        "Type": "ACCREC",
+        "Contact_ContactID": "b2c5a1f0-2d3e-4f5a-8b9c-0d1e2f3a4b5c",
+        "Reference__contains": "Ref",
+        "InvoiceNumber__startswith": "INV",
+        "AmountDue__gt": 100,
+        "Total__lte": 10000,
+        "Date__gte": datetime.date(2024, 1, 1),
+        "DueDate__lt": datetime.date(2024, 12, 31),
+        "HasAttachments": False,
+        "since": datetime.datetime(2024, 1, 1),
+        "order": "Date DESC",
+        "page": 2,
+    }
+
+    uri, params, *_ = benchmark(lambda: invoices._filter(**kwargs))
+
+    assert "where" in params
+
+
+def test_xero_construction(benchmark, credentials):
+    benchmark(Xero, credentials)
+
+
+def test_first_manager_access(benchmark, credentials):
+    benchmark(lambda: Xero(credentials).invoices)
+
+
+def test_bad_request_parsing(benchmark, validation_errors):
+    exception = benchmark(XeroBadRequest, validation_errors)
+
+    assert len(exception.errors) == 500
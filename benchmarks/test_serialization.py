@@ -0,0 +1,14 @@
+def test_dict_to_xml(benchmark, invoices, invoice_batch):
+    from xml.etree.ElementTree import Element
+
+    def run():
+        for invoice in invoice_batch:
+            invoices.dict_to_xml(Element("Invoice"), invoice)
+
+    benchmark(run)
+
+
+def test_prepare_data_for_save(benchmark, invoices, invoice_batch):
+    body = benchmark(invoices._prepare_data_for_save, invoice_batch)
+
+    assert body.count(b"<Invoice>") == 50
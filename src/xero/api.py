@@ -1,11 +1,93 @@
+from functools import cached_property
+
+from .budget import budget
+from .deadline import deadline
 from .filesmanager import FilesManager
 from .manager import Manager
 from .paymentmanager import PaymentManager
 from .payrollmanager import PayrollManager
+from .pipeline import Pipeline
 from .projectmanager import ProjectManager
 
 
-class Xero:
+class API:
+    """Base class for the ORM-like API interfaces.
+
+    For each of the objects in OBJECT_LIST, the API has an attribute that is
+    the lowercase name of the object, holding a manager to operate on it.
+    Managers are created on first access, so constructing an API is cheap.
+    """
+
+    OBJECT_LIST = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._object_names = {name.lower(): name for name in cls.OBJECT_LIST}
+
+    def __getattr__(self, attr):
+        # Only called if the manager hasn't been created yet.
+        try:
+            name = self._object_names[attr]
+        except KeyError:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {attr!r}"
+            ) from None
+
+        manager = self._manager(name)
+        setattr(self, attr, manager)
+        return manager
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self._object_names))
+
+    def _manager(self, name):
+        raise NotImplementedError()
+
+    @property
+    def tenant_id(self):
+        """The ID of the tenant that calls are made for, if the credentials
+        have one."""
+        return getattr(self._credentials, "tenant_id", None)
+
+    @property
+    def rate_limits(self):
+        """The `xero.ratelimit.RateLimitState` last reported for each tenant,
+        by any API sharing this API's pipeline."""
+        return self._pipeline.rate_limits
+
+    def budget(self, max_calls, tenant=None):
+        """Limit the calls made in a `with` block to `max_calls`, for the
+        tenant with the ID `tenant` (or for every tenant); see
+        `xero.budget`."""
+        return budget(max_calls, tenant)
+
+    def deadline(self, seconds):
+        """Require the calls made in a `with` block to finish within `seconds`;
+        see `xero.deadline`."""
+        return deadline(seconds)
+
+    def on_request(self, callback):
+        """Call `callback` with a `xero.pipeline.Event` before each request is
+        sent, including retries."""
+        return self._pipeline.on("request", callback)
+
+    def on_response(self, callback):
+        """Call `callback` with a `xero.pipeline.Event` after each successful
+        call."""
+        return self._pipeline.on("response", callback)
+
+    def on_error(self, callback):
+        """Call `callback` with a `xero.pipeline.Event` after each failed call;
+        the exception is the event's `error`."""
+        return self._pipeline.on("error", callback)
+
+    def on_retry(self, callback):
+        """Call `callback` with a `xero.pipeline.Event` before a request is
+        retried."""
+        return self._pipeline.on("retry", callback)
+
+
+class Xero(API):
     """An ORM-like interface to the Xero API."""
 
     OBJECT_LIST = (
@@ -40,29 +122,84 @@ class Xero:
         "Quotes",
     )
 
-    def __init__(self, credentials, unit_price_4dps=False, user_agent=None):
-        # Iterate through the list of objects we support, for
-        # each of them create an attribute on our self that is
-        # the lowercase name of the object and attach it to an
-        # instance of a Manager object to operate on it
-        for name in self.OBJECT_LIST:
-            manager_class = Manager
+    def __init__(
+        self,
+        credentials,
+        unit_price_4dps=False,
+        user_agent=None,
+        *,
+        retain_responses=True,
+        intern_fields=None,
+        pipeline=None,
+        transport=None,
+        record_timings=False,
+        auto_idempotency=False,
+        outbox=None,
+    ):
+        if pipeline is None:
+            pipeline = Pipeline(transport=transport)
+        elif transport is not None:
+            raise ValueError("Provide the transport to the pipeline, not to Xero.")
+
+        self._credentials = credentials
+        self._unit_price_4dps = unit_price_4dps
+        self._user_agent = user_agent
+        # Every manager shares a pipeline, so that (for example) rate limits
+        # and hooks apply across all of the APIs.
+        self._pipeline = pipeline
+        self._options = {
+            "retain_responses": retain_responses,
+            "intern_fields": intern_fields,
+            "pipeline": pipeline,
+            "record_timings": record_timings,
+            "auto_idempotency": auto_idempotency,
+        }
+        self._outbox_path = outbox
+
+    def _manager(self, name):
+        manager_class = Manager
+
+        if name == "Payments":
+            manager_class = PaymentManager
 
-            if name == "Payments":
-                manager_class = PaymentManager
+        return manager_class(
+            name,
+            self._credentials,
+            self._unit_price_4dps,
+            self._user_agent,
+            **self._options,
+        )
 
-            setattr(
-                self,
-                name.lower(),
-                manager_class(name, credentials, unit_price_4dps, user_agent),
-            )
+    @cached_property
+    def outbox(self):
+        """An `xero.outbox.Outbox` of writes for this tenant, stored in the
+        SQLite database at the `outbox` path given to `Xero`."""
+        if self._outbox_path is None:
+            raise ValueError("Give Xero an outbox path to queue writes in.")
+        # Imported here, as most users don't need an outbox.
+        from .outbox import Outbox
 
-        self.filesAPI = Files(credentials)
-        self.payrollAPI = Payroll(credentials, unit_price_4dps, user_agent)
-        self.projectsAPI = Project(credentials)
+        return Outbox(self, self._outbox_path)
 
+    @cached_property
+    def filesAPI(self):
+        return Files(self._credentials, pipeline=self._pipeline)
 
-class Files:
+    @cached_property
+    def payrollAPI(self):
+        return Payroll(
+            self._credentials,
+            self._unit_price_4dps,
+            self._user_agent,
+            **self._options,
+        )
+
+    @cached_property
+    def projectsAPI(self):
+        return Project(self._credentials, pipeline=self._pipeline)
+
+
+class Files(API):
     """An ORM-like interface to the Xero Files API."""
 
     OBJECT_LIST = (
@@ -72,16 +209,15 @@ class Files:
         "Inbox",
     )
 
-    def __init__(self, credentials):
-        # Iterate through the list of objects we support, for
-        # each of them create an attribute on our self that is
-        # the lowercase name of the object and attach it to an
-        # instance of a Manager object to operate on it
-        for name in self.OBJECT_LIST:
-            setattr(self, name.lower(), FilesManager(name, credentials))
+    def __init__(self, credentials, *, pipeline=None):
+        self._credentials = credentials
+        self._pipeline = Pipeline() if pipeline is None else pipeline
 
+    def _manager(self, name):
+        return FilesManager(name, self._credentials, pipeline=self._pipeline)
 
-class Payroll:
+
+class Payroll(API):
     """An ORM-like interface to the Xero Payroll API."""
 
     OBJECT_LIST = (
@@ -95,16 +231,41 @@ class Payroll:
         "LeaveApplications",
     )
 
-    def __init__(self, credentials, unit_price_4dps=False, user_agent=None):
-        for name in self.OBJECT_LIST:
-            setattr(
-                self,
-                name.lower(),
-                PayrollManager(name, credentials, unit_price_4dps, user_agent),
-            )
+    def __init__(
+        self,
+        credentials,
+        unit_price_4dps=False,
+        user_agent=None,
+        *,
+        retain_responses=True,
+        intern_fields=None,
+        pipeline=None,
+        record_timings=False,
+        auto_idempotency=False,
+    ):
+        self._credentials = credentials
+        self._unit_price_4dps = unit_price_4dps
+        self._user_agent = user_agent
+        self._pipeline = Pipeline() if pipeline is None else pipeline
+        self._options = {
+            "retain_responses": retain_responses,
+            "intern_fields": intern_fields,
+            "pipeline": self._pipeline,
+            "record_timings": record_timings,
+            "auto_idempotency": auto_idempotency,
+        }
+
+    def _manager(self, name):
+        return PayrollManager(
+            name,
+            self._credentials,
+            self._unit_price_4dps,
+            self._user_agent,
+            **self._options,
+        )
 
 
-class Project:
+class Project(API):
     """An ORM-like interface to the Xero Projects API."""
 
     OBJECT_LIST = (
@@ -114,10 +275,9 @@ class Project:
         "Time",
     )
 
-    def __init__(self, credentials):
-        # Iterate through the list of objects we support, for
-        # each of them create an attribute on our self that is
-        # the lowercase name of the object and attach it to an
-        # instance of a Manager object to operate on it
-        for name in self.OBJECT_LIST:
-            setattr(self, name.lower(), ProjectManager(name, credentials))
+    def __init__(self, credentials, *, pipeline=None):
+        self._credentials = credentials
+        self._pipeline = Pipeline() if pipeline is None else pipeline
+
+    def _manager(self, name):
+        return ProjectManager(name, self._credentials, pipeline=self._pipeline)
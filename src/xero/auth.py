@@ -1,17 +1,9 @@
-import base64
 import datetime
-import hashlib
-import http.server
-import secrets
 import sys
-import threading
-import webbrowser
 from functools import partial
-from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.parse import parse_qs, urlencode
 
 import requests
-from oauthlib.oauth1 import SIGNATURE_HMAC, SIGNATURE_RSA, SIGNATURE_TYPE_AUTH_HEADER
-from requests_oauthlib import OAuth1, OAuth2, OAuth2Session
 
 from .constants import (
     ACCESS_TOKEN_URL,
@@ -79,6 +71,9 @@ class PrivateCredentials:
         # Private API uses consumer key as the OAuth token.
         self.oauth_token = consumer_key
 
+        from oauthlib.oauth1 import SIGNATURE_RSA, SIGNATURE_TYPE_AUTH_HEADER
+        from requests_oauthlib import OAuth1
+
         self.oauth = OAuth1(
             self.consumer_key,
             resource_owner_key=self.oauth_token,
@@ -154,7 +149,7 @@ class PublicCredentials:
         self.user_agent = resolve_user_agent(user_agent)
 
         self.base_url = api_url
-        self._signature_method = SIGNATURE_HMAC
+        self._signature_method = "HMAC-SHA1"  # oauthlib.oauth1.SIGNATURE_HMAC
 
         # These are not strictly used by Public Credentials, but
         # are reserved for use by other credentials (i.e. Partner)
@@ -181,6 +176,8 @@ class PublicCredentials:
         else:
             # This is a brand new set of credentials - we need to generate
             # an oauth token so it's available for the url property.
+            from requests_oauthlib import OAuth1
+
             oauth = OAuth1(
                 self.consumer_key,
                 client_secret=self.consumer_secret,
@@ -199,6 +196,8 @@ class PublicCredentials:
         self.oauth_token = oauth_token
         self.oauth_token_secret = oauth_token_secret
 
+        from requests_oauthlib import OAuth1
+
         self._oauth = OAuth1(
             self.consumer_key,
             client_secret=self.consumer_secret,
@@ -298,6 +297,8 @@ class PublicCredentials:
     def verify(self, verifier):
         "Verify an OAuth token"
 
+        from requests_oauthlib import OAuth1
+
         # Construct the credentials for the verification request
         oauth = OAuth1(
             self.consumer_key,
@@ -410,7 +411,7 @@ class PartnerCredentials(PublicCredentials):
         self.scope = scope
         self.user_agent = resolve_user_agent(user_agent)
 
-        self._signature_method = SIGNATURE_RSA
+        self._signature_method = "RSA-SHA1"  # oauthlib.oauth1.SIGNATURE_RSA
         self.base_url = api_url
 
         self.rsa_key = rsa_key
@@ -421,6 +422,8 @@ class PartnerCredentials(PublicCredentials):
     def refresh(self):
         "Refresh an expired token"
 
+        from requests_oauthlib import OAuth1
+
         # Construct the credentials for the verification request
         oauth = OAuth1(
             self.consumer_key,
@@ -528,6 +531,8 @@ class OAuth2Credentials:
         """Set self._oauth for use by the xero client."""
         self.token = token
         if token:
+            from requests_oauthlib import OAuth2
+
             self._oauth = OAuth2(client_id=self.client_id, token=self.token)
 
     @property
@@ -551,6 +556,8 @@ class OAuth2Credentials:
 
     def verify(self, auth_secret):
         """Verify and return OAuth2 token."""
+        from requests_oauthlib import OAuth2Session
+
         session = OAuth2Session(
             self.client_id,
             state=self.auth_state,
@@ -581,6 +588,8 @@ class OAuth2Credentials:
         This will also set `self.auth_state` to a random string if it has not already
         been set.
         """
+        from requests_oauthlib import OAuth2Session
+
         session = OAuth2Session(
             self.client_id, scope=self.scope, redirect_uri=self.callback_uri
         )
@@ -647,6 +656,8 @@ class OAuth2Credentials:
                 None,
                 "Token cannot be refreshed, was `offline_access` included in scope?",
             )
+        from requests_oauthlib import OAuth2Session
+
         session = OAuth2Session(
             client_id=self.client_id, scope=self.scope, token=self.token
         )
@@ -722,52 +733,6 @@ class OAuth2Credentials:
             raise XeroExceptionUnknown(response)
 
 
-class PKCEAuthReceiver(http.server.BaseHTTPRequestHandler):
-    """This is an http request processor for server running on localhost, used by the
-    PKCE auth system. Xero will redirect the browser after auth, from which we can
-    collect the token Xero provides.
-
-    You can subclass this and override the `send_error_page` and `send_access_ok`
-    methods to customise the success and failure pages displayed in the browser.
-    """
-
-    def __init__(self, credmanager, *args, **kwargs):
-        self.credmanager = credmanager
-        super().__init__(*args, **kwargs)
-
-    @staticmethod
-    def close_server(s):
-        s.shutdown()
-
-    def do_GET(self, *args):
-        request = urlparse(self.path)
-        params = parse_qs(request.query)
-
-        if request.path == "/callback":
-            self.credmanager.verify_url(params, self)
-        else:
-            self.send_error_page("Unknown endpoint")
-
-    def send_error_page(self, error):
-        """Display an Error page.
-
-        Override this for a custom page.
-        """
-        print("Error:", error)
-
-    def send_access_ok(self):
-        """Display a success page" Override this to provide a custom page."""
-        print("LOGIN SUCCESS")
-        self.shutdown()
-
-    def shutdown(self):
-        """Start shutdowning our server and return immediately."""
-        # Launch a thread to close our socket cleanly.
-        threading.Thread(
-            target=self.__class__.close_server, args=(self.server,)
-        ).start()
-
-
 class OAuth2PKCECredentials(OAuth2Credentials):
     """An object wrapping the PKCE credential flow for Xero access.
 
@@ -828,8 +793,16 @@ class OAuth2PKCECredentials(OAuth2Credentials):
         self.port = kwargs.pop("port", 8080)
         # Xero requires between 43 and 128 bytes, it fails with invalid grant if
         # this is not long enough
-        self.verifier = kwargs.pop("verifier", secrets.token_urlsafe(64))
-        self.handler_kls = kwargs.pop("request_handler", PKCEAuthReceiver)
+        self.verifier = kwargs.pop("verifier", None)
+        if self.verifier is None:
+            import secrets
+
+            self.verifier = secrets.token_urlsafe(64)
+        self.handler_kls = kwargs.pop("request_handler", None)
+        if self.handler_kls is None:
+            from .pkce import PKCEAuthReceiver
+
+            self.handler_kls = PKCEAuthReceiver
         self.error = None
         if isinstance(self.verifier, str):
             self.verifier = self.verifier.encode("ascii")
@@ -839,6 +812,10 @@ class OAuth2PKCECredentials(OAuth2Credentials):
 
     def logon(self):
         """Launch PKCE auth process and wait for completion."""
+        import base64
+        import hashlib
+        import webbrowser
+
         challenge = str(
             base64.urlsafe_b64encode(hashlib.sha256(self.verifier).digest())[:-1],
             "ascii",
@@ -850,6 +827,8 @@ class OAuth2PKCECredentials(OAuth2Credentials):
         self.wait_for_callback()
 
     def wait_for_callback(self):
+        import http.server
+
         listen_to = ("", self.port)
         s = http.server.HTTPServer(listen_to, partial(self.handler_kls, self))
         s.serve_forever()
@@ -902,3 +881,12 @@ class OAuth2PKCECredentials(OAuth2Credentials):
         self.error = RuntimeError(msg)
         handler.send_error_page(msg)
         handler.shutdown()
+
+
+def __getattr__(name):
+    # The PKCE callback server is only imported if it is used.
+    if name == "PKCEAuthReceiver":
+        from .pkce import PKCEAuthReceiver
+
+        return PKCEAuthReceiver
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,32 +2,112 @@ from __future__ import annotations
 
 import io
 import json
+import time
 from datetime import date, datetime
+from functools import partial
 from typing import BinaryIO
-from urllib.parse import parse_qs
 from uuid import UUID
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.parsers.expat import ExpatError
-
-import requests
-
-from .auth import OAuth2Credentials
-from .exceptions import (
-    XeroBadRequest,
-    XeroExceptionUnknown,
-    XeroForbidden,
-    XeroInternalError,
-    XeroNotAvailable,
-    XeroNotFound,
-    XeroNotImplemented,
-    XeroRateLimitExceeded,
-    XeroTenantIdNotSet,
-    XeroUnauthorized,
+
+from .decoder import iter_array, project, projection
+from .pipeline import PRIORITIES, Request
+from .ratelimit import RateLimitState
+from .utils import (
+    INTERNED_FIELDS,
+    decorate_methods,
+    generate_idempotency_key,
+    isplural,
+    make_object_hook,
+    singular,
 )
-from .utils import isplural, json_load_object_hook, singular
 
 
-class XeroObjectList(list):
+class ResponseMetadata:
+    """A lightweight record of the metadata of an HTTP response.
+
+    Unlike the `requests.Response` it is built from, it doesn't retain the body
+    of the response, so it can be kept alongside parsed objects without keeping
+    a second copy of the data alive.
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.reason = getattr(response, "reason", None)
+        self.url = getattr(response, "url", None)
+        self.headers = response.headers
+        self.elapsed = getattr(response, "elapsed", None)
+
+        # Xero reports the remaining rate limit allowances in the headers
+        self.rate_limit = RateLimitState.from_headers(self.headers)
+        self.min_limit_remaining = self.rate_limit.minute_remaining
+        self.day_limit_remaining = self.rate_limit.day_remaining
+        self.app_min_limit_remaining = self.rate_limit.app_minute_remaining
+        self.retry_after = self.rate_limit.retry_after
+
+    def __repr__(self):
+        return f"<ResponseMetadata [{self.status_code}]>"
+
+
+class Timings:
+    """How long each phase of an API call took, in seconds.
+
+    * `serialize`: building the request, including any XML body;
+    * `queue`: waiting for a `RateLimit` to allow the request to be sent;
+    * `ttfb`: waiting for the response headers, from when the request was sent;
+    * `download`: receiving the response body;
+    * `decode`: parsing the JSON, excluding the object hook;
+    * `dates`: the object hook, which parses dates (and interns strings).
+
+    For a streamed response, the body is downloaded and decoded as the stream
+    is read, so `download`, `decode` and `dates` don't include that time.
+    """
+
+    PHASES = ("serialize", "queue", "ttfb", "download", "decode", "dates")
+
+    def __init__(self, **phases):
+        for phase in self.PHASES:
+            setattr(self, phase, phases.get(phase, 0.0))
+
+    def __repr__(self):
+        phases = ", ".join(f"{p}={getattr(self, p) * 1000:.1f}ms" for p in self.PHASES)
+        return f"<Timings {phases}>"
+
+    @classmethod
+    def from_request(cls, request):
+        timings = request.timings
+        dates = timings.get("dates", 0.0)
+        return cls(
+            serialize=timings.get("serialize", 0.0),
+            queue=timings.get("queue", 0.0),
+            ttfb=timings.get("ttfb", 0.0),
+            download=timings.get("download", 0.0),
+            decode=max(timings.get("decode", 0.0) - dates, 0.0),
+            dates=dates,
+        )
+
+    @property
+    def total(self):
+        return sum(getattr(self, phase) for phase in self.PHASES)
+
+    def as_dict(self):
+        return {phase: getattr(self, phase) for phase in self.PHASES}
+
+
+class Result:
+    """The metadata carried by every result: the originating HTTP response,
+    the `RateLimitState` it reported, and (if they were recorded) the
+    `Timings` of the call."""
+
+    response = None
+    timings = None
+
+    @property
+    def rate_limit(self):
+        if self.response is None:
+            return None
+        return RateLimitState.from_headers(self.response.headers)
+
+
+class XeroObjectList(Result, list):
     """A list subclass that also carries the originating HTTP response, so callers can
     reach response metadata (e.g. rate-limit headers)."""
 
@@ -36,6 +116,73 @@ class XeroObjectList(list):
         self.response = response
 
 
+class XeroObject(Result, dict):
+    """A dict subclass returned for a single object (or a response that isn't a
+    list of objects), carrying the originating HTTP response."""
+
+    def __init__(self, data=(), *, response=None):
+        super().__init__(data)
+        self.response = response
+
+
+class XeroContent(Result, bytes):
+    """A bytes subclass returned for binary content (e.g. a PDF). It carries
+    the metadata of the response, rather than the response, so the content
+    isn't kept alive twice."""
+
+    def __new__(cls, content=b"", *, response=None):
+        result = super().__new__(cls, content)
+        result.response = None if response is None else ResponseMetadata(response)
+        return result
+
+
+class XeroText(Result, str):
+    """A str subclass returned for a result that is a message (e.g. "Deleted"
+    by the Files and Projects APIs), carrying the metadata of the response."""
+
+    def __new__(cls, text="", *, response=None):
+        result = super().__new__(cls, text)
+        result.response = None if response is None else ResponseMetadata(response)
+        return result
+
+
+class XeroObjectStream(Result):
+    """An iterator over the objects in a streamed API response.
+
+    Objects are decoded as they are received, so the first object is available
+    before the full response has been downloaded. Like `XeroObjectList`, the
+    stream carries the originating HTTP response.
+    """
+
+    def __init__(self, objects, *, response=None):
+        self._objects = objects
+        self.response = response
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._objects)
+
+    def close(self):
+        """Stop reading the response, releasing the underlying connection."""
+        self._objects.close()
+
+
+def timed(function, request, phase):
+    """Wrap `function`, adding the time spent in it to a phase of `request`."""
+
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            request.add_timing(phase, time.perf_counter() - start)
+
+    return wrapper
+
+
+@decorate_methods
 class BaseManager:
     DECORATED_METHODS = (
         "get",
@@ -178,11 +325,24 @@ class BaseManager:
         "gte": ">=",
         "ne": "!=",
     }
+    # The hook used to decode the objects in a response
+    object_hook = staticmethod(make_object_hook(INTERNED_FIELDS))
+    # Should results hold on to the full HTTP response (including the body), or
+    # just the response metadata?
+    retain_responses = True
+    # Should results carry the Timings of the call?
+    record_timings = False
+    # Should writes without an idempotency key be given one?
+    auto_idempotency = False
+    # The size of the chunks read from a streamed response
+    STREAM_CHUNK_SIZE = 64 * 1024
 
     def __init__(self):
         pass
 
     def dict_to_xml(self, root_elm, data):
+        from xml.etree.ElementTree import SubElement
+
         for key in data.keys():
             # Xero will complain if we send back these fields.
             if key in self.NO_SEND_FIELDS:
@@ -234,6 +394,8 @@ class BaseManager:
         self,
         data: dict | list[dict] | tuple[dict],
     ) -> bytes:
+        from xml.etree.ElementTree import Element, SubElement, tostring
+
         if isinstance(data, list) or isinstance(data, tuple):
             root_elm = Element(self.name)
             for d in data:
@@ -245,8 +407,18 @@ class BaseManager:
         # In python3 this seems to return a bytestring
         return tostring(root_elm)
 
-    def _parse_api_response(self, response, resource_name):
-        data = json.loads(response.text, object_hook=json_load_object_hook)
+    def _parse_api_response(
+        self, response, resource_name, fields=None, object_hook=None
+    ):
+        object_hook = object_hook or self.object_hook
+        if fields is None:
+            data = json.loads(response.text, object_hook=object_hook)
+        else:
+            data = project(
+                response.text,
+                projection(["Status"] + [f"{resource_name}.{f}" for f in fields]),
+                object_hook=object_hook,
+            )
         assert data["Status"] == "OK", (
             f"Expected the API to say OK but received {data['Status']}"
         )
@@ -256,9 +428,45 @@ class BaseManager:
         except KeyError:
             pass
 
+        if not self.retain_responses:
+            response = ResponseMetadata(response)
         if isinstance(data, list):
             return XeroObjectList(data, response=response)
-        return data
+        return XeroObject(data, response=response)
+
+    def _stream_api_response(
+        self, response, resource_name, fields=None, object_hook=None
+    ):
+        def objects():
+            try:
+                yield from iter_array(
+                    response.iter_content(self.STREAM_CHUNK_SIZE),
+                    resource_name,
+                    encoding=response.encoding,
+                    object_hook=object_hook or self.object_hook,
+                    fields=fields,
+                )
+            finally:
+                response.close()
+
+        return XeroObjectStream(objects(), response=response)
+
+    def _decode_response(self, response, stream=False, fields=None, request=None):
+        # If we haven't got XML or JSON, assume we're being returned a
+        # binary file
+        if response.status_code == 204 or not response.headers[
+            "content-type"
+        ].startswith("application/json"):
+            return XeroContent(response.content, response=response)
+
+        # If recording timings, time the object hook separately
+        object_hook = None
+        if request is not None:
+            object_hook = timed(self.object_hook, request, "dates")
+
+        if stream:
+            return self._stream_api_response(response, self.name, fields, object_hook)
+        return self._parse_api_response(response, self.name, fields, object_hook)
 
     def _get_data(self, func):
         """This is the decorator for our DECORATED_METHODS.
@@ -269,7 +477,19 @@ class BaseManager:
 
         def wrapper(*args, **kwargs):
             timeout = kwargs.pop("timeout", None)
-
+            # If streaming, objects are decoded and returned one at a time as
+            # the response is received, rather than after the full response
+            # has been downloaded.
+            stream = kwargs.pop("stream", False)
+            # Only the listed fields (e.g., "InvoiceID" or "Contact.ContactID")
+            # of each object will be decoded; everything else is discarded.
+            fields = kwargs.pop("fields", None)
+            # Queued requests (e.g., in a Scheduler) are sent in priority order
+            priority = kwargs.pop("priority", "default")
+            if priority not in PRIORITIES:
+                raise ValueError(f"Priority must be one of {PRIORITIES}.")
+
+            start = time.perf_counter()
             uri, params, method, body, headers, singleobject = func(*args, **kwargs)
 
             if headers is None:
@@ -280,6 +500,15 @@ class BaseManager:
             if "Content-Type" not in headers:
                 headers["Content-Type"] = "application/xml"
 
+            # Give each write its own key, so it can be retried (with the same
+            # key) without the risk of Xero applying it twice.
+            if (
+                self.auto_idempotency
+                and method in ("post", "put", "patch")
+                and "Idempotency-Key" not in headers
+            ):
+                headers["Idempotency-Key"] = generate_idempotency_key()
+
             # Validate any idempotency key provided by the wrapped function
             # Xero docs suggest a max of 128 chars, but also kill an empty string
             # if that was somehow provided. Additionally, force the user to
@@ -294,12 +523,6 @@ class BaseManager:
                         "1 and 128 characters long."
                     )
 
-            if isinstance(self.credentials, OAuth2Credentials):
-                if self.credentials.tenant_id:
-                    headers["Xero-tenant-id"] = self.credentials.tenant_id
-                else:
-                    raise XeroTenantIdNotSet
-
             # Use the JSON API by default, but remember we might request a PDF
             # (application/pdf) so don't force the Accept header.
             if "Accept" not in headers:
@@ -308,73 +531,31 @@ class BaseManager:
             # Set a user-agent so Xero knows the traffic is coming from pyxero
             # or individual user/partner
             headers["User-Agent"] = self.user_agent
+            serialized = time.perf_counter()
 
-            response = getattr(requests, method)(
+            request = Request(
+                method,
                 uri,
-                data=body,
-                headers=headers,
-                auth=self.credentials.oauth,
                 params=params,
+                body=body,
+                headers=headers,
                 timeout=timeout,
+                stream=stream,
+                credentials=self.credentials,
+                decoder=partial(self._decode_response, stream=stream, fields=fields),
+                resource=self.name,
+                operation=func.__name__[1:],
+                priority=priority,
             )
+            request.add_timing("serialize", serialized - start)
+            if not self.record_timings:
+                return self.pipeline(request)
 
-            if response.status_code == 200:
-                # If we haven't got XML or JSON, assume we're being returned a
-                # binary file
-                if not response.headers["content-type"].startswith("application/json"):
-                    return response.content
-
-                return self._parse_api_response(response, self.name)
-
-            elif response.status_code == 204:
-                return response.content
-
-            elif response.status_code == 400:
-                try:
-                    raise XeroBadRequest(response)
-                except (ValueError, ExpatError) as e:
-                    raise XeroExceptionUnknown(
-                        response, msg="Unable to parse Xero API response"
-                    ) from e
-
-            elif response.status_code == 401:
-                raise XeroUnauthorized(response)
-
-            elif response.status_code == 403:
-                raise XeroForbidden(response)
-
-            elif response.status_code == 404:
-                raise XeroNotFound(response)
-
-            elif response.status_code == 429:
-                limit_reason = response.headers.get("X-Rate-Limit-Problem") or "unknown"
-                payload = {
-                    "oauth_problem": ["rate limit exceeded: " + limit_reason],
-                    "oauth_problem_advice": [
-                        "please wait before retrying the xero api, "
-                        "the limit exceeded is: " + limit_reason
-                    ],
-                }
-                raise XeroRateLimitExceeded(response, payload)
-
-            elif response.status_code == 500:
-                raise XeroInternalError(response)
-
-            elif response.status_code == 501:
-                raise XeroNotImplemented(response)
-
-            elif response.status_code == 503:
-                # Two 503 responses are possible. Rate limit errors
-                # return encoded content; offline errors don't.
-                # If you parse the response text and there's nothing
-                # encoded, it must be a not-available error.
-                payload = parse_qs(response.text)
-                if payload:
-                    raise XeroRateLimitExceeded(response, payload)
-                else:
-                    raise XeroNotAvailable(response)
-            else:
-                raise XeroExceptionUnknown(response)
+            request.decoder = partial(request.decoder, request=request)
+            result = self.pipeline(request)
+            if isinstance(result, Result):
+                result.timings = Timings.from_request(request)
+            return result
 
         return wrapper
 
@@ -419,7 +600,9 @@ class BaseManager:
         uri = "/".join([self.base_url, self.name, "Actions"])
         return uri, {}, "get", None, None, False
 
-    def _put_allocation(self, id, data):
+    def _put_allocation(self, id, data, *, idempotency_key: str | None = None):
+        from xml.etree.ElementTree import Element, tostring
+
         uri = "/".join([self.base_url, self.name, id, "Allocations"])
         root_elm = Element("Allocation")
         if "Amount" in data:
@@ -427,7 +610,8 @@ class BaseManager:
             del data["Amount"]
         self.dict_to_xml(root_elm, data)
         body = tostring(root_elm)
-        return uri, {}, "put", body, None, False
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        return uri, {}, "put", body, headers, False
 
     def _delete_allocation(self, cn_id, allocation_id):
         uri = "/".join([self.base_url, self.name, cn_id, "Allocations", allocation_id])
@@ -510,6 +694,8 @@ class BaseManager:
         idempotency_key: str | None = None,
     ):
         """Add a history note to the Xero object."""
+        from xml.etree.ElementTree import Element, tostring
+
         if not isinstance(details, str):
             raise TypeError("details must be a string")
         if len(details) > 2500:
@@ -0,0 +1,7 @@
+"""Load testing tools for pyxero.
+
+    $ python -m xero.bench serve    # Serve a simulated Xero over HTTP
+    $ python -m xero.bench load     # Drive workloads against a simulator
+
+See `python -m xero.bench load --help` for the available workloads.
+"""
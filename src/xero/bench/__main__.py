@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from ..fake import FakeXero
+from . import load
+from .simulator import Simulator
+
+
+def serve(args):
+    fake = FakeXero(
+        args.contacts,
+        args.invoices,
+        args.journals,
+        latency=args.latency,
+        jitter=args.jitter,
+        seed=args.seed,
+        rate_limits=not args.no_rate_limits,
+    )
+    fake.MINUTE_LIMIT = args.minute_limit
+    fake.CONCURRENT_LIMIT = args.concurrent_limit
+
+    simulator = Simulator(fake, args.host, args.port)
+    # The first line of output is the URL, for `load` to read.
+    print(simulator.url, flush=True)
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.server_close()
+
+
+def run_load(args):
+    workloads = args.workload or list(load.WORKLOADS)
+    options = {
+        "batches": args.batches,
+        "attachments": args.attachments,
+        "attachment_size": args.attachment_size,
+    }
+
+    # The simulator is served over plain HTTP.
+    os.environ.setdefault("OAUTHLIB_INSECURE_TRANSPORT", "1")
+
+    server = None
+    url = args.url
+    if url is None:
+        # Run the simulator in its own process, so it doesn't compete with
+        # the client for the GIL, or count towards its memory use.
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "xero.bench",
+                "serve",
+                "--port=0",
+                f"--latency={args.latency}",
+                f"--minute-limit={args.minute_limit}",
+                f"--concurrent-limit={args.concurrent_limit}",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        url = server.stdout.readline().strip()
+
+    try:
+        results = [
+            load.run(
+                workload,
+                url,
+                tenants=args.tenants,
+                workers=args.workers,
+                middleware=load.middleware(
+                    args.retry, args.rate_limit, args.adaptive, args.scheduler
+                ),
+                options=options,
+                memory=not args.no_memory,
+            )
+            for workload in workloads
+        ]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        load.report(results)
+
+
+def simulator_options(parser):
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="seconds added to each response"
+    )
+    parser.add_argument(
+        "--minute-limit",
+        type=int,
+        default=FakeXero.MINUTE_LIMIT,
+        help="requests allowed per tenant per minute",
+    )
+    parser.add_argument(
+        "--concurrent-limit",
+        type=int,
+        default=FakeXero.CONCURRENT_LIMIT,
+        help="concurrent requests allowed per tenant",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m xero.bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_serve = commands.add_parser("serve", help="serve a simulated Xero")
+    parser_serve.add_argument("--host", default="127.0.0.1")
+    parser_serve.add_argument("--port", type=int, default=8000)
+    simulator_options(parser_serve)
+    parser_serve.add_argument("--jitter", type=float, default=0.0)
+    parser_serve.add_argument("--seed", type=int, default=0)
+    parser_serve.add_argument("--contacts", type=int, default=50)
+    parser_serve.add_argument("--invoices", type=int, default=250)
+    parser_serve.add_argument("--journals", type=int, default=500)
+    parser_serve.add_argument("--no-rate-limits", action="store_true")
+    parser_serve.set_defaults(func=serve)
+
+    parser_load = commands.add_parser("load", help="drive workloads and report")
+    parser_load.add_argument(
+        "--url", help="a running simulator (by default, one is started)"
+    )
+    parser_load.add_argument(
+        "--workload",
+        action="append",
+        choices=list(load.WORKLOADS),
+        help="the workload to run; may be repeated (default: all)",
+    )
+    parser_load.add_argument("--tenants", type=int, default=4)
+    parser_load.add_argument("--workers", type=int, default=8)
+    parser_load.add_argument("--batches", type=int, default=5)
+    parser_load.add_argument("--attachments", type=int, default=10)
+    parser_load.add_argument("--attachment-size", type=int, default=64 * 1024)
+    parser_load.add_argument(
+        "--retry", action="store_true", help="retry rate limited GET requests"
+    )
+    parser_load.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="limit the requests per tenant per minute on the client",
+    )
+    parser_load.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="adapt the requests in flight per tenant to the responses",
+    )
+    parser_load.add_argument(
+        "--scheduler",
+        action="store_true",
+        help="share the rate limits fairly between tenants",
+    )
+    parser_load.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="don't run each workload again to measure its memory use",
+    )
+    parser_load.add_argument("--json", action="store_true")
+    simulator_options(parser_load)
+    parser_load.set_defaults(func=run_load)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
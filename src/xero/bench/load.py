@@ -0,0 +1,305 @@
+"""Drive realistic workloads through the public `Xero` API, and measure them.
+
+Each workload runs against a simulator (see `xero.bench.simulator`) for a
+number of tenants, using a pool of worker threads. Every HTTP request is
+recorded, so the report includes the latency of each attempt and the number
+of 429 (rate limited) responses, even if they were retried.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+
+import requests
+
+from ..api import Xero
+from ..auth import OAuth2Credentials
+from ..exceptions import XeroException
+from ..pipeline import AdaptiveConcurrency, Pipeline, RateLimit, Retry
+from ..scheduler import Scheduler
+from ..transport import RequestsTransport
+
+PAGE_SIZE = 100
+
+
+class Recorder:
+    """Pipeline middleware that records the latency and status of every
+    request; the status is None if the request failed without a response."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, request, next):
+        status = None
+        start = time.perf_counter()
+        try:
+            response = next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.calls.append((elapsed, status))
+
+
+def call(method, *args, **kwargs):
+    """Call a manager method; errors are recorded by the Recorder, so a failed
+    call just returns None."""
+    try:
+        return method(*args, **kwargs)
+    except (XeroException, requests.RequestException):
+        return None
+
+
+def backfill(xero, options):
+    """Page through every invoice and journal, as an initial sync would.
+
+    Each page is a task. The next page of each is only requested once the
+    previous page is back, as that is what says whether there is another.
+    """
+
+    def invoices(page):
+        result = call(xero.invoices.filter, page=page)
+        if result is not None and len(result) >= PAGE_SIZE:
+            return [partial(invoices, page + 1)]
+
+    def journals(offset):
+        result = call(xero.journals.filter, offset=offset)
+        if result:
+            return [partial(journals, result[-1]["JournalNumber"])]
+
+    return [partial(invoices, 1), partial(journals, 0)]
+
+
+def bulk_save(xero, options):
+    """Create invoices in batches of 50, each batch a task."""
+
+    def save(contacts, batch):
+        call(
+            xero.invoices.put,
+            [
+                {
+                    "Type": "ACCREC",
+                    "Contact": {"Name": contacts[(batch + i) % len(contacts)]["Name"]},
+                    "Reference": f"Batch {batch} #{i}",
+                    "LineItems": [
+                        {
+                            "Description": "Consulting",
+                            "Quantity": 1,
+                            "UnitAmount": 100,
+                            "AccountCode": "200",
+                        }
+                    ],
+                }
+                for i in range(50)
+            ],
+        )
+
+    def start():
+        contacts = call(xero.contacts.filter, page=1) or [{"Name": "Bulk Save"}]
+        return [partial(save, contacts, batch) for batch in range(options["batches"])]
+
+    return [start]
+
+
+def attachments(xero, options):
+    """Upload attachments to invoices, each upload a task."""
+    data = os.urandom(options["attachment_size"])
+
+    def upload(invoice, i):
+        call(
+            xero.invoices.put_attachment_data,
+            invoice["InvoiceID"],
+            f"receipt-{i}.pdf",
+            data,
+            "application/pdf",
+        )
+
+    def start():
+        invoices = call(xero.invoices.filter, page=1) or []
+        rng = random.Random(0)
+        return [
+            partial(upload, rng.choice(invoices), i)
+            for i in range(options["attachments"] if invoices else 0)
+        ]
+
+    return [start]
+
+
+def fan_out(xero, options):
+    """Make the same small set of reads for every tenant at once, as a
+    dashboard or scheduled check would."""
+
+    def read(method, **kwargs):
+        call(method, **kwargs)
+
+    return [
+        partial(read, xero.contacts.filter, page=1),
+        partial(read, xero.invoices.filter, page=1),
+        partial(read, xero.journals.filter, offset=0),
+    ]
+
+
+# A workload returns the tasks to start with, for a tenant; each task may
+# return more tasks, to be run once it has finished.
+WORKLOADS = {
+    "backfill": backfill,
+    "bulk-save": bulk_save,
+    "attachments": attachments,
+    "fan-out": fan_out,
+}
+
+
+def credentials(url, tenant_id):
+    """Credentials for a simulated tenant."""
+    creds = OAuth2Credentials(
+        "pyxero-bench",
+        "pyxero-bench",
+        token={"access_token": "pyxero-bench", "token_type": "Bearer"},
+        tenant_id=tenant_id,
+    )
+    creds.base_url = url
+    return creds
+
+
+def percentile(values, q):
+    """The nearest-rank `q` percentile of `values`."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+
+def execute(executor, tasks):
+    """Run `tasks` (and the tasks they return) on `executor`, until none are
+    left."""
+    pending = {executor.submit(task) for task in tasks}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.update(executor.submit(task) for task in future.result() or ())
+
+
+def drive(workload, url, tenants, workers, middleware, options, prefix="tenant"):
+    """Run a workload for `tenants` tenants (with IDs starting with `prefix`)
+    with `workers` threads; returns the `Recorder` and the seconds taken."""
+    # Share one connection pool between the workers, as an application would.
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    recorder = Recorder()
+    pipeline = Pipeline([*middleware, recorder], RequestsTransport(session))
+    clients = [
+        Xero(credentials(url, f"{prefix}-{i}"), pipeline=pipeline)
+        for i in range(tenants)
+    ]
+
+    start = time.perf_counter()
+    # The tasks of every tenant share the workers, so there can be more
+    # requests in flight than tenants.
+    with ThreadPoolExecutor(workers) as executor:
+        execute(
+            executor,
+            [task for xero in clients for task in WORKLOADS[workload](xero, options)],
+        )
+    elapsed = time.perf_counter() - start
+    pipeline.transport.close()
+    return recorder, elapsed
+
+
+def run(
+    workload,
+    url,
+    *,
+    tenants=4,
+    workers=8,
+    middleware=(),
+    options=None,
+    memory=True,
+):
+    """Run a workload against the simulator at `url` for `tenants` tenants,
+    with `workers` threads; returns a dict of results.
+
+    If `memory` is true, the workload is run again (for other tenants) to
+    measure the memory it allocates, as tracing allocations slows them down.
+    """
+    options = {
+        "batches": 5,
+        "attachments": 10,
+        "attachment_size": 64 * 1024,
+        **(options or {}),
+    }
+    recorder, elapsed = drive(workload, url, tenants, workers, middleware, options)
+
+    peak_memory = None
+    if memory:
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        drive(workload, url, tenants, workers, middleware, options, "memory")
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        # The most memory allocated at once by the workload.
+        peak_memory = peak - baseline
+
+    latencies = [latency for latency, _ in recorder.calls]
+    statuses = [status for _, status in recorder.calls]
+    return {
+        "workload": workload,
+        "requests": len(recorder.calls),
+        "errors": sum(1 for s in statuses if s is None or s >= 400),
+        "rate_limited": statuses.count(429),
+        "seconds": elapsed,
+        "throughput": len(recorder.calls) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "peak_memory": peak_memory,
+    }
+
+
+def report(results, file=sys.stdout):
+    """Print a table of results."""
+    print(
+        f"{'workload':<12} {'requests':>8} {'errors':>6} {'429s':>5} "
+        f"{'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'peak MiB':>8}",
+        file=file,
+    )
+    for result in results:
+        p50, p99 = (
+            "-" if value is None else f"{value * 1000:.1f}"
+            for value in (result["p50"], result["p99"])
+        )
+        memory = result["peak_memory"]
+        memory = "-" if memory is None else f"{memory / 2**20:.1f}"
+        print(
+            f"{result['workload']:<12} {result['requests']:>8} "
+            f"{result['errors']:>6} {result['rate_limited']:>5} "
+            f"{result['throughput']:>8.1f} {p50:>8} {p99:>8} {memory:>8}",
+            file=file,
+        )
+
+
+def middleware(retry=False, rate_limit=False, adaptive=False, scheduler=False):
+    """The optional middleware to run the workloads with."""
+    chain = []
+    if retry:
+        chain.append(Retry())
+    if rate_limit:
+        chain.append(RateLimit())
+    if scheduler:
+        chain.append(Scheduler())
+    if adaptive:
+        chain.append(AdaptiveConcurrency())
+    return chain
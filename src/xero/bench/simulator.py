@@ -0,0 +1,85 @@
+"""A local HTTP server that simulates the Xero Accounting API.
+
+Requests are served by a `xero.fake.FakeXero`, so the simulator enforces
+Xero's per-tenant minute and concurrency limits, and simulates latency.
+"""
+
+import http.server
+import threading
+
+from requests.structures import CaseInsensitiveDict
+
+from ..fake import FakeXero
+from ..pipeline import Request
+
+
+class SimulatorHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_PUT(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def do_DELETE(self):
+        self.handle_request()
+
+    def handle_request(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else None
+        request = Request(
+            self.command.lower(),
+            self.server.url + self.path,
+            body=body,
+            headers=CaseInsensitiveDict(self.headers.items()),
+        )
+        response = self.server.fake.send(request)
+
+        self.send_response(response.status_code, response.reason)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(response.content)))
+        self.end_headers()
+        self.wfile.write(response.content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Simulator(http.server.ThreadingHTTPServer):
+    """Serve `fake` (by default, a `FakeXero()`) over HTTP.
+
+    Use `start()` to serve from a background thread, or `serve_forever()`.
+    `url` is the base URL to use as the credentials' `base_url`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fake=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), SimulatorHandler)
+        self.fake = FakeXero() if fake is None else fake
+        host, port = self.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
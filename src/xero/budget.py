@@ -0,0 +1,106 @@
+"""Limit the calls a job can make to Xero.
+
+Xero allows 5,000 calls a day for each tenant. A budget caps the calls made
+within a block of code, so a nightly sync can't use up the calls needed by
+the rest of the day's work:
+
+    >>> with xero.budget(max_calls=800, tenant=tenant_id) as budget:
+    ...     for page in range(1, 100):
+    ...         if not budget.allows(1):
+    ...             break  # Leave the rest for tomorrow
+    ...         invoices = xero.invoices.filter(page=page)
+    >>> budget.spent
+    Counter({'Invoices.filter': 99})
+
+Every request sent to Xero counts, including each page and each retry; a
+request that would exceed a budget raises `XeroBudgetExceeded` instead. A
+budget applies to the code run in its context (see `contextvars`), including
+nested budgets, which all apply.
+"""
+
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .exceptions import XeroBudgetExceeded
+
+_budgets = ContextVar("xero_budgets", default=())
+_lock = threading.Lock()
+
+
+class Budget:
+    """A limit of `max_calls` calls, for the tenant with the ID `tenant` (or
+    for every tenant, if None)."""
+
+    def __init__(self, max_calls, tenant=None):
+        self.max_calls = max_calls
+        self.tenant = tenant
+        # The calls made, by operation (e.g. "Invoices.filter")
+        self.spent = Counter()
+
+    def __repr__(self):
+        return f"<Budget {self.calls}/{self.max_calls}>"
+
+    @property
+    def calls(self):
+        """The number of calls made."""
+        return self.spent.total()
+
+    @property
+    def remaining(self):
+        """The number of calls that can still be made."""
+        return max(0, self.max_calls - self.calls)
+
+    def allows(self, calls):
+        """Can `calls` more calls be made?"""
+        return calls <= self.remaining
+
+    def applies(self, request):
+        return self.tenant is None or self.tenant == request.tenant_id
+
+
+@contextmanager
+def budget(max_calls, tenant=None):
+    """Limit the calls made in the context to `max_calls`, for the tenant with
+    the ID `tenant` (or for every tenant). Yields the `Budget`."""
+    limit = Budget(max_calls, tenant)
+    token = _budgets.set((*_budgets.get(), limit))
+    try:
+        yield limit
+    finally:
+        _budgets.reset(token)
+
+
+def _applicable(request):
+    return [b for b in _budgets.get() if b.applies(request)]
+
+
+def check(request):
+    """Raise `XeroBudgetExceeded` if a budget in the current context has no
+    calls left for the request.
+
+    Calls are checked before any middleware runs, so a call that will be
+    refused doesn't wait for (or use up) a rate limit first.
+    """
+    budgets = _applicable(request)
+    with _lock:
+        for limit in budgets:
+            if limit.calls >= limit.max_calls:
+                raise XeroBudgetExceeded(limit)
+
+
+def charge(request):
+    """Count a request against the budgets in the current context, raising
+    `XeroBudgetExceeded` (and counting nothing) if it would exceed one."""
+    budgets = _applicable(request)
+    if not budgets:
+        return
+
+    operation = f"{request.resource}.{request.operation}"
+    with _lock:
+        for limit in budgets:
+            if limit.calls >= limit.max_calls:
+                raise XeroBudgetExceeded(limit)
+        for limit in budgets:
+            limit.spent[operation] += 1
@@ -0,0 +1,172 @@
+"""Record the requests sent to Xero, and replay them without a network.
+
+A `Cassette` is a transport. In "record" mode, it sends requests with
+another transport, and writes each request and its response to a file (one
+JSON object per line); credentials are never written, and any headers that
+could carry them are redacted. In "replay" mode, it serves the recorded
+responses back, optionally taking as long as the originals did:
+
+    >>> xero = Xero(credentials, transport=Cassette("sync.jsonl", "record"))
+    >>> xero.invoices.all()
+    >>> # Later, without network access, or any calls against the rate limits:
+    >>> xero = Xero(credentials, transport=Cassette("sync.jsonl", timing=True))
+    >>> xero.invoices.all()
+"""
+
+import base64
+import datetime
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlencode
+
+from .transport import RequestsTransport, Transport, make_response
+
+REDACTED_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie"}
+
+
+class CassetteError(Exception):
+    """A request that wasn't recorded was made in replay mode."""
+
+
+def redact(headers):
+    return {
+        name: "REDACTED" if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def encode_params(params):
+    return urlencode(sorted((params or {}).items()), doseq=True)
+
+
+class Cassette(Transport):
+    """Record requests and responses to `path`, or replay them from it.
+
+    In "record" mode, requests are sent with `transport` (by default, a
+    `RequestsTransport`), and `path` is overwritten. In "replay" mode, each
+    request is answered with the responses recorded for the same method, URI,
+    parameters and tenant, in the order they were recorded; the last one is
+    repeated if the request is made more often than it was recorded. If
+    `timing` is True, replayed responses are delayed by the time the
+    original took.
+    """
+
+    def __init__(
+        self, path, mode="replay", *, transport=None, timing=False, sleep=time.sleep
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.transport = transport
+        self.timing = timing
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._file = None
+        self._responses = defaultdict(deque)
+
+        if mode == "record":
+            if self.transport is None:
+                self.transport = RequestsTransport()
+        else:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        request = entry["request"]
+                        key = (
+                            request["method"],
+                            request["uri"],
+                            request["params"],
+                            request["tenant_id"],
+                        )
+                        self._responses[key].append(entry["response"])
+
+    def send(self, request):
+        if self.mode == "record":
+            return self._record(request)
+        return self._replay(request)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.transport is not None:
+            self.transport.close()
+
+    def _record(self, request):
+        response = self.transport.send(request)
+        # Reading the content consumes a streamed response, so return a copy.
+        content = response.content
+        entry = {
+            "request": {
+                "method": request.method,
+                "uri": request.uri,
+                "params": encode_params(request.params),
+                "tenant_id": request.tenant_id,
+                "headers": redact(request.headers),
+            },
+            "response": {
+                "status_code": response.status_code,
+                "reason": response.reason,
+                "headers": redact(response.headers),
+                "elapsed": response.elapsed.total_seconds(),
+                **encode_body(content),
+            },
+        }
+        line = json.dumps(entry)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "w", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+        return make_response(
+            response.status_code,
+            content,
+            response.headers,
+            url=response.url,
+            reason=response.reason,
+            elapsed=response.elapsed,
+        )
+
+    def _replay(self, request):
+        key = (
+            request.method,
+            request.uri,
+            encode_params(request.params),
+            request.tenant_id,
+        )
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteError(f"No recorded response for {request!r}")
+            recorded = responses.popleft() if len(responses) > 1 else responses[0]
+
+        elapsed = datetime.timedelta(seconds=recorded["elapsed"])
+        if self.timing:
+            self.sleep(recorded["elapsed"])
+        return make_response(
+            recorded["status_code"],
+            decode_body(recorded),
+            recorded["headers"],
+            url=request.uri,
+            reason=recorded["reason"],
+            elapsed=elapsed,
+        )
+
+
+def encode_body(content):
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_base64": base64.b64encode(content).decode("ascii")}
+
+
+def decode_body(recorded):
+    if "body_base64" in recorded:
+        return base64.b64decode(recorded["body_base64"])
+    return recorded["body"].encode("utf-8")
@@ -0,0 +1,91 @@
+"""Bound the time taken by a block of calls to Xero.
+
+A per-call `timeout` bounds a single request; a deadline bounds everything
+done in a block, however many requests (pages, retries, chunks of a bulk
+save) it takes:
+
+    >>> with xero.deadline(seconds=20):
+    ...     for page in range(1, 10):
+    ...         xero.invoices.filter(page=page)
+
+Each request sent under a deadline has its timeout reduced to the time
+remaining. Once the deadline has passed, or if waiting (for a rate limit, or
+before a retry) would take past it, calls raise `XeroDeadlineExceeded`
+instead. A deadline applies to the code run in its context (see
+`contextvars`); a nested deadline can only shorten the time remaining.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .exceptions import XeroDeadlineExceeded
+
+_deadline = ContextVar("xero_deadline", default=None)
+
+
+class Deadline:
+    """A time, `expires` (by `clock`), by which calls must finish."""
+
+    def __init__(self, expires, clock=time.monotonic):
+        self.expires = expires
+        self.clock = clock
+
+    def __repr__(self):
+        return f"<Deadline {self.remaining:.3f}s remaining>"
+
+    @property
+    def remaining(self):
+        """The seconds remaining until the deadline."""
+        return max(0.0, self.expires - self.clock())
+
+    @property
+    def expired(self):
+        return self.remaining == 0
+
+
+@contextmanager
+def deadline(seconds, *, clock=time.monotonic):
+    """Require the calls made in the context to finish within `seconds`.
+    Yields the `Deadline`."""
+    expires = clock() + seconds
+    outer = _deadline.get()
+    if outer is not None:
+        expires = min(expires, outer.clock() + outer.remaining)
+    token = _deadline.set(Deadline(expires, clock))
+    try:
+        yield _deadline.get()
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """The seconds remaining until the current deadline; None if there isn't
+    one."""
+    current = _deadline.get()
+    return None if current is None else current.remaining
+
+
+def allows(delay):
+    """Can the current deadline accommodate waiting for `delay` seconds, and
+    then making a request?"""
+    left = remaining()
+    return left is None or delay < left
+
+
+def check(delay=0):
+    """Raise `XeroDeadlineExceeded` if the current deadline has passed, or
+    would pass while waiting `delay` seconds."""
+    if not allows(delay):
+        raise XeroDeadlineExceeded(_deadline.get())
+
+
+def timeout(value):
+    """Reduce a request's timeout (in seconds, or a (connect, read) tuple) to
+    the time remaining until the current deadline."""
+    left = remaining()
+    if left is None:
+        return value
+    if isinstance(value, tuple):
+        return tuple(left if t is None else min(t, left) for t in value)
+    return left if value is None else min(value, left)
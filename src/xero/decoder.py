@@ -0,0 +1,432 @@
+import codecs
+import json
+import re
+
+from .utils import json_load_object_hook
+
+# The only characters that change the nesting structure of a JSON document.
+# Everything else (numbers, literals, commas, colons and whitespace) can be
+# skipped over when looking for the boundaries of a value.
+STRUCTURAL = re.compile(r'[{}\[\]"]')
+# The content of a JSON string, between the quotes.
+STRING_TEXT = r'[^"\\]*(?:\\.[^"\\]*)*'
+# The remainder of a JSON string, *after* the opening quote.
+STRING_BODY = re.compile(STRING_TEXT + '"', re.DOTALL)
+# Any run of text that doesn't open or close an object or array (including
+# complete strings, which may contain brackets). This lets us jump from one
+# bracket to the next without inspecting each string individually.
+SKIP = re.compile(r'(?:[^"{}\[\]]+|"' + STRING_TEXT + '")*', re.DOTALL)
+# The key of an object member, up to the start of its value.
+MEMBER = re.compile(r'\s*"(' + STRING_TEXT + r')"\s*:\s*')
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# The end of a scalar value
+SCALAR_END = re.compile(r"[,\]}]")
+
+# A plain decoder, used to skip over unwanted values
+SCANNER = json.JSONDecoder()
+
+# Parser states
+SEEKING = 0
+KEY = 1
+ARRAY = 2
+DONE = 3
+
+
+class ArrayStreamParser:
+    """An incremental parser for Xero API responses.
+
+    Xero wraps the objects it returns in an envelope of the form::
+
+        {"Id": "...", "Status": "OK", ..., "Invoices": [{...}, {...}, ...]}
+
+    Text is passed to the parser with `feed()` as it arrives over the network;
+    each element of the array stored under `key` is decoded (using
+    `object_hook`) and returned as soon as the closing bracket of that element
+    has been received. If `fields` are provided, each element is projected onto
+    those fields as it is decoded (see `project()`). Only the text of the
+    element currently being received is retained, so memory use is bounded by
+    the size of a single record, rather than by the size of the response.
+
+    If the value stored under `key` is an object rather than an array, that
+    object is returned as the only element.
+    """
+
+    def __init__(self, key, object_hook=json_load_object_hook, fields=None):
+        self.key = key
+        self.projection = None if fields is None else projection(fields)
+        self._decoder = json.JSONDecoder(object_hook=object_hook)
+
+        self._buffer = ""
+        self._pos = 0
+        self._state = SEEKING
+        self._depth = 0
+        # The start of the element currently being scanned, the position from
+        # which scanning should resume, and the nesting depth at that position.
+        self._start = None
+        self._scan = 0
+        self._scan_depth = 0
+        # Is the value under `key` a single object, rather than an array?
+        self._single = False
+
+    @property
+    def done(self):
+        """Has the end of the array been reached?"""
+        return self._state == DONE
+
+    def feed(self, text):
+        """Add text to the parser, returning a list of any completed elements."""
+        if self._state == DONE:
+            return []
+
+        # Discard the text that has already been consumed. If an element is
+        # being scanned, keep it (and adjust the scan offsets to match).
+        keep = self._pos if self._start is None else self._start
+        if keep:
+            self._buffer = self._buffer[keep:]
+            self._pos -= keep
+            self._scan -= keep
+            if self._start is not None:
+                self._start -= keep
+        self._buffer += text
+
+        elements = []
+        while True:
+            if self._state == SEEKING:
+                if not self._seek():
+                    break
+            elif self._state == KEY:
+                if not self._value():
+                    break
+            elif self._state == ARRAY:
+                if not self._element(elements):
+                    break
+            else:
+                break
+        return elements
+
+    def close(self):
+        """Signal the end of the input.
+
+        Raises ValueError if the response ended in the middle of an element.
+        """
+        if self._start is not None or self._state in (KEY, ARRAY):
+            raise ValueError(f"Response ended before the end of {self.key!r}")
+
+    def _string_end(self, quote):
+        """Find the end of the string whose opening quote is at `quote`.
+
+        Returns the position after the closing quote, or None if the string
+        hasn't been completely received yet.
+        """
+        match = STRING_BODY.match(self._buffer, quote + 1)
+        return match.end() if match else None
+
+    def _seek(self):
+        """Scan the envelope, looking for `key`."""
+        buffer = self._buffer
+        while True:
+            match = STRUCTURAL.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                return False
+
+            char = match.group()
+            if char == '"':
+                end = self._string_end(match.start())
+                if end is None:
+                    self._pos = match.start()
+                    return False
+
+                if self._depth == 1:
+                    # A string in the envelope is a key if it is followed by a
+                    # colon; we need to see that colon to know.
+                    colon = WHITESPACE.match(buffer, end).end()
+                    if colon == len(buffer):
+                        self._pos = match.start()
+                        return False
+                    if (
+                        buffer[colon] == ":"
+                        and json.loads(buffer[match.start() : end]) == self.key
+                    ):
+                        self._pos = colon + 1
+                        self._state = KEY
+                        return True
+                self._pos = end
+            elif char in "{[":
+                self._depth += 1
+                self._pos = match.end()
+            else:
+                self._depth -= 1
+                self._pos = match.end()
+
+    def _value(self):
+        """Inspect the value stored under `key`."""
+        start = WHITESPACE.match(self._buffer, self._pos).end()
+        if start == len(self._buffer):
+            self._pos = start
+            return False
+
+        if self._buffer[start] == "[":
+            self._pos = start + 1
+        else:
+            # Not an array; treat the value as a single element.
+            self._pos = start
+            self._start = start
+            self._scan = start
+            self._scan_depth = 0
+            self._single = True
+        self._state = ARRAY
+        return True
+
+    def _element(self, elements):
+        """Scan the next element of the array, appending it to `elements`.
+
+        Returns False if more text is needed to complete the element.
+        """
+        buffer = self._buffer
+        if self._start is None:
+            # Skip any separator to find the start of the next element.
+            start = WHITESPACE.match(buffer, self._pos).end()
+            if start < len(buffer) and buffer[start] == ",":
+                start = WHITESPACE.match(buffer, start + 1).end()
+            if start == len(buffer):
+                self._pos = start
+                return False
+            if buffer[start] == "]":
+                self._pos = start + 1
+                self._state = DONE
+                return True
+
+            self._start = start
+            self._scan = start
+            self._scan_depth = 0
+
+            if buffer[start] in "{[":
+                # Most elements will have been completely received by the time
+                # they are first seen, so try to decode the element immediately.
+                # If that fails, the element is incomplete; scan for its end
+                # as more text arrives, so that it is only decoded once.
+                try:
+                    element, end = self._decode_at(start)
+                except ValueError:
+                    pass
+                else:
+                    elements.append(self._consume(element, end))
+                    return True
+
+        if buffer[self._start] not in "{[":
+            # A scalar value. Strings need to be skipped as a whole, in case
+            # they contain a comma or closing bracket.
+            if buffer[self._start] == '"':
+                end = self._string_end(self._start)
+            else:
+                match = SCALAR_END.search(buffer, self._start)
+                end = match.start() if match else None
+            if end is None:
+                return False
+            elements.append(self._consume(*self._decode_at(self._start)))
+            return True
+
+        while True:
+            scan = SKIP.match(buffer, self._scan).end()
+            # SKIP consumes complete strings, so stopping on a quote means the
+            # string hasn't been completely received yet.
+            if scan == len(buffer) or buffer[scan] == '"':
+                self._scan = scan
+                return False
+
+            self._scan = scan + 1
+            if buffer[scan] in "{[":
+                self._scan_depth += 1
+            else:
+                self._scan_depth -= 1
+                if self._scan_depth == 0:
+                    elements.append(self._consume(*self._decode_at(self._start)))
+                    return True
+
+    def _decode_at(self, pos):
+        """Decode the element starting at `pos`.
+
+        Returns a tuple of the element, and the position after the element.
+        Raises ValueError if the element is incomplete.
+        """
+        try:
+            if self.projection is None:
+                return self._decoder.raw_decode(self._buffer, pos)
+            return _project_value(self._buffer, pos, self.projection, self._decoder)
+        except IndexError as e:
+            raise ValueError("Incomplete element") from e
+
+    def _consume(self, element, end):
+        """Move past an element that has been decoded."""
+        self._pos = end
+        self._start = None
+        if self._single:
+            self._state = DONE
+        return element
+
+
+def iter_array(
+    chunks, key, encoding=None, object_hook=json_load_object_hook, fields=None
+):
+    """Yield the elements stored under `key` in a stream of response chunks.
+
+    `chunks` is an iterable of bytes (such as `Response.iter_content()`).
+    """
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    parser = ArrayStreamParser(key, object_hook=object_hook, fields=fields)
+    for chunk in chunks:
+        yield from parser.feed(decoder.decode(chunk))
+        if parser.done:
+            return
+    yield from parser.feed(decoder.decode(b"", final=True))
+    if not parser.done:
+        parser.close()
+
+
+class Projection:
+    """A description of the fields of an object that should be decoded.
+
+    `fields` maps field names to either a nested Projection (for fields that
+    should themselves be projected) or None (for fields that should be kept as
+    is).
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        # A pattern that skips over any run of unwanted members whose values
+        # are simple scalars, in a single match.
+        names = "|".join(re.escape(name) for name in fields)
+        self.skip = re.compile(
+            r'(?:\s*"(?!(?:' + names + r')")' + STRING_TEXT + r'"\s*:\s*'
+            r'(?:"' + STRING_TEXT + r'"|[-+.\w]+)\s*,)*'
+        )
+
+    def __repr__(self):
+        return f"<Projection {self.fields!r}>"
+
+
+def projection(fields):
+    """Build a Projection from a list of (dotted) field names.
+
+    For example, ``["InvoiceID", "Contact.ContactID", "Contact.Name"]`` keeps
+    the InvoiceID of an object, and the ContactID and Name of its Contact.
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        *parents, leaf = field.split(".")
+        for name in parents:
+            child = node.get(name, {})
+            if child is None:
+                # The whole of this field has already been requested
+                break
+            node = node.setdefault(name, child)
+        else:
+            node[leaf] = None
+
+    def build(tree):
+        return Projection(
+            {
+                name: None if child is None else build(child)
+                for name, child in tree.items()
+            }
+        )
+
+    return build(tree)
+
+
+def project(text, projection, object_hook=json_load_object_hook):
+    """Decode the JSON `text`, keeping only the fields described by `projection`.
+
+    Values that aren't part of the projection are skipped over without being
+    decoded, so (for example) the LineItems of an Invoice are never built if
+    they aren't requested. If a projected field contains a list, the projection
+    is applied to each element of the list.
+    """
+    decoder = json.JSONDecoder(object_hook=object_hook)
+    value, _ = _project_value(text, WHITESPACE.match(text).end(), projection, decoder)
+    return value
+
+
+def _project_value(text, pos, projection, decoder):
+    """Decode the projection of the value starting at `pos`.
+
+    Returns a tuple of the value, and the position after the value.
+    """
+    char = text[pos]
+    if char == "{":
+        return _project_object(text, pos, projection, decoder)
+    elif char == "[":
+        values = []
+        pos = WHITESPACE.match(text, pos + 1).end()
+        if text[pos] == "]":
+            return values, pos + 1
+        while True:
+            value, pos = _project_value(text, pos, projection, decoder)
+            values.append(value)
+            pos = WHITESPACE.match(text, pos).end()
+            if text[pos] == "]":
+                return values, pos + 1
+            elif text[pos] != ",":
+                raise ValueError(f"Expecting ',' delimiter at {pos}")
+            pos = WHITESPACE.match(text, pos + 1).end()
+    else:
+        # A scalar can't be projected; decode it as is.
+        return decoder.raw_decode(text, pos)
+
+
+def _project_object(text, pos, projection, decoder):
+    obj = {}
+    fields = projection.fields
+    pos += 1
+    while True:
+        pos = projection.skip.match(text, pos).end()
+        member = MEMBER.match(text, pos)
+        if member is None:
+            # An empty object
+            pos = WHITESPACE.match(text, pos).end()
+            if text[pos] != "}":
+                raise ValueError(f"Expecting property name at {pos}")
+            break
+
+        key = member.group(1)
+        if "\\" in key:
+            key = json.loads(f'"{key}"')
+        pos = member.end()
+        if key in fields:
+            child = fields[key]
+            if child is None:
+                obj[key], pos = decoder.raw_decode(text, pos)
+            else:
+                obj[key], pos = _project_value(text, pos, child, decoder)
+        else:
+            pos = _skip_value(text, pos)
+
+        pos = WHITESPACE.match(text, pos).end()
+        if text[pos] == "}":
+            break
+        elif text[pos] != ",":
+            raise ValueError(f"Expecting ',' delimiter at {pos}")
+        pos += 1
+
+    if decoder.object_hook is not None:
+        obj = decoder.object_hook(obj)
+    return obj, pos + 1
+
+
+def _skip_value(text, pos):
+    """Find the end of the value starting at `pos`, without keeping it."""
+    char = text[pos]
+    if char == '"':
+        match = STRING_BODY.match(text, pos + 1)
+        if match is None:
+            raise ValueError(f"Unterminated string starting at {pos}")
+        return match.end()
+    elif char not in "{[":
+        match = SCALAR_END.search(text, pos)
+        return match.start() if match else len(text)
+    # Objects and arrays are scanned by the (C accelerated) JSON scanner, without
+    # an object hook; this is several times faster than finding the matching
+    # bracket in Python. The decoded value is discarded immediately.
+    return SCANNER.raw_decode(text, pos)[1]
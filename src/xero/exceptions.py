@@ -1,6 +1,7 @@
 import json
 from urllib.parse import parse_qs
-from xml.dom.minidom import parseString
+
+from .ratelimit import RateLimitState
 
 
 class XeroException(Exception):
@@ -60,6 +61,8 @@ class XeroBadRequest(XeroException):
         else:
             # Extract the messages from the text.
             # parseString takes byte content, not unicode.
+            from xml.dom.minidom import parseString
+
             dom = parseString(response.text.encode(response.encoding))
             messages = dom.getElementsByTagName("Message")
 
@@ -114,6 +117,8 @@ class XeroNotImplemented(XeroException):
     def __init__(self, response):
         # Extract the useful error message from the text.
         # parseString takes byte content, not unicode.
+        from xml.dom.minidom import parseString
+
         dom = parseString(response.text.encode(response.encoding))
         messages = dom.getElementsByTagName("Message")
 
@@ -124,6 +129,7 @@ class XeroNotImplemented(XeroException):
 class XeroRateLimitExceeded(XeroException):
     # HTTP 503 - Rate limit exceeded
     def __init__(self, response, payload):
+        self.rate_limit = RateLimitState.from_headers(response.headers)
         try:
             self.errors = [payload["oauth_problem"][0]]
         except KeyError:
@@ -141,3 +147,45 @@ class XeroNotAvailable(XeroException):
 class XeroExceptionUnknown(XeroException):
     # Any other exception.
     pass
+
+
+class XeroQuotaExceeded(XeroException):
+    # A limit on the calls made for a tenant has been reached locally
+    def __init__(self, tenant_id, retry_after):
+        self.tenant_id = tenant_id
+        self.retry_after = retry_after
+        super().__init__(
+            None,
+            f"The call quota for tenant {tenant_id} has been used up; "
+            f"it resets in {retry_after:.0f} seconds.",
+        )
+
+
+class XeroBudgetExceeded(XeroException):
+    # A call would exceed a budget set with `xero.budget.budget()`
+    def __init__(self, budget):
+        self.budget = budget
+        super().__init__(
+            None,
+            f"The budget of {budget.max_calls} calls has been used up "
+            f"({', '.join(f'{op}: {n}' for op, n in budget.spent.most_common())}).",
+        )
+
+
+class XeroCircuitOpen(XeroException):
+    # Requests to a host are failing fast, because it appears to be down
+    def __init__(self, host, retry_after):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(
+            None,
+            f"{host} appears to be unavailable; requests will be tried again "
+            f"in {retry_after:.0f} seconds.",
+        )
+
+
+class XeroDeadlineExceeded(XeroException, TimeoutError):
+    # A call couldn't be made before the deadline set with `xero.deadline`
+    def __init__(self, deadline):
+        self.deadline = deadline
+        super().__init__(None, "The deadline for the call has passed.")
@@ -0,0 +1,479 @@
+"""An in-process fake of the Xero Accounting API, for benchmarks and load tests.
+
+`FakeXero` is a transport, so it can be used anywhere a real one can:
+
+    >>> from xero.fake import FakeXero
+    >>> xero = Xero(credentials, transport=FakeXero(latency=0.05))
+    >>> xero.invoices.filter(page=1)
+
+It serves deterministic, realistic Invoices, Contacts and Journals for every
+tenant; pages them like Xero does; simulates latency; and reports (and, unless
+disabled, enforces) Xero's rate limits with the same headers and 429 responses
+as the real API.
+"""
+
+import datetime
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from urllib.parse import parse_qsl, urlparse
+from xml.etree.ElementTree import fromstring
+
+from .transport import Transport, make_response
+from .utils import isplural
+
+EPOCH = datetime.datetime(1970, 1, 1)
+START = datetime.datetime(2024, 1, 1)
+
+ACCOUNTS = [
+    ("200", "Sales", "REVENUE", "OUTPUT"),
+    ("260", "Other Revenue", "REVENUE", "OUTPUT"),
+    ("310", "Cost of Goods Sold", "DIRECTCOSTS", "INPUT"),
+    ("429", "General Expenses", "EXPENSE", "INPUT"),
+    ("610", "Accounts Receivable", "CURRENT", "NONE"),
+    ("800", "Accounts Payable", "CURRLIAB", "NONE"),
+    ("820", "GST", "CURRLIAB", "NONE"),
+]
+NAMES = ["Acme", "Bayside", "Coastal", "Delta", "Evergreen", "Foster", "Granite"]
+SUFFIXES = ["Ltd", "Plumbing", "Supplies", "Consulting", "Traders", "& Co"]
+STATUSES = ["DRAFT", "SUBMITTED", "AUTHORISED", "AUTHORISED", "PAID", "VOIDED"]
+TAX_RATE = 0.15
+
+
+def xero_date(value):
+    """Format a datetime the way the Xero JSON API does."""
+    milliseconds = (value - EPOCH) // datetime.timedelta(milliseconds=1)
+    return f"/Date({milliseconds}+0000)/"
+
+
+def from_xml(element):
+    """Convert an XML request body (as sent by the managers) to dicts."""
+    if isplural(element.tag):
+        return [from_xml(child) for child in element]
+    if len(element):
+        return {child.tag: from_xml(child) for child in element}
+    return element.text
+
+
+class FakeXero(Transport):
+    """A transport that serves requests from an in-process fake of Xero.
+
+    Each tenant gets `contacts`, `invoices` and `journals` objects, generated
+    from `seed`. Every response is delayed by `latency` seconds, plus up to
+    `jitter` more. Unless `rate_limits` is False, requests beyond Xero's
+    concurrency, per-minute, per-day and app-wide per-minute limits receive a
+    429 response.
+    """
+
+    PAGE_SIZE = 100
+
+    CONCURRENT_LIMIT = 5
+    MINUTE_LIMIT = 60
+    DAY_LIMIT = 5000
+    APP_MINUTE_LIMIT = 10000
+
+    def __init__(
+        self,
+        contacts=50,
+        invoices=250,
+        journals=500,
+        *,
+        latency=0.0,
+        jitter=0.0,
+        seed=0,
+        rate_limits=True,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.sizes = {"Contacts": contacts, "Invoices": invoices, "Journals": journals}
+        self.latency = latency
+        self.jitter = jitter
+        self.seed = seed
+        self.rate_limits = rate_limits
+        self.clock = clock
+        self.sleep = sleep
+
+        # Counts of the requests served, by (method, resource, status)
+        self.requests = Counter()
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tenants = {}
+        self._active = Counter()
+        self._minute_calls = defaultdict(deque)
+        self._day_calls = defaultdict(deque)
+        self._app_calls = deque()
+        self._idempotent = {}
+
+    def objects(self, resource, tenant_id=None):
+        """The objects the fake serves for a resource (e.g. "Invoices")."""
+        with self._lock:
+            return self._data(tenant_id)[resource]
+
+    def send(self, request):
+        tenant_id = request.headers.get("Xero-tenant-id")
+        path = urlparse(request.uri).path.strip("/").split("/")
+        resource = path[2] if len(path) > 2 else None
+
+        with self._lock:
+            headers, problem = self._rate_limit(tenant_id)
+            if problem:
+                response = self._rate_limited()
+            else:
+                self._active[tenant_id] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+
+        if not problem:
+            try:
+                if delay:
+                    self.sleep(delay)
+                with self._lock:
+                    response = self._route(request, tenant_id, path)
+            finally:
+                with self._lock:
+                    self._active[tenant_id] -= 1
+
+        response.headers.update(headers)
+        response.url = request.uri
+        response.elapsed = datetime.timedelta(seconds=delay)
+        with self._lock:
+            self.requests[request.method, resource, response.status_code] += 1
+        return response
+
+    def _rate_limit(self, tenant_id):
+        """Record a call, returning the rate limit headers and the name of the
+        limit it exceeds (if any)."""
+        now = self.clock()
+        minute_calls = self._minute_calls[tenant_id]
+        day_calls = self._day_calls[tenant_id]
+        for calls, window in [
+            (minute_calls, 60),
+            (day_calls, 86400),
+            (self._app_calls, 60),
+        ]:
+            while calls and calls[0] <= now - window:
+                calls.popleft()
+
+        problem = None
+        if self.rate_limits:
+            if len(day_calls) >= self.DAY_LIMIT:
+                problem, retry = "day", day_calls[0] + 86400 - now
+            elif len(self._app_calls) >= self.APP_MINUTE_LIMIT:
+                problem, retry = "appminute", self._app_calls[0] + 60 - now
+            elif len(minute_calls) >= self.MINUTE_LIMIT:
+                problem, retry = "minute", minute_calls[0] + 60 - now
+            elif self._active[tenant_id] >= self.CONCURRENT_LIMIT:
+                problem, retry = "concurrent", 1
+
+        if problem is None:
+            minute_calls.append(now)
+            day_calls.append(now)
+            self._app_calls.append(now)
+
+        headers = {
+            "X-MinLimit-Remaining": str(max(0, self.MINUTE_LIMIT - len(minute_calls))),
+            "X-DayLimit-Remaining": str(max(0, self.DAY_LIMIT - len(day_calls))),
+            "X-AppMinLimit-Remaining": str(
+                max(0, self.APP_MINUTE_LIMIT - len(self._app_calls))
+            ),
+        }
+        if problem:
+            headers["Retry-After"] = str(max(1, math.ceil(retry)))
+            headers["X-Rate-Limit-Problem"] = problem
+        return headers, problem
+
+    def _rate_limited(self):
+        return make_response(
+            429,
+            "Rate limit exceeded",
+            {"Content-Type": "text/html; charset=utf-8"},
+            reason="Too Many Requests",
+        )
+
+    def _route(self, request, tenant_id, path):
+        data = self._data(tenant_id)
+        if not 3 <= len(path) <= 6 or path[:2] != ["api.xro", "2.0"]:
+            return self._not_found()
+        resource = path[2]
+        if resource not in data:
+            return self._not_found()
+
+        params = dict(parse_qsl(urlparse(request.uri).query))
+        params.update(request.params or {})
+
+        if len(path) > 4:
+            if path[4] != "Attachments" or resource == "Journals":
+                return self._not_found()
+            objects = self._lookup(resource, data[resource], path[3])
+            if not objects:
+                return self._not_found()
+            attachments = objects[0].setdefault("Attachments", [])
+            if request.method == "get" and len(path) == 5:
+                return self._ok("Attachments", attachments)
+            if request.method in ("put", "post") and len(path) == 6:
+                return self._write(
+                    request,
+                    tenant_id,
+                    "Attachments",
+                    lambda: self._attach(objects[0], path[5], request),
+                )
+
+        elif request.method == "get":
+            if len(path) == 4:
+                objects = self._lookup(resource, data[resource], path[3])
+                if not objects:
+                    return self._not_found()
+            else:
+                objects = self._page(resource, data[resource], params)
+            return self._ok(resource, objects)
+
+        elif request.method in ("put", "post") and resource != "Journals":
+            return self._write(
+                request,
+                tenant_id,
+                resource,
+                lambda: self._save(resource, data[resource], request.body),
+            )
+
+        return make_response(
+            501,
+            "<ApiException><Message>The Api Method called is not implemented"
+            "</Message></ApiException>",
+            {"Content-Type": "text/xml; charset=utf-8"},
+            reason="Not Implemented",
+        )
+
+    def _write(self, request, tenant_id, resource, save):
+        """Save objects, or replay the objects saved with the same idempotency
+        key."""
+        key = (tenant_id, request.headers.get("Idempotency-Key"))
+        if key[1] is not None and key in self._idempotent:
+            return self._ok(resource, self._idempotent[key])
+        objects = save()
+        if key[1] is not None:
+            self._idempotent[key] = objects
+        return self._ok(resource, objects)
+
+    def _ok(self, resource, objects):
+        body = {
+            "Id": self._new_id(),
+            "Status": "OK",
+            "ProviderName": "pyxero",
+            "DateTimeUTC": xero_date(START),
+            resource: objects,
+        }
+        return make_response(
+            200,
+            json.dumps(body),
+            {"Content-Type": "application/json; charset=utf-8"},
+            reason="OK",
+        )
+
+    def _not_found(self):
+        return make_response(
+            404,
+            "The resource you're looking for cannot be found",
+            {"Content-Type": "text/html; charset=utf-8"},
+            reason="Not Found",
+        )
+
+    def _lookup(self, resource, objects, id):
+        keys = {
+            "Contacts": ("ContactID", "ContactNumber"),
+            "Invoices": ("InvoiceID", "InvoiceNumber"),
+            "Journals": ("JournalID",),
+        }[resource]
+        if id is None:
+            return []
+        return [obj for obj in objects if any(obj.get(key) == id for key in keys)]
+
+    def _page(self, resource, objects, params):
+        if resource == "Journals":
+            # Journals are paged by journal number, 100 at a time
+            offset = int(params.get("offset", 0))
+            return [obj for obj in objects if obj["JournalNumber"] > offset][
+                : self.PAGE_SIZE
+            ]
+
+        if "page" not in params:
+            return objects
+        page = int(params["page"])
+        return objects[(page - 1) * self.PAGE_SIZE : page * self.PAGE_SIZE]
+
+    def _save(self, resource, objects, body):
+        saved = []
+        received = from_xml(fromstring(body)) if body else []
+        if isinstance(received, dict):
+            received = [received]
+        for obj in received:
+            id_field = "ContactID" if resource == "Contacts" else "InvoiceID"
+            existing = self._lookup(resource, objects, obj.get(id_field))
+            if existing:
+                existing[0].update(obj)
+                obj = existing[0]
+            else:
+                obj[id_field] = self._new_id()
+                obj.setdefault(
+                    "Status" if resource == "Invoices" else "ContactStatus",
+                    "DRAFT" if resource == "Invoices" else "ACTIVE",
+                )
+                objects.append(obj)
+            obj["UpdatedDateUTC"] = xero_date(START)
+            saved.append(obj)
+        return saved
+
+    def _new_id(self):
+        return str(uuid.UUID(int=self._random.getrandbits(128), version=4))
+
+    def _attach(self, obj, filename, request):
+        body = request.body
+        if hasattr(body, "read"):
+            body = body.read()
+        attachment = {
+            "AttachmentID": self._new_id(),
+            "FileName": filename,
+            "MimeType": request.headers.get("Content-Type"),
+            "ContentLength": len(body or b""),
+            "IncludeOnline": (request.params or {}).get("IncludeOnline") == "true",
+        }
+        obj["Attachments"].append(attachment)
+        obj["HasAttachments"] = True
+        return [attachment]
+
+    def _data(self, tenant_id):
+        """The objects for a tenant, generated on first use."""
+        try:
+            return self._tenants[tenant_id]
+        except KeyError:
+            pass
+
+        rng = random.Random(f"{self.seed}:{tenant_id}")
+
+        def new_id():
+            return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+        contacts = [
+            self._contact(rng, new_id, i) for i in range(self.sizes["Contacts"])
+        ]
+        invoices = [
+            self._invoice(rng, new_id, i, rng.choice(contacts))
+            for i in range(self.sizes["Invoices"])
+        ]
+        journals = [
+            self._journal(rng, new_id, i, rng.choice(invoices))
+            for i in range(self.sizes["Journals"])
+        ]
+        data = {"Contacts": contacts, "Invoices": invoices, "Journals": journals}
+        self._tenants[tenant_id] = data
+        return data
+
+    def _contact(self, rng, new_id, i):
+        name = f"{rng.choice(NAMES)} {rng.choice(SUFFIXES)} {i + 1}"
+        return {
+            "ContactID": new_id(),
+            "ContactNumber": f"C{i + 1:05}",
+            "ContactStatus": "ACTIVE",
+            "Name": name,
+            "EmailAddress": f"accounts{i + 1}@example.com",
+            "Addresses": [
+                {"AddressType": "POBOX", "City": "Wellington", "PostalCode": "6011"},
+                {"AddressType": "STREET"},
+            ],
+            "Phones": [
+                {
+                    "PhoneType": "DEFAULT",
+                    "PhoneNumber": f"{rng.randint(1000000, 9999999)}",
+                },
+                {"PhoneType": "MOBILE"},
+            ],
+            "UpdatedDateUTC": xero_date(START + datetime.timedelta(hours=i)),
+            "IsSupplier": rng.random() < 0.3,
+            "IsCustomer": rng.random() < 0.8,
+            "HasAttachments": False,
+        }
+
+    def _invoice(self, rng, new_id, i, contact):
+        date = START + datetime.timedelta(days=i // 5)
+        due_date = date + datetime.timedelta(days=30)
+        line_items = []
+        for _ in range(rng.randint(1, 8)):
+            account = rng.choice(ACCOUNTS[:4])
+            quantity = float(rng.randint(1, 10))
+            unit_amount = round(rng.uniform(5, 500), 2)
+            line_amount = round(quantity * unit_amount, 2)
+            line_items.append(
+                {
+                    "LineItemID": new_id(),
+                    "Description": f"{account[1]} item",
+                    "Quantity": quantity,
+                    "UnitAmount": unit_amount,
+                    "AccountCode": account[0],
+                    "TaxType": account[3],
+                    "TaxAmount": round(line_amount * TAX_RATE, 2),
+                    "LineAmount": line_amount,
+                    "Tracking": [],
+                }
+            )
+        sub_total = round(sum(item["LineAmount"] for item in line_items), 2)
+        total_tax = round(sum(item["TaxAmount"] for item in line_items), 2)
+        status = rng.choice(STATUSES)
+        paid = total_tax + sub_total if status == "PAID" else 0.0
+        return {
+            "Type": "ACCREC" if rng.random() < 0.7 else "ACCPAY",
+            "InvoiceID": new_id(),
+            "InvoiceNumber": f"INV-{i + 1:05}",
+            "Reference": f"Ref {rng.randint(1000, 9999)}",
+            "Contact": {"ContactID": contact["ContactID"], "Name": contact["Name"]},
+            "DateString": date.strftime("%Y-%m-%dT00:00:00"),
+            "Date": xero_date(date),
+            "DueDateString": due_date.strftime("%Y-%m-%dT00:00:00"),
+            "DueDate": xero_date(due_date),
+            "Status": status,
+            "LineAmountTypes": "Exclusive",
+            "LineItems": line_items,
+            "SubTotal": sub_total,
+            "TotalTax": total_tax,
+            "Total": round(sub_total + total_tax, 2),
+            "AmountDue": round(sub_total + total_tax - paid, 2),
+            "AmountPaid": round(paid, 2),
+            "CurrencyCode": "NZD",
+            "UpdatedDateUTC": xero_date(date + datetime.timedelta(hours=9)),
+            "HasAttachments": False,
+        }
+
+    def _journal(self, rng, new_id, i, invoice):
+        date = START + datetime.timedelta(days=i // 10)
+        net = invoice["SubTotal"]
+        tax = invoice["TotalTax"]
+        revenue, receivable, gst = ACCOUNTS[0], ACCOUNTS[4], ACCOUNTS[6]
+        lines = [
+            (receivable, net + tax, 0.0, "NONE"),
+            (revenue, -net, -tax, "OUTPUT"),
+            (gst, -tax, 0.0, "NONE"),
+        ]
+        return {
+            "JournalID": new_id(),
+            "JournalDate": xero_date(date),
+            "JournalNumber": i + 1,
+            "CreatedDateUTC": xero_date(date + datetime.timedelta(hours=9)),
+            "SourceID": invoice["InvoiceID"],
+            "SourceType": "ACCREC",
+            "JournalLines": [
+                {
+                    "JournalLineID": new_id(),
+                    "AccountID": str(uuid.UUID(int=int(code), version=4)),
+                    "AccountCode": code,
+                    "AccountType": account_type,
+                    "AccountName": name,
+                    "NetAmount": round(amount, 2),
+                    "GrossAmount": round(amount + tax_amount, 2),
+                    "TaxAmount": round(tax_amount, 2),
+                    "TaxType": tax_type,
+                }
+                for (code, name, account_type, _), amount, tax_amount, tax_type in lines
+            ],
+        }
@@ -1,26 +1,13 @@
 import os
-from urllib.parse import parse_qs
-
-import requests
-
-from xero.auth import OAuth2Credentials
+import time
 
+from .basemanager import XeroContent, XeroObject, XeroObjectList, XeroText
 from .constants import XERO_FILES_URL
-from .exceptions import (
-    XeroBadRequest,
-    XeroExceptionUnknown,
-    XeroForbidden,
-    XeroInternalError,
-    XeroNotAvailable,
-    XeroNotFound,
-    XeroNotImplemented,
-    XeroRateLimitExceeded,
-    XeroTenantIdNotSet,
-    XeroUnauthorized,
-    XeroUnsupportedMediaType,
-)
+from .pipeline import PRIORITIES, Pipeline, Request
+from .utils import decorate_methods
 
 
+@decorate_methods
 class FilesManager:
     DECORATED_METHODS = (
         "get",
@@ -37,14 +24,11 @@ class FilesManager:
         "get_content",
     )
 
-    def __init__(self, name, credentials):
+    def __init__(self, name, credentials, *, pipeline=None):
         self.credentials = credentials
         self.name = name
         self.base_url = credentials.base_url + XERO_FILES_URL
-
-        for method_name in self.DECORATED_METHODS:
-            method = getattr(self, f"_{method_name}")
-            setattr(self, method_name, self._get_data(method))
+        self.pipeline = Pipeline() if pipeline is None else pipeline
 
     def _get_results(self, data):
         response = data["Response"]
@@ -61,6 +45,22 @@ class FilesManager:
         if isinstance(result, dict) and self.singular in result:
             return result[self.singular]
 
+    def _decode_response(self, response):
+        # Delete will return a response code of 204 - No Content
+        if response.status_code == 204:
+            return XeroText("Deleted", response=response)
+
+        if response.headers["content-type"].startswith("application/json"):
+            data = response.json()
+            if isinstance(data, list):
+                return XeroObjectList(data, response=response)
+            if isinstance(data, dict):
+                return XeroObject(data, response=response)
+            return data
+        else:
+            # return a byte string without doing any Unicode conversions
+            return XeroContent(response.content, response=response)
+
     def _get_data(self, func):
         """This is the decorator for our DECORATED_METHODS.
 
@@ -69,71 +69,33 @@ class FilesManager:
         """
 
         def wrapper(*args, **kwargs):
+            timeout = kwargs.pop("timeout", None)
+            priority = kwargs.pop("priority", "default")
+            if priority not in PRIORITIES:
+                raise ValueError(f"Priority must be one of {PRIORITIES}.")
+
+            start = time.perf_counter()
             uri, params, method, body, headers, singleobject, files = func(
                 *args, **kwargs
             )
-            if headers is None:
-                headers = {}
-
-            if isinstance(self.credentials, OAuth2Credentials):
-                if self.credentials.tenant_id:
-                    headers["Xero-tenant-id"] = self.credentials.tenant_id
-                else:
-                    raise XeroTenantIdNotSet
+            serialized = time.perf_counter()
 
-            response = getattr(requests, method)(
+            request = Request(
+                method,
                 uri,
-                data=body,
-                headers=headers,
-                auth=self.credentials.oauth,
                 params=params,
+                body=body,
+                headers=headers,
                 files=files,
+                timeout=timeout,
+                credentials=self.credentials,
+                decoder=self._decode_response,
+                resource=self.name,
+                operation=func.__name__[1:],
+                priority=priority,
             )
-
-            if response.status_code == 200 or response.status_code == 201:
-                if response.headers["content-type"].startswith("application/json"):
-                    return response.json()
-                else:
-                    # return a byte string without doing any Unicode conversions
-                    return response.content
-
-            # Delete will return a response code of 204 - No Content
-            elif response.status_code == 204:
-                return "Deleted"
-
-            elif response.status_code == 400:
-                raise XeroBadRequest(response)
-
-            elif response.status_code == 401:
-                raise XeroUnauthorized(response)
-
-            elif response.status_code == 403:
-                raise XeroForbidden(response)
-
-            elif response.status_code == 404:
-                raise XeroNotFound(response)
-
-            elif response.status_code == 415:
-                raise XeroUnsupportedMediaType(response)
-
-            elif response.status_code == 500:
-                raise XeroInternalError(response)
-
-            elif response.status_code == 501:
-                raise XeroNotImplemented(response)
-
-            elif response.status_code == 503:
-                # Two 503 responses are possible. Rate limit errors
-                # return encoded content; offline errors don't.
-                # If you parse the response text and there's nothing
-                # encoded, it must be a not-available error.
-                payload = parse_qs(response.text)
-                if payload:
-                    raise XeroRateLimitExceeded(response, payload)
-                else:
-                    raise XeroNotAvailable(response)
-            else:
-                raise XeroExceptionUnknown(response)
+            request.add_timing("serialize", serialized - start)
+            return self.pipeline(request)
 
         return wrapper
 
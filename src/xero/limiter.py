@@ -0,0 +1,309 @@
+"""Share Xero's rate limits and daily quotas between processes and hosts.
+
+`RateLimit` and `Scheduler` only see the calls made by their own process, so
+several worker processes calling for the same tenant will together exceed
+Xero's limits. A `Limiter` is middleware that keeps its state in a backend
+shared by every process:
+
+* `MemoryBackend` for a single process;
+* `SQLiteBackend` for the processes on one host, using a SQLite database
+  (and its file locks);
+* `RedisBackend` for processes on several hosts, using a Redis server (or
+  anything that speaks its protocol).
+
+    >>> from xero.limiter import Limiter, SQLiteBackend
+    >>> limiter = Limiter(SQLiteBackend("/var/run/myapp/xero-limits.db"))
+    >>> xero = Xero(credentials, pipeline=Pipeline([limiter]))
+
+Backends hold two kinds of state: token buckets, which pace calls, and
+quota counters, which count calls in a fixed window (such as a day).
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import deadline
+from .exceptions import XeroQuotaExceeded
+
+DAY = 24 * 60 * 60
+
+# Release a Redis lock only if it is still held with the given token, in one
+# step, so a lock that expired and was taken by another process is left alone.
+RELEASE = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class Backend:
+    """Storage for token buckets and quota counters.
+
+    Every operation must be atomic across all the processes sharing the
+    backend. Times are seconds since the epoch, so they can be compared
+    between processes.
+    """
+
+    def take(self, key, rate, capacity, now):
+        """Take a token from the bucket `key`, which holds up to `capacity`
+        tokens and gains `rate` tokens a second.
+
+        Returns 0 if a token was taken; otherwise, nothing is taken, and the
+        number of seconds until a token will be available is returned.
+        """
+        raise NotImplementedError()
+
+    def spend(self, key, limit, period, now):
+        """Count a call against the quota `key`, which allows `limit` calls in
+        each `period` seconds (counted from the epoch).
+
+        Returns the number of calls left in the period, or None (and nothing
+        is counted) if the quota has been used up.
+        """
+        raise NotImplementedError()
+
+
+def refill(tokens, updated, rate, capacity, now):
+    """Take a token from a bucket in the given state; returns the new number
+    of tokens and the seconds to wait (0 if a token was taken)."""
+    if tokens is None:
+        tokens = capacity
+    else:
+        tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBackend(Backend):
+    """Buckets and quotas shared by the threads of a single process."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._quotas = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, now):
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            tokens, wait = refill(tokens, updated, rate, capacity, now)
+            self._buckets[key] = (tokens, now)
+            return wait
+
+    def spend(self, key, limit, period, now):
+        window = int(now // period)
+        with self._lock:
+            used = self._quotas.get(key)
+            used = used[1] if used is not None and used[0] == window else 0
+            if used >= limit:
+                return None
+            self._quotas[key] = (window, used + 1)
+            return limit - used - 1
+
+
+class SQLiteBackend(Backend):
+    """Buckets and quotas shared by the processes on a host, stored in the
+    SQLite database at `path`."""
+
+    def __init__(self, path, *, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS quotas "
+                "(key TEXT PRIMARY KEY, window INTEGER, used INTEGER)"
+            )
+
+    def __repr__(self):
+        return f"<SQLiteBackend {self.path}>"
+
+    def _transaction(self):
+        # SQLite connections can't be shared between threads.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+        return Transaction(db)
+
+    def take(self, key, rate, capacity, now):
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row or (None, now)
+            tokens, wait = refill(tokens, updated, rate, capacity, now)
+            db.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (key, tokens, now)
+            )
+            return wait
+
+    def spend(self, key, limit, period, now):
+        window = int(now // period)
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT window, used FROM quotas WHERE key = ?", (key,)
+            ).fetchone()
+            used = row[1] if row is not None and row[0] == window else 0
+            if used >= limit:
+                return None
+            db.execute(
+                "INSERT OR REPLACE INTO quotas VALUES (?, ?, ?)",
+                (key, window, used + 1),
+            )
+            return limit - used - 1
+
+
+class Transaction:
+    """An immediate transaction, which holds the database's write lock until
+    it is committed."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class RedisBackend(Backend):
+    """Buckets and quotas shared by processes on any number of hosts, stored
+    in Redis.
+
+    `client` is a `redis.Redis` (or compatible) client; only the GET, SET,
+    INCR, DECR, EXPIRE and EVAL commands are used. Keys are prefixed with
+    `prefix`. Each bucket is updated while holding a lock that expires after
+    `lock_timeout` seconds, in case its holder dies; the wait for the lock
+    backs off up to `max_lock_wait` seconds between attempts.
+    """
+
+    def __init__(
+        self,
+        client,
+        *,
+        prefix="xero:",
+        lock_timeout=5,
+        max_lock_wait=0.05,
+        sleep=time.sleep,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.max_lock_wait = max_lock_wait
+        self.sleep = sleep
+
+    def __repr__(self):
+        return f"<RedisBackend {self.prefix}>"
+
+    def take(self, key, rate, capacity, now):
+        key = self.prefix + key
+        lock = key + ":lock"
+        token = uuid.uuid4().hex
+        delay = 0.001
+        while not self.client.set(
+            lock, token, nx=True, px=int(self.lock_timeout * 1000)
+        ):
+            deadline.check(delay)
+            self.sleep(delay)
+            delay = min(delay * 2, self.max_lock_wait)
+        try:
+            state = self.client.get(key)
+            if state is None:
+                tokens, updated = None, now
+            else:
+                tokens, updated = (float(v) for v in _str(state).split())
+            tokens, wait = refill(tokens, updated, rate, capacity, now)
+            # The bucket expires once it would be full, which is the same as
+            # having no bucket.
+            self.client.set(key, f"{tokens} {now}", px=int(capacity / rate * 1000) + 1)
+            return wait
+        finally:
+            self.client.eval(RELEASE, 1, lock, token)
+
+    def spend(self, key, limit, period, now):
+        window = int(now // period)
+        key = f"{self.prefix}{key}:{window}"
+        used = self.client.incr(key)
+        if used == 1:
+            self.client.expire(key, int(period))
+        if used > limit:
+            self.client.decr(key)
+            return None
+        return limit - used
+
+
+def _str(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class Limiter:
+    """Limit the calls made for each tenant, and by the app, across every
+    process that shares the `backend`.
+
+    Calls are paced with token buckets holding up to `burst` calls; each
+    refills at a rate that keeps any 60 second window within `per_minute`
+    calls for each tenant, and `app_per_minute` calls for the app. A call
+    waits (with `sleep`) for a token. Calls for a tenant are also counted
+    against a quota of `per_day` calls each UTC day; once it is used up,
+    calls raise `XeroQuotaExceeded`. Any limit may be None, to not limit it.
+
+    A call is counted against the quota once it has been paced, so a call
+    that gives up waiting (at its deadline) isn't counted.
+    """
+
+    def __init__(
+        self,
+        backend,
+        per_minute=60,
+        per_day=5000,
+        app_per_minute=10000,
+        *,
+        burst=5,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.backend = backend
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.app_per_minute = app_per_minute
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+
+    def __repr__(self):
+        return f"<Limiter {self.backend!r}>"
+
+    def __call__(self, request, next):
+        tenant_id = request.tenant_id
+        for key, per_minute in [
+            (f"minute:{tenant_id}", self.per_minute),
+            ("app-minute", self.app_per_minute),
+        ]:
+            if per_minute is None:
+                continue
+            # A full bucket allows a burst on top of the calls it refills in
+            # a minute, so refill slower to stay within the limit.
+            capacity = min(self.burst, per_minute)
+            rate = max(per_minute - capacity, 1) / 60
+            while wait := self.backend.take(key, rate, capacity, self.clock()):
+                deadline.check(wait)
+                self.sleep(wait)
+                request.add_timing("queue", wait)
+
+        if self.per_day is not None:
+            now = self.clock()
+            if self.backend.spend(f"day:{tenant_id}", self.per_day, DAY, now) is None:
+                raise XeroQuotaExceeded(tenant_id, DAY - now % DAY)
+
+        return next(request)
@@ -0,0 +1,160 @@
+"""Collect metrics on the calls made to Xero, in the Prometheus text format.
+
+    >>> from xero.metrics import Collector
+    >>> metrics = Collector()
+    >>> metrics.install(xero)
+    >>> xero.invoices.filter(page=1)
+    >>> print(metrics.render())
+    # HELP xero_requests_total Calls made to the Xero API.
+    # TYPE xero_requests_total counter
+    xero_requests_total{manager="Invoices",method="filter",status="200"} 1
+    ...
+
+Serve `render()` (with a Content-Type of `CONTENT_TYPE`) from your
+application's metrics endpoint to have Prometheus scrape it.
+"""
+
+import threading
+from collections import Counter, defaultdict
+
+from .ratelimit import RateLimitState
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+RATE_LIMIT_HEADERS = {
+    "X-MinLimit-Remaining": "xero_rate_limit_minute_remaining",
+    "X-DayLimit-Remaining": "xero_rate_limit_day_remaining",
+}
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def labels(**values):
+    return ",".join(f'{name}="{escape(value)}"' for name, value in values.items())
+
+
+class Collector:
+    """Count the calls made through a pipeline, and how long they take.
+
+    Records:
+
+    * `xero_requests_total`: calls, by manager, method and response status;
+    * `xero_request_duration_seconds`: a histogram of the duration of calls,
+      by manager and method;
+    * `xero_errors_total`: failed calls, by manager, method and exception;
+    * `xero_rate_limit_minute_remaining` and `xero_rate_limit_day_remaining`:
+      the remaining calls last reported for each tenant, and
+      `xero_rate_limit_app_minute_remaining` for the app.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.requests = Counter()
+        self.errors = Counter()
+        self.durations = defaultdict(lambda: [[0] * len(self.buckets), 0.0, 0])
+        self.remaining = {}
+        self.app_remaining = None
+        self._lock = threading.Lock()
+
+    def install(self, api):
+        """Collect metrics on the calls made by `api` (e.g. a `Xero`), or any
+        other API sharing its pipeline."""
+        api.on_response(self.observe)
+        api.on_error(self.observe)
+
+    def observe(self, event):
+        """Record a "response" or "error" `xero.pipeline.Event`."""
+        key = (event.manager, event.method)
+        with self._lock:
+            self.requests[(*key, event.status)] += 1
+            if event.error is not None:
+                self.errors[(*key, type(event.error).__name__)] += 1
+
+            # Buckets are cumulative: each counts the calls no longer than it.
+            durations = self.durations[key]
+            for i, bound in enumerate(self.buckets):
+                if event.duration <= bound:
+                    durations[0][i] += 1
+            durations[1] += event.duration
+            durations[2] += 1
+
+            state = RateLimitState.from_headers(event.headers or {})
+            for name, value in [
+                ("xero_rate_limit_minute_remaining", state.minute_remaining),
+                ("xero_rate_limit_day_remaining", state.day_remaining),
+            ]:
+                if value is not None:
+                    self.remaining[(name, event.tenant_id)] = value
+            if state.app_minute_remaining is not None:
+                self.app_remaining = state.app_minute_remaining
+
+    def render(self):
+        """The metrics, in the Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("xero_requests_total", "counter", "Calls made to the Xero API.")
+            for (manager, method, status), value in sorted(
+                self.requests.items(), key=str
+            ):
+                label = labels(
+                    manager=manager,
+                    method=method,
+                    status="" if status is None else status,
+                )
+                lines.append(f"xero_requests_total{{{label}}} {value}")
+
+            family(
+                "xero_request_duration_seconds",
+                "histogram",
+                "The duration of calls to the Xero API.",
+            )
+            for (manager, method), (counts, total, count) in sorted(
+                self.durations.items(), key=str
+            ):
+                label = labels(manager=manager, method=method)
+                for bound, value in zip(self.buckets, counts, strict=True):
+                    lines.append(
+                        "xero_request_duration_seconds_bucket"
+                        f'{{{label},le="{bound}"}} {value}'
+                    )
+                lines.append(
+                    f'xero_request_duration_seconds_bucket{{{label},le="+Inf"}} {count}'
+                )
+                lines.append(f"xero_request_duration_seconds_sum{{{label}}} {total}")
+                lines.append(f"xero_request_duration_seconds_count{{{label}}} {count}")
+
+            family(
+                "xero_errors_total",
+                "counter",
+                "Failed calls to the Xero API, by exception.",
+            )
+            for (manager, method, exception), value in sorted(
+                self.errors.items(), key=str
+            ):
+                label = labels(manager=manager, method=method, exception=exception)
+                lines.append(f"xero_errors_total{{{label}}} {value}")
+
+            for header, name in RATE_LIMIT_HEADERS.items():
+                family(name, "gauge", f"The last {header} reported for each tenant.")
+                for (metric, tenant_id), value in sorted(
+                    self.remaining.items(), key=str
+                ):
+                    if metric == name:
+                        label = labels(tenant="" if tenant_id is None else tenant_id)
+                        lines.append(f"{name}{{{label}}} {value}")
+
+            if self.app_remaining is not None:
+                name = "xero_rate_limit_app_minute_remaining"
+                family(name, "gauge", "The last X-AppMinLimit-Remaining reported.")
+                lines.append(f"{name} {self.app_remaining}")
+
+        return "\n".join(lines) + "\n"
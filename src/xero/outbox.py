@@ -0,0 +1,416 @@
+"""A durable queue of writes to Xero, sent in batches in the background.
+
+Writing to Xero from a request handler makes the handler wait on Xero (and
+on its rate limits). An `Outbox` records the write in a local SQLite
+database and returns at once; a background thread sends the queued writes,
+many objects to a request, and records the result for each:
+
+    >>> xero = Xero(credentials, outbox="/var/lib/myapp/xero-outbox.db")
+    >>> xero.outbox.start()
+    >>> item_id = xero.outbox.enqueue("Invoices", invoice)
+    ...
+    >>> xero.outbox.get(item_id)
+    <Entry 1 Invoices sent>
+
+Writes are sent through the `Xero` object's pipeline (so its rate limiting
+middleware applies), at "background" priority, and each batch is sent with an
+idempotency key that is stored before the batch is first sent. A batch
+interrupted by a restart is sent again with the same key, so Xero won't apply
+it twice.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+import requests
+
+from .exceptions import (
+    XeroAccessDenied,
+    XeroBadRequest,
+    XeroBudgetExceeded,
+    XeroCircuitOpen,
+    XeroDeadlineExceeded,
+    XeroForbidden,
+    XeroInternalError,
+    XeroNotAvailable,
+    XeroNotVerified,
+    XeroQuotaExceeded,
+    XeroRateLimitExceeded,
+    XeroTenantIdNotSet,
+    XeroUnauthorized,
+)
+from .limiter import Transaction
+from .utils import generate_idempotency_key
+
+# Failures that may not happen if the batch is sent again later: Xero or the
+# network failing, limits, and credentials or settings that can be put right
+# (such as an expired token, once it has been refreshed)
+TRANSIENT = (
+    requests.ConnectionError,
+    requests.Timeout,
+    XeroAccessDenied,
+    XeroBudgetExceeded,
+    XeroCircuitOpen,
+    XeroDeadlineExceeded,
+    XeroForbidden,
+    XeroInternalError,
+    XeroNotAvailable,
+    XeroNotVerified,
+    XeroQuotaExceeded,
+    XeroRateLimitExceeded,
+    XeroTenantIdNotSet,
+    XeroUnauthorized,
+)
+
+# Xero's rejections of a batch, which sending it again won't change
+REJECTED = (XeroBadRequest,)
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+def dumps(data):
+    """Serialize a write, keeping its dates (which are sent in Xero's date
+    format) and decimals."""
+
+    def default(value):
+        if isinstance(value, datetime):
+            return {"$datetime": value.isoformat()}
+        if isinstance(value, date):
+            return {"$date": value.isoformat()}
+        if isinstance(value, Decimal):
+            return {"$decimal": str(value)}
+        raise TypeError(f"Can't queue a {type(value).__name__}")
+
+    return json.dumps(data, default=default)
+
+
+def loads(text):
+    def object_hook(obj):
+        if len(obj) == 1:
+            ((key, value),) = obj.items()
+            if key == "$datetime":
+                return datetime.fromisoformat(value)
+            if key == "$date":
+                return date.fromisoformat(value)
+            if key == "$decimal":
+                return Decimal(value)
+        return obj
+
+    return json.loads(text, object_hook=object_hook)
+
+
+class Entry:
+    """A write in the outbox, and (once sent) its result."""
+
+    def __init__(self, row):
+        (
+            self.id,
+            self.resource,
+            self.tenant_id,
+            self.method,
+            data,
+            self.status,
+            self.attempts,
+            result,
+            self.error,
+        ) = row
+        self.data = loads(data)
+        # The object returned by Xero
+        self.result = None if result is None else loads(result)
+
+    def __repr__(self):
+        return f"<Entry {self.id} {self.resource} {self.status}>"
+
+
+class Outbox:
+    """Queue writes to Xero in the SQLite database at `path`, to be sent by
+    `xero`, in batches of up to `batch_size` objects.
+
+    Writes are sent for the tenant of `xero`'s credentials; outboxes for
+    other tenants can share the database. After a transient failure (such as
+    a rate limit, or Xero being unavailable), a batch is sent again after a
+    delay that doubles from `backoff` seconds, up to `max_delay`. A batch
+    claimed by another process is sent again if it hasn't been sent within
+    `lease` seconds.
+    """
+
+    COLUMNS = "id, resource, tenant_id, method, data, status, attempts, result, error"
+
+    def __init__(
+        self,
+        xero,
+        path,
+        *,
+        batch_size=50,
+        interval=1.0,
+        backoff=1.0,
+        max_delay=300,
+        lease=300,
+        clock=time.time,
+        sleep=None,
+    ):
+        self.xero = xero
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.lease = lease
+        self.clock = clock
+        self._resources = {name.lower() for name in xero.OBJECT_LIST}
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._failures = 0
+        # By default, waits after a failure are cut short by `stop()`.
+        self.sleep = sleep or self._stopping.wait
+
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "resource TEXT NOT NULL, "
+                "tenant_id TEXT, "
+                "method TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "result TEXT, "
+                "error TEXT, "
+                "batch TEXT, "
+                "claimed REAL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_status "
+                "ON outbox (status, tenant_id, resource)"
+            )
+
+    def __repr__(self):
+        return f"<Outbox {self.path}>"
+
+    @property
+    def tenant_id(self):
+        return self.xero.tenant_id
+
+    def _transaction(self):
+        # SQLite connections can't be shared between threads.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None
+            )
+        return Transaction(db)
+
+    def enqueue(self, resource, data, *, method="save"):
+        """Queue `data` (an object, or a list of objects) to be written to
+        `resource` (e.g. "Invoices") with `method` ("save" or "put").
+
+        Returns the ID of the queued entry, or a list of IDs for a list.
+        """
+        if method not in ("save", "put"):
+            raise ValueError("Outboxes can only save or put objects.")
+        if resource.lower() not in self._resources:
+            raise ValueError(f"{resource!r} isn't a Xero object.")
+
+        objects = data if isinstance(data, list | tuple) else [data]
+        with self._transaction() as db:
+            ids = [
+                db.execute(
+                    "INSERT INTO outbox (resource, tenant_id, method, data, status) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (resource, self.tenant_id, method, dumps(obj), QUEUED),
+                ).lastrowid
+                for obj in objects
+            ]
+        self._wake.set()
+        return ids if isinstance(data, list | tuple) else ids[0]
+
+    def get(self, id):
+        """The `Entry` with the given ID, or None."""
+        with self._transaction() as db:
+            row = db.execute(
+                f"SELECT {self.COLUMNS} FROM outbox WHERE id = ?", (id,)
+            ).fetchone()
+        return None if row is None else Entry(row)
+
+    def pending(self):
+        """The number of writes for this outbox's tenant not yet sent."""
+        with self._transaction() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?) AND tenant_id IS ?",
+                (QUEUED, SENDING, self.tenant_id),
+            ).fetchone()[0]
+
+    def failed(self):
+        """The entries that Xero rejected."""
+        with self._transaction() as db:
+            rows = db.execute(
+                f"SELECT {self.COLUMNS} FROM outbox WHERE status = ? "
+                "AND tenant_id IS ? ORDER BY id",
+                (FAILED, self.tenant_id),
+            ).fetchall()
+        return [Entry(row) for row in rows]
+
+    def _claim(self):
+        """Claim the next batch to send: an unfinished batch whose lease has
+        expired, or the oldest queued writes for a resource. Returns its key
+        and entries."""
+        now = self.clock()
+        with self._transaction() as db:
+            row = db.execute(
+                "SELECT batch FROM outbox WHERE status = ? AND tenant_id IS ? "
+                "AND (claimed IS NULL OR claimed <= ?) ORDER BY id LIMIT 1",
+                (SENDING, self.tenant_id, now - self.lease),
+            ).fetchone()
+            if row is not None:
+                batch = row[0]
+            else:
+                row = db.execute(
+                    "SELECT resource, method FROM outbox WHERE status = ? "
+                    "AND tenant_id IS ? ORDER BY id LIMIT 1",
+                    (QUEUED, self.tenant_id),
+                ).fetchone()
+                if row is None:
+                    return None, []
+                batch = generate_idempotency_key()
+                db.execute(
+                    "UPDATE outbox SET status = ?, batch = ? WHERE id IN ("
+                    "SELECT id FROM outbox WHERE status = ? AND tenant_id IS ? "
+                    "AND resource = ? AND method = ? ORDER BY id LIMIT ?)",
+                    (SENDING, batch, QUEUED, self.tenant_id, *row, self.batch_size),
+                )
+
+            db.execute(
+                "UPDATE outbox SET claimed = ?, attempts = attempts + 1 "
+                "WHERE batch = ?",
+                (now, batch),
+            )
+            rows = db.execute(
+                f"SELECT {self.COLUMNS} FROM outbox WHERE batch = ? ORDER BY id",
+                (batch,),
+            ).fetchall()
+        return batch, [Entry(row) for row in rows]
+
+    def _release(self, batch, error):
+        """Release a batch to be sent again, with the same key."""
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE outbox SET claimed = NULL, status = ?, error = ? "
+                "WHERE batch = ?",
+                (SENDING, f"{type(error).__name__}: {error}", batch),
+            )
+
+    def drain(self):
+        """Send one batch of queued writes; returns the number of entries sent
+        (including any that Xero rejected).
+
+        Any other error than a transient failure, or Xero rejecting the batch,
+        is raised, and the batch is left to be sent again.
+        """
+        batch, entries = self._claim()
+        if not entries:
+            return 0
+
+        manager = getattr(self.xero, entries[0].resource.lower())
+        send = manager.save if entries[0].method == "save" else manager.put
+        try:
+            results = send(
+                [entry.data for entry in entries],
+                summarize_errors=False,
+                idempotency_key=batch,
+                priority="background",
+            )
+        except TRANSIENT as e:
+            self._failures += 1
+            self._release(batch, e)
+            delay = getattr(getattr(e, "rate_limit", None), "retry_after", None)
+            if delay is None:
+                delay = getattr(e, "retry_after", None)
+            if delay is None:
+                delay = self.backoff * 2 ** (self._failures - 1)
+            self.sleep(min(delay, self.max_delay))
+            return 0
+        except REJECTED as e:
+            # Xero rejected the whole batch.
+            self._failures = 0
+            with self._transaction() as db:
+                db.execute(
+                    "UPDATE outbox SET status = ?, error = ? WHERE batch = ?",
+                    (FAILED, f"{type(e).__name__}: {e}", batch),
+                )
+            return len(entries)
+        except Exception as e:
+            self._release(batch, e)
+            raise
+
+        self._failures = 0
+        results = list(results)
+        with self._transaction() as db:
+            for i, entry in enumerate(entries):
+                # Xero returns the objects in the order they were sent.
+                if i < len(results):
+                    result = results[i]
+                    errors = [
+                        error.get("Message", "")
+                        for error in result.get("ValidationErrors") or []
+                    ]
+                    failed = errors or result.get("StatusAttributeString") == "ERROR"
+                    error = "; ".join(errors) or None
+                else:
+                    result, failed, error = None, True, "Xero returned no result"
+                db.execute(
+                    "UPDATE outbox SET status = ?, result = ?, error = ? WHERE id = ?",
+                    (
+                        FAILED if failed else SENT,
+                        None if result is None else dumps(result),
+                        error,
+                        entry.id,
+                    ),
+                )
+        return len(entries)
+
+    def start(self):
+        """Start sending queued writes in a background thread.
+
+        The thread stops if `drain()` raises an error (which is reported by
+        `threading.excepthook`); unsent writes stay queued for the next start.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="xero-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the background thread, once it has finished any batch in
+        flight. Unsent writes stay queued for the next start."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            if not self.drain():
+                # Wait for more writes to be queued.
+                self._wake.wait(self.interval)
+                self._wake.clear()
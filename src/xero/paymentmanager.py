@@ -1,23 +1,38 @@
 from .basemanager import BaseManager
 from .constants import XERO_API_URL
-from .utils import resolve_user_agent, singular
+from .pipeline import Pipeline
+from .utils import make_object_hook, resolve_user_agent, singular
 
 
 class PaymentManager(BaseManager):
-    def __init__(self, name, credentials, unit_price_4dps=False, user_agent=None):
+    def __init__(
+        self,
+        name,
+        credentials,
+        unit_price_4dps=False,
+        user_agent=None,
+        *,
+        retain_responses=True,
+        intern_fields=None,
+        pipeline=None,
+        record_timings=False,
+        auto_idempotency=False,
+    ):
         self.credentials = credentials
         self.name = name
         self.base_url = credentials.base_url + XERO_API_URL
         self.extra_params = {"unitdp": 4} if unit_price_4dps else {}
         self.singular = singular(name)
+        self.retain_responses = retain_responses
+        self.record_timings = record_timings
+        self.auto_idempotency = auto_idempotency
+        self.pipeline = Pipeline() if pipeline is None else pipeline
+        if intern_fields is not None:
+            self.object_hook = make_object_hook(intern_fields)
         self.user_agent = resolve_user_agent(
             user_agent, getattr(credentials, "user_agent", None)
         )
 
-        for method_name in self.DECORATED_METHODS:
-            method = getattr(self, f"_{method_name}")
-            setattr(self, method_name, self._get_data(method))
-
     def _delete(self, id):
         uri = "/".join([self.base_url, self.name, id])
         data = {"Status": "DELETED"}
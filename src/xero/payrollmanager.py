@@ -2,11 +2,24 @@ import requests
 
 from .basemanager import BaseManager
 from .constants import XERO_PAYROLL_URL
-from .utils import singular
+from .pipeline import Pipeline
+from .utils import make_object_hook, singular
 
 
 class PayrollManager(BaseManager):
-    def __init__(self, name, credentials, unit_price_4dps=False, user_agent=None):
+    def __init__(
+        self,
+        name,
+        credentials,
+        unit_price_4dps=False,
+        user_agent=None,
+        *,
+        retain_responses=True,
+        intern_fields=None,
+        pipeline=None,
+        record_timings=False,
+        auto_idempotency=False,
+    ):
         from xero import __version__ as VERSION
 
         self.credentials = credentials
@@ -14,12 +27,14 @@ class PayrollManager(BaseManager):
         self.base_url = credentials.base_url + XERO_PAYROLL_URL
         self.extra_params = {"unitdp": 4} if unit_price_4dps else {}
         self.singular = singular(name)
+        self.retain_responses = retain_responses
+        self.record_timings = record_timings
+        self.auto_idempotency = auto_idempotency
+        self.pipeline = Pipeline() if pipeline is None else pipeline
+        if intern_fields is not None:
+            self.object_hook = make_object_hook(intern_fields)
 
         if user_agent is None:
             self.user_agent = f"pyxero/{VERSION} " + requests.utils.default_user_agent()
         else:
             self.user_agent = user_agent
-
-        for method_name in self.DECORATED_METHODS:
-            method = getattr(self, f"_{method_name}")
-            setattr(self, method_name, self._get_data(method))
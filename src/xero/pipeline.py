@@ -0,0 +1,771 @@
+"""The request pipeline shared by the Accounting, Files, Payroll and Projects APIs.
+
+Every API call is described by a `Request`, which is passed through a chain
+of middleware before it is sent. A middleware is a callable that takes the
+request, and a `next` callable that passes the request on to the rest of the
+chain; it returns whatever `next` returns (possibly after inspecting or
+replacing it):
+
+    def log(request, next):
+        print(request)
+        return next(request)
+
+A `Pipeline` always starts with `decode` (which maps error statuses to
+exceptions, and decodes successful responses) and `authenticate` (which adds
+the credentials and tenant to the request); any other middleware runs between
+those and the transport (see `xero.transport`) that sends the request.
+`RateLimit`, `AdaptiveConcurrency`, `Retry`, `CircuitBreaker`, `Cache` and
+`Metrics` are provided, but are opt-in.
+
+Hooks registered with `Pipeline.on()` are called with an `Event` when a
+request is sent, when a call succeeds or fails, and when a request is retried.
+"""
+
+import datetime
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from functools import partial
+from urllib.parse import parse_qs, urlencode, urlsplit
+from xml.parsers.expat import ExpatError
+
+import requests
+
+from . import budget, deadline
+from .auth import OAuth2Credentials
+from .exceptions import (
+    XeroBadRequest,
+    XeroCircuitOpen,
+    XeroExceptionUnknown,
+    XeroForbidden,
+    XeroInternalError,
+    XeroNotAvailable,
+    XeroNotFound,
+    XeroNotImplemented,
+    XeroRateLimitExceeded,
+    XeroTenantIdNotSet,
+    XeroUnauthorized,
+    XeroUnsupportedMediaType,
+)
+from .ratelimit import RateLimitState
+from .transport import RequestsTransport
+
+# Priority classes for requests, highest first
+PRIORITIES = ("interactive", "default", "background")
+
+
+class Request:
+    """A request to one of the Xero APIs, on its way through a pipeline.
+
+    `credentials` are used by `authenticate` to set `auth` and the tenant
+    header; `decoder` is called by `decode` to turn a successful response into
+    the result of the API call. `resource` is the name of the object being
+    operated on (e.g. "Invoices"). `priority` is one of `PRIORITIES`;
+    middleware that queues requests sends higher priorities first.
+    """
+
+    def __init__(
+        self,
+        method,
+        uri,
+        *,
+        params=None,
+        body=None,
+        headers=None,
+        files=None,
+        timeout=None,
+        stream=False,
+        credentials=None,
+        decoder=None,
+        resource=None,
+        operation=None,
+        priority="default",
+    ):
+        self.method = method
+        self.uri = uri
+        self.params = params
+        self.body = body
+        self.headers = {} if headers is None else headers
+        self.files = files
+        self.timeout = timeout
+        self.stream = stream
+        self.credentials = credentials
+        self.decoder = decoder
+        self.resource = resource
+        self.operation = operation
+        self.priority = priority
+        self.auth = None
+        self.pipeline = None
+        self.started = time.perf_counter()
+        # The latest response received for the request
+        self.response = None
+        # The seconds spent in each phase of the request
+        self.timings = {}
+
+    def add_timing(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def __repr__(self):
+        return f"<Request {self.method.upper()} {self.uri}>"
+
+    @property
+    def tenant_id(self):
+        return self.headers.get("Xero-tenant-id")
+
+
+def content_length(body):
+    """The number of bytes a request body will be sent as, if known."""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if isinstance(body, bytes):
+        return len(body)
+    if isinstance(body, dict):
+        return len(urlencode(body, doseq=True))
+    return None
+
+
+class Event:
+    """What has happened to a request, as passed to the hooks.
+
+    `manager` is the name of the manager (e.g. "Invoices") and `method` the
+    name of the manager method (e.g. "filter" or "save"); `http_method` is
+    the method of the request itself. `timings` maps each phase of the request
+    ("serialize", "network" and "decode", amongst others) to the seconds spent
+    in it so far; network time includes any retries, and `duration` is the
+    time since the call was made. `headers` are the headers of the latest
+    response. `error`, `attempt` and `delay` are only set for the events that
+    they apply to.
+    """
+
+    def __init__(self, request, *, error=None, attempt=None, delay=None):
+        response = request.response
+        self.manager = request.resource
+        self.method = request.operation
+        self.http_method = request.method
+        self.uri = request.uri
+        self.tenant_id = request.tenant_id
+        self.status = None if response is None else response.status_code
+        self.headers = None if response is None else response.headers
+        self.bytes_sent = content_length(request.body)
+        self.bytes_received = None
+        if response is not None:
+            if request.stream:
+                length = response.headers.get("Content-Length")
+                self.bytes_received = None if length is None else int(length)
+            else:
+                self.bytes_received = len(response.content)
+        self.timings = dict(request.timings)
+        self.duration = (
+            time.perf_counter() - request.started + self.timings.get("serialize", 0.0)
+        )
+        self.error = error
+        self.attempt = attempt
+        self.delay = delay
+
+    def __repr__(self):
+        return f"<Event {self.manager}.{self.method} {self.status}>"
+
+
+def raise_for_status(response):
+    """Raise the Xero exception that corresponds to an unsuccessful response."""
+    status_code = response.status_code
+    if status_code in (200, 201, 204):
+        return
+
+    elif status_code == 400:
+        try:
+            raise XeroBadRequest(response)
+        except (ValueError, ExpatError) as e:
+            raise XeroExceptionUnknown(
+                response, msg="Unable to parse Xero API response"
+            ) from e
+
+    elif status_code == 401:
+        raise XeroUnauthorized(response)
+
+    elif status_code == 403:
+        raise XeroForbidden(response)
+
+    elif status_code == 404:
+        raise XeroNotFound(response)
+
+    elif status_code == 415:
+        raise XeroUnsupportedMediaType(response)
+
+    elif status_code == 429:
+        limit_reason = response.headers.get("X-Rate-Limit-Problem") or "unknown"
+        payload = {
+            "oauth_problem": ["rate limit exceeded: " + limit_reason],
+            "oauth_problem_advice": [
+                "please wait before retrying the xero api, "
+                "the limit exceeded is: " + limit_reason
+            ],
+        }
+        raise XeroRateLimitExceeded(response, payload)
+
+    elif status_code == 500:
+        raise XeroInternalError(response)
+
+    elif status_code == 501:
+        raise XeroNotImplemented(response)
+
+    elif status_code == 503:
+        # Two 503 responses are possible. Rate limit errors
+        # return encoded content; offline errors don't.
+        # If you parse the response text and there's nothing
+        # encoded, it must be a not-available error.
+        payload = parse_qs(response.text)
+        if payload:
+            raise XeroRateLimitExceeded(response, payload)
+        else:
+            raise XeroNotAvailable(response)
+    else:
+        raise XeroExceptionUnknown(response)
+
+
+def retry_after(response):
+    """The number of seconds a response asks us to wait, or None."""
+    try:
+        return max(0.0, float(response.headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def decode(request, next):
+    """Raise an exception for an unsuccessful response, or return the result of
+    the request's decoder."""
+    response = next(request)
+    request.response = response
+    raise_for_status(response)
+    if request.decoder is None:
+        return response
+    start = time.perf_counter()
+    try:
+        return request.decoder(response)
+    finally:
+        request.add_timing("decode", time.perf_counter() - start)
+
+
+def authenticate(request, next):
+    """Add the request's credentials, and the tenant for OAuth2 credentials."""
+    credentials = request.credentials
+    if isinstance(credentials, OAuth2Credentials):
+        if credentials.tenant_id:
+            request.headers["Xero-tenant-id"] = credentials.tenant_id
+        else:
+            raise XeroTenantIdNotSet
+    if credentials is not None:
+        request.auth = credentials.oauth
+    return next(request)
+
+
+EVENTS = ("request", "response", "error", "retry")
+
+
+class Pipeline:
+    """A chain of middleware, ending in a transport that sends the request.
+
+    `middleware` runs, in order, after `decode` and `authenticate`. The
+    transport defaults to a `RequestsTransport`.
+    """
+
+    def __init__(self, middleware=(), transport=None):
+        self.middleware = [decode, authenticate, *middleware]
+        self.transport = RequestsTransport() if transport is None else transport
+        self.hooks = {event: [] for event in EVENTS}
+        # The headers of the latest response for each tenant
+        self._latest_headers = {}
+
+    def __repr__(self):
+        names = [getattr(m, "__name__", type(m).__name__) for m in self.middleware]
+        return f"<Pipeline {' -> '.join(names)}>"
+
+    def __call__(self, request):
+        request.pipeline = self
+        try:
+            budget.check(request)
+            result = self._call(0, request)
+        except Exception as error:
+            self.emit("error", request, error=error)
+            raise
+        self.emit("response", request)
+        return result
+
+    @property
+    def rate_limits(self):
+        """The `RateLimitState` last reported for each tenant."""
+        return {
+            tenant_id: RateLimitState.from_headers(headers)
+            for tenant_id, headers in list(self._latest_headers.items())
+        }
+
+    def on(self, event, callback):
+        """Call `callback` with an `Event` whenever `event` happens:
+
+        * "request": a request is about to be sent (including retries);
+        * "response": a call has succeeded;
+        * "error": a call has failed, with the exception as `error`;
+        * "retry": a request is about to be retried by `Retry`.
+
+        Returns the callback, so this can be used as a decorator.
+        """
+        if event not in self.hooks:
+            raise ValueError(f"Unknown event {event!r}; expected one of {EVENTS}")
+        self.hooks[event].append(callback)
+        return callback
+
+    def emit(self, event, request, **kwargs):
+        """Call the hooks registered for `event`."""
+        hooks = self.hooks[event]
+        if hooks:
+            event = Event(request, **kwargs)
+            for hook in hooks:
+                hook(event)
+
+    def _call(self, index, request):
+        if index == len(self.middleware):
+            return self._send(request)
+        return self.middleware[index](request, partial(self._call, index + 1))
+
+    def _send(self, request):
+        deadline.check()
+        request.timeout = deadline.timeout(request.timeout)
+        budget.charge(request)
+        self.emit("request", request)
+        start = time.perf_counter()
+        try:
+            request.response = self.transport.send(request)
+        finally:
+            network = time.perf_counter() - start
+            request.add_timing("network", network)
+        self._latest_headers[request.tenant_id] = request.response.headers
+
+        # Split the network time into the wait for the response headers, and
+        # the time spent downloading the body (which is none, if streamed).
+        elapsed = getattr(request.response, "elapsed", None)
+        if isinstance(elapsed, datetime.timedelta):
+            ttfb = min(elapsed.total_seconds(), network)
+            request.add_timing("ttfb", ttfb)
+            request.add_timing("download", network - ttfb)
+        return request.response
+
+
+class RateLimit:
+    """Delay requests so that no more than `per_minute` are sent for any tenant
+    in any 60 second window.
+
+    Xero allows 60 calls per minute for each tenant; waiting locally is cheaper
+    than a 429 response and the Retry-After it imposes. A request doesn't take
+    a place in the window that a waiting request of a higher priority needs.
+    """
+
+    def __init__(self, per_minute=60, *, clock=time.monotonic, sleep=time.sleep):
+        self.per_minute = per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._sent = defaultdict(deque)
+        # The requests waiting for each tenant, by priority
+        self._waiting = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def __call__(self, request, next):
+        waiting = self._waiting[request.tenant_id]
+        higher = PRIORITIES[: PRIORITIES.index(request.priority)]
+        queued = False
+        try:
+            while True:
+                with self._lock:
+                    if queued:
+                        waiting[request.priority] -= 1
+                        queued = False
+                    now = self.clock()
+                    sent = self._sent[request.tenant_id]
+                    while sent and sent[0] <= now - 60:
+                        sent.popleft()
+                    ahead = sum(waiting[priority] for priority in higher)
+                    if len(sent) + ahead < self.per_minute:
+                        sent.append(now)
+                        break
+                    # Wait for the requests ahead of this one to be sent, and
+                    # for the window to have room for it too.
+                    index = len(sent) + ahead - self.per_minute
+                    delay = (sent[index] if index < len(sent) else now) + 60 - now
+                    waiting[request.priority] += 1
+                    queued = True
+                deadline.check(delay)
+                self.sleep(delay)
+                request.add_timing("queue", delay)
+        finally:
+            if queued:
+                with self._lock:
+                    waiting[request.priority] -= 1
+
+        return next(request)
+
+
+class Retry:
+    """Retry requests that fail with a transient error.
+
+    Requests are retried after a connection error or timeout, or a response
+    with one of `statuses`, up to `retries` times. The delay between attempts
+    doubles from `backoff` seconds, unless the response specifies a
+    Retry-After, and is capped at `max_delay`. Only `methods` are retried; by
+    default that is GET, because other requests may not be safe to repeat.
+    Requests with an Idempotency-Key are also retried, unless `keyed` is
+    False, because Xero applies a key's request only once. A request isn't
+    retried if the delay would take it past its deadline.
+    """
+
+    def __init__(
+        self,
+        retries=3,
+        *,
+        backoff=0.5,
+        max_delay=60,
+        methods=("get",),
+        keyed=True,
+        statuses=(429, 503),
+        sleep=time.sleep,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.methods = methods
+        self.keyed = keyed
+        self.statuses = statuses
+        self.sleep = sleep
+
+    def __call__(self, request, next):
+        if request.method not in self.methods and not (
+            self.keyed and "Idempotency-Key" in request.headers
+        ):
+            return next(request)
+
+        for attempt in range(self.retries + 1):
+            final = attempt == self.retries
+            delay = self.backoff * 2**attempt
+            error = response = None
+            try:
+                response = next(request)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in self.statuses:
+                    return response
+                delay = retry_after(response) or delay
+
+            delay = min(delay, self.max_delay)
+            if final or not deadline.allows(delay):
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            # Send the whole of a file body again.
+            if hasattr(request.body, "seek"):
+                request.body.seek(0)
+            if request.pipeline is not None:
+                request.pipeline.emit(
+                    "retry", request, error=error, attempt=attempt + 1, delay=delay
+                )
+            self.sleep(delay)
+
+
+class AdaptiveConcurrency:
+    """Limit the requests in flight for each tenant, adapting the limit to the
+    responses that come back.
+
+    Each tenant starts with `initial` requests in flight. The limit grows by
+    `increase` for each limit's worth of successful responses whose latency is
+    steady, if the tenant's minute allowance has room for more; it is
+    multiplied by `decrease` after a 429 or 503 response, a connection error
+    or timeout, or a response that took more than `spike` times the recent
+    average. The limit stays between `min_limit` and `max_limit`; Xero allows
+    5 concurrent requests per tenant.
+    """
+
+    def __init__(
+        self,
+        initial=1,
+        *,
+        min_limit=1,
+        max_limit=5,
+        increase=1.0,
+        decrease=0.5,
+        spike=2.0,
+        clock=time.perf_counter,
+    ):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.spike = spike
+        self.clock = clock
+        self._tenants = {}
+        self._condition = threading.Condition()
+
+    @property
+    def limits(self):
+        """The current limit for each tenant."""
+        with self._condition:
+            return {tenant: state.limit for tenant, state in self._tenants.items()}
+
+    def __call__(self, request, next):
+        with self._condition:
+            state = self._tenants.get(request.tenant_id)
+            if state is None:
+                state = self._tenants[request.tenant_id] = _ConcurrencyState(
+                    self.initial
+                )
+            while state.in_flight >= int(state.limit):
+                deadline.check()
+                self._condition.wait(deadline.remaining())
+            state.in_flight += 1
+
+        start = self.clock()
+        response = None
+        # Only a response, or a failure to get one, says anything about how
+        # loaded Xero is; a call refused locally (e.g. by a budget) doesn't.
+        failed = False
+        try:
+            response = next(request)
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            failed = True
+            raise
+        finally:
+            latency = self.clock() - start
+            with self._condition:
+                state.in_flight -= 1
+                if response is not None or failed:
+                    self._adjust(state, start, latency, response)
+                self._condition.notify_all()
+
+    def _adjust(self, state, start, latency, response):
+        overloaded = response is None or response.status_code in (429, 503)
+        spiked = state.latency is not None and latency > self.spike * state.latency
+        if overloaded or spiked:
+            # Only back off once for the requests that were already in flight
+            # when the overload was detected.
+            if start >= state.decreased_at:
+                state.limit = max(self.min_limit, state.limit * self.decrease)
+                state.decreased_at = self.clock()
+        else:
+            headroom = RateLimitState.from_headers(response.headers).minute_remaining
+            if headroom is None or headroom > state.limit:
+                state.limit = min(
+                    self.max_limit, state.limit + self.increase / state.limit
+                )
+
+        if not overloaded:
+            # An exponentially weighted moving average of the latency
+            if state.latency is None:
+                state.latency = latency
+            else:
+                state.latency += 0.2 * (latency - state.latency)
+
+
+class _ConcurrencyState:
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.latency = None
+        self.decreased_at = float("-inf")
+
+
+def outage(response):
+    """Does a response show that Xero is down, rather than rate limited?"""
+    if response.status_code in (500, 502, 504):
+        return True
+    if response.status_code == 503:
+        # Rate limited responses explain the problem; outages don't.
+        return not (
+            response.headers.get("X-Rate-Limit-Problem") or parse_qs(response.text)
+        )
+    return False
+
+
+class CircuitBreaker:
+    """Fail fast, rather than wait on a Xero host that is down.
+
+    The breaker for each host starts closed. After `failures` consecutive
+    connection errors, timeouts or outage responses (500, 502, 504, or a 503
+    that isn't a rate limit), it opens, and requests to the host raise
+    `XeroCircuitOpen` without being sent. After `reset` seconds it is half
+    open: up to `probes` requests are let through, and it closes if they all
+    succeed, or opens again if any fails.
+
+    Put it after `Retry` in the pipeline, so each attempt is counted and
+    retries stop once the breaker opens.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failures=5, reset=30, *, probes=1, clock=time.monotonic):
+        self.failures = failures
+        self.reset = reset
+        self.probes = probes
+        self.clock = clock
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def states(self):
+        """The state of the breaker for each host."""
+        with self._lock:
+            return {host: self._state(breaker) for host, breaker in self._hosts.items()}
+
+    def _state(self, breaker):
+        if breaker.opened_at is None:
+            return self.CLOSED
+        if self.clock() - breaker.opened_at < self.reset:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def __call__(self, request, next):
+        host = urlsplit(request.uri).netloc
+        with self._lock:
+            breaker = self._hosts.get(host)
+            if breaker is None:
+                breaker = self._hosts[host] = _Breaker()
+            state = self._state(breaker)
+            if state == self.HALF_OPEN and breaker.probing >= self.probes:
+                state = self.OPEN
+            if state == self.OPEN:
+                retry_after = max(0.0, breaker.opened_at + self.reset - self.clock())
+                raise XeroCircuitOpen(host, retry_after)
+            if state == self.HALF_OPEN:
+                breaker.probing += 1
+
+        # None if the request failed for some other reason (such as a budget)
+        failed = None
+        try:
+            response = next(request)
+            failed = outage(response)
+            return response
+        except (requests.ConnectionError, requests.Timeout):
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._record(breaker, state, failed)
+
+    def _record(self, breaker, state, failed):
+        if state == self.HALF_OPEN:
+            breaker.probing -= 1
+            if failed is None:
+                pass
+            elif failed:
+                breaker.opened_at = self.clock()
+                breaker.passed = 0
+            else:
+                breaker.passed += 1
+                if breaker.passed >= self.probes:
+                    breaker.opened_at = None
+                    breaker.passed = 0
+                    breaker.failed = 0
+        elif breaker.opened_at is None and failed is not None:
+            # A request sent while closed; ignore any that finish after the
+            # breaker has opened.
+            breaker.failed = breaker.failed + 1 if failed else 0
+            if breaker.failed >= self.failures:
+                breaker.opened_at = self.clock()
+                breaker.failed = 0
+
+
+class _Breaker:
+    def __init__(self):
+        # Consecutive failures while closed
+        self.failed = 0
+        # When the breaker last opened; None while closed
+        self.opened_at = None
+        # Probes in flight, and probes that have succeeded, while half open
+        self.probing = 0
+        self.passed = 0
+
+
+class Cache:
+    """Cache successful GET responses for `ttl` seconds.
+
+    Up to `max_entries` responses are kept, for each distinct URI, set of
+    parameters, tenant and Accept header. A request with any other method
+    clears the cached responses for its tenant, as it may have changed them.
+    Streamed requests aren't cached.
+    """
+
+    def __init__(self, ttl=60, max_entries=256, *, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, request, next):
+        if request.method != "get":
+            self.invalidate(request.tenant_id)
+            return next(request)
+        if request.stream:
+            return next(request)
+
+        key = (
+            request.tenant_id,
+            request.uri,
+            urlencode(sorted((request.params or {}).items()), doseq=True),
+            request.headers.get("Accept"),
+        )
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, response = entry
+                if expires > self.clock():
+                    self._entries.move_to_end(key)
+                    return response
+                del self._entries[key]
+
+        response = next(request)
+        if response.status_code == 200:
+            # Read the body now, so the cached response can be decoded again.
+            response.content  # noqa: B018
+            with self._lock:
+                self._entries[key] = (self.clock() + self.ttl, response)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return response
+
+    def invalidate(self, tenant_id=None):
+        """Discard the cached responses for `tenant_id`."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == tenant_id]:
+                del self._entries[key]
+
+
+class Metrics:
+    """Count the requests sent for each resource, method and status, and the
+    time spent waiting for their responses.
+
+    Requests that fail without a response are counted with a status of None.
+    """
+
+    def __init__(self, *, clock=time.perf_counter):
+        self.clock = clock
+        self.requests = Counter()
+        self.seconds = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, request, next):
+        status = None
+        start = self.clock()
+        try:
+            response = next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = self.clock() - start
+            with self._lock:
+                self.requests[request.resource, request.method, status] += 1
+                self.seconds[request.resource, request.method] += elapsed
@@ -0,0 +1,49 @@
+import http.server
+import threading
+from urllib.parse import parse_qs, urlparse
+
+
+class PKCEAuthReceiver(http.server.BaseHTTPRequestHandler):
+    """This is an http request processor for server running on localhost, used by the
+    PKCE auth system. Xero will redirect the browser after auth, from which we can
+    collect the token Xero provides.
+
+    You can subclass this and override the `send_error_page` and `send_access_ok`
+    methods to customise the success and failure pages displayed in the browser.
+    """
+
+    def __init__(self, credmanager, *args, **kwargs):
+        self.credmanager = credmanager
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def close_server(s):
+        s.shutdown()
+
+    def do_GET(self, *args):
+        request = urlparse(self.path)
+        params = parse_qs(request.query)
+
+        if request.path == "/callback":
+            self.credmanager.verify_url(params, self)
+        else:
+            self.send_error_page("Unknown endpoint")
+
+    def send_error_page(self, error):
+        """Display an Error page.
+
+        Override this for a custom page.
+        """
+        print("Error:", error)
+
+    def send_access_ok(self):
+        """Display a success page" Override this to provide a custom page."""
+        print("LOGIN SUCCESS")
+        self.shutdown()
+
+    def shutdown(self):
+        """Start shutdowning our server and return immediately."""
+        # Launch a thread to close our socket cleanly.
+        threading.Thread(
+            target=self.__class__.close_server, args=(self.server,)
+        ).start()
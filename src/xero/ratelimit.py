@@ -0,0 +1,66 @@
+"""The state of Xero's rate limits, as reported with each response."""
+
+
+class RateLimitState:
+    """The rate limit allowances remaining, as reported by a response.
+
+    Each allowance is None if the response didn't report it. `retry_after` is
+    the number of seconds to wait before retrying a rate limited request, and
+    `problem` the limit that was exceeded ("minute", "day", "appminute" or
+    "concurrent").
+    """
+
+    def __init__(
+        self,
+        minute_remaining=None,
+        day_remaining=None,
+        app_minute_remaining=None,
+        retry_after=None,
+        problem=None,
+    ):
+        self.minute_remaining = minute_remaining
+        self.day_remaining = day_remaining
+        self.app_minute_remaining = app_minute_remaining
+        self.retry_after = retry_after
+        self.problem = problem
+
+    def __repr__(self):
+        return (
+            f"<RateLimitState minute={self.minute_remaining} "
+            f"day={self.day_remaining} app_minute={self.app_minute_remaining}>"
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, RateLimitState):
+            return NotImplemented
+        return vars(self) == vars(other)
+
+    def __hash__(self):
+        return hash(tuple(vars(self).values()))
+
+    @classmethod
+    def from_headers(cls, headers):
+        """Parse the rate limit headers of a response."""
+        return cls(
+            minute_remaining=_int_header(headers, "X-MinLimit-Remaining"),
+            day_remaining=_int_header(headers, "X-DayLimit-Remaining"),
+            app_minute_remaining=_int_header(headers, "X-AppMinLimit-Remaining"),
+            retry_after=_int_header(headers, "Retry-After"),
+            problem=headers.get("X-Rate-Limit-Problem"),
+        )
+
+    @property
+    def exhausted(self):
+        """Has any of the allowances been used up?"""
+        return 0 in (
+            self.minute_remaining,
+            self.day_remaining,
+            self.app_minute_remaining,
+        )
+
+
+def _int_header(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
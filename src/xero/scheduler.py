@@ -0,0 +1,202 @@
+"""Share Xero's rate limits fairly between the tenants of an app.
+
+Xero limits the calls made for each tenant (60 a minute, 5 at a time), and
+the calls made by the app across all of its tenants (10,000 a minute). A
+`Scheduler` is middleware that queues requests until they can be sent within
+those limits, and sends them in weighted fair order: while tenants are
+competing for the app's allowance, each gets a share in proportion to its
+weight, however many requests it has queued. A backfill for one tenant can't
+starve the calls made for every other tenant.
+
+Requests of a higher priority (see `xero.pipeline.PRIORITIES`) are sent
+before any of a lower priority, and `reserve` keeps some of each tenant's
+allowance for interactive requests, so they aren't held up behind a
+backfill that has used the rest:
+
+    >>> xero.invoices.save(invoice, priority="interactive")
+
+To be effective, every `Xero` object in the process should use the same
+scheduler; `shared()` returns one for the process:
+
+    >>> from xero.pipeline import Pipeline
+    >>> from xero.scheduler import shared
+    >>> xero = Xero(credentials, pipeline=Pipeline([shared()]))
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+from . import deadline
+from .exceptions import XeroDeadlineExceeded
+from .pipeline import PRIORITIES
+
+
+class Scheduler:
+    """Queue requests until they can be sent within the per-tenant and app-wide
+    limits, and send them in weighted fair order between tenants.
+
+    Each tenant has a weight (1, unless set with `weights` or `set_weight()`);
+    a tenant with twice the weight of another gets twice as many requests sent
+    while both have requests queued. Higher priority requests are sent first;
+    `reserve` of each tenant's concurrent requests and requests per minute
+    can only be used by interactive requests.
+    """
+
+    def __init__(
+        self,
+        per_minute=60,
+        concurrent=5,
+        app_per_minute=10000,
+        *,
+        weights=None,
+        reserve=0,
+        clock=time.monotonic,
+    ):
+        self.per_minute = per_minute
+        self.concurrent = concurrent
+        self.app_per_minute = app_per_minute
+        self.reserve = reserve
+        self.clock = clock
+        self._weights = dict(weights or {})
+        self._tenants = {}
+        self._app_sent = deque()
+        self._waiting = []
+        self._virtual_time = 0.0
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return f"<Scheduler {len(self._waiting)} waiting>"
+
+    def set_weight(self, tenant_id, weight):
+        """Set the share of the app's allowance a tenant gets, relative to
+        other tenants."""
+        with self._condition:
+            self._weights[tenant_id] = weight
+
+    @property
+    def waiting(self):
+        """The number of requests waiting to be sent."""
+        return len(self._waiting)
+
+    def __call__(self, request, next):
+        start = self.clock()
+        tenant = self._acquire(request)
+        request.add_timing("queue", self.clock() - start)
+        try:
+            return next(request)
+        finally:
+            with self._condition:
+                tenant.in_flight -= 1
+                self._condition.notify_all()
+
+    def _acquire(self, request):
+        with self._condition:
+            tenant = self._tenants.get(request.tenant_id)
+            if tenant is None:
+                tenant = self._tenants[request.tenant_id] = _Tenant()
+
+            # Start-time fair queueing: each request is tagged with the
+            # virtual time at which it would start if every tenant were
+            # served in proportion to its weight, and requests are sent in
+            # order of their tags.
+            weight = self._weights.get(request.tenant_id, 1)
+            tag = max(self._virtual_time, tenant.finish)
+            tenant.finish = tag + 1 / weight
+            ticket = _Ticket(
+                (PRIORITIES.index(request.priority), tag, next(self._order)),
+                tenant,
+                0 if request.priority == "interactive" else self.reserve,
+            )
+            self._waiting.append(ticket)
+
+            while True:
+                now = self.clock()
+                self._expire(now)
+                next_ticket = self._next_ticket()
+                if next_ticket is ticket:
+                    break
+                if next_ticket is not None:
+                    # Another request can go; make sure it isn't asleep.
+                    self._condition.notify_all()
+                try:
+                    deadline.check()
+                except XeroDeadlineExceeded:
+                    self._waiting.remove(ticket)
+                    raise
+                wait = self._wait_time(now)
+                remaining = deadline.remaining()
+                if remaining is not None:
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._condition.wait(wait)
+
+            self._waiting.remove(ticket)
+            self._virtual_time = max(self._virtual_time, tag)
+            tenant.sent.append(now)
+            tenant.in_flight += 1
+            self._app_sent.append(now)
+            # The next request in line may now be able to go.
+            self._condition.notify_all()
+            return tenant
+
+    def _expire(self, now):
+        for sent in [self._app_sent, *(t.sent for t in self._tenants.values())]:
+            while sent and sent[0] <= now - 60:
+                sent.popleft()
+
+    def _next_ticket(self):
+        """The first waiting request that can be sent now."""
+        if len(self._app_sent) >= self.app_per_minute:
+            return None
+        for ticket in sorted(self._waiting, key=lambda t: t.key):
+            tenant = ticket.tenant
+            if (
+                tenant.in_flight < self.concurrent - ticket.reserve
+                and len(tenant.sent) < self.per_minute - ticket.reserve
+            ):
+                return ticket
+        return None
+
+    def _wait_time(self, now):
+        """How long until a minute window moves on; None if waiting for a
+        request in flight to finish."""
+        windows = [self._app_sent] if len(self._app_sent) >= self.app_per_minute else []
+        windows.extend(
+            t.tenant.sent
+            for t in self._waiting
+            if len(t.tenant.sent) >= self.per_minute - t.reserve
+        )
+        if not windows:
+            return None
+        return max(0.0, min(sent[0] + 60 - now for sent in windows))
+
+
+class _Tenant:
+    def __init__(self):
+        self.sent = deque()
+        self.in_flight = 0
+        self.finish = 0.0
+
+
+class _Ticket:
+    def __init__(self, key, tenant, reserve):
+        self.key = key
+        self.tenant = tenant
+        # The tenant's allowance that this request can't use
+        self.reserve = reserve
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    """The scheduler shared by every `Xero` object in the process that uses
+    it."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Scheduler()
+        return _shared
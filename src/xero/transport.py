@@ -0,0 +1,132 @@
+"""Transports send the requests that come out of a `xero.pipeline.Pipeline`.
+
+A transport is any object with a `send(request)` method that returns a
+`requests.Response` (or an object with the same interface), and a `close()`
+method that releases any resources it holds.
+"""
+
+import datetime
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class Transport:
+    """The base class for transports."""
+
+    def send(self, request):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Send requests with `requests`.
+
+    If a `requests.Session` is provided, requests are sent with it, so
+    connections are reused between requests; otherwise each request uses the
+    module-level `requests` functions.
+    """
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def send(self, request):
+        kwargs = {}
+        if request.files is not None:
+            kwargs["files"] = request.files
+
+        return getattr(self.session or requests, request.method)(
+            request.uri,
+            data=request.body,
+            headers=request.headers,
+            auth=request.auth,
+            params=request.params,
+            timeout=request.timeout,
+            stream=request.stream,
+            **kwargs,
+        )
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class CoroutineTransport(Transport):
+    """Send requests with a coroutine function that you supply, e.g. one built
+    on an asyncio HTTP client.
+
+    This is a bridge, not an asynchronous client: the pipeline is still
+    synchronous, and `send` blocks the calling thread until the coroutine
+    finishes. `send` is called with the request, and must return a
+    `requests.Response` (`make_response` can build one). The coroutines run on
+    an event loop in a background thread, so every thread using the transport
+    shares the loop, and any connection pool that the coroutine function uses.
+    """
+
+    def __init__(self, send):
+        self._send = send
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    # asyncio is imported when it's used, as importing it takes longer than
+    # importing the rest of the package.
+
+    @property
+    def loop(self):
+        """The event loop the coroutines run on; started on first use."""
+        import asyncio
+
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="xero-coroutine-transport",
+                    daemon=True,
+                )
+                self._thread.start()
+            return self._loop
+
+    def send(self, request):
+        import asyncio
+
+        future = asyncio.run_coroutine_threadsafe(self._send(request), self.loop)
+        return future.result()
+
+    async def send_async(self, request):
+        """Send a request from a coroutine running on any event loop, without
+        the pipeline's middleware."""
+        import asyncio
+
+        future = asyncio.run_coroutine_threadsafe(self._send(request), self.loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+
+def make_response(
+    status_code, content=b"", headers=None, *, url=None, reason=None, elapsed=None
+):
+    """Build a `requests.Response` from its parts, e.g. in a transport that
+    doesn't use `requests`."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = "utf-8"
+    response.elapsed = elapsed or datetime.timedelta()
+    response._content = content.encode("utf-8") if isinstance(content, str) else content
+    response._content_consumed = True
+    return response
@@ -1,18 +1,29 @@
 import datetime
+import functools
 import re
 import sys
 import uuid
+from sys import intern
 
 import requests
 
-DATE = re.compile(
-    r"^(\/Date\((?P<timestamp>-?\d+)((?P<offset_h>[-+]\d\d)(?P<offset_m>\d\d))?\)\/)"
-    r"|"
-    r"((?P<year>\d{4})-(?P<month>[0-2]\d)-0?(?P<day>[0-3]\d)"
+TIMESTAMP_DATE = re.compile(
+    r"\/Date\((?P<timestamp>-?\d+)((?P<offset_h>[-+]\d\d)(?P<offset_m>\d\d))?\)\/"
+)
+ISO_DATE = re.compile(
+    r"(?P<year>\d{4})-(?P<month>[0-2]\d)-0?(?P<day>[0-3]\d)"
     r"T"
-    r"(?P<hour>[0-5]\d):(?P<minute>[0-5]\d):(?P<second>[0-6]\d))$"
+    r"(?P<hour>[0-5]\d):(?P<minute>[0-5]\d):(?P<second>[0-6]\d)$"
 )
 
+if sys.version_info < (3, 11):
+    EPOCH = datetime.datetime(1970, 1, 1)
+else:
+    EPOCH = datetime.datetime.fromtimestamp(0, datetime.UTC)
+
+# The number of distinct date strings that parse_date remembers.
+DATE_CACHE_SIZE = 4096
+
 OBJECT_NAMES = {
     "Addresses": "Address",
     "Attachments": "Attachment",
@@ -73,6 +84,28 @@ OBJECT_NAMES = {
     "Quotes": "Quote",
 }
 
+# Fields whose values are drawn from a small set of possibilities (enumerations,
+# codes, and the IDs of objects that are referenced over and over). These values
+# are interned when a response is decoded, so that every occurrence shares a
+# single string.
+INTERNED_FIELDS = (
+    "AccountCode",
+    "AccountID",
+    "AddressType",
+    "BrandingThemeID",
+    "Class",
+    "ContactID",
+    "ContactStatus",
+    "CurrencyCode",
+    "LineAmountTypes",
+    "PhoneType",
+    "Status",
+    "TaxType",
+    "TrackingCategoryID",
+    "TrackingOptionID",
+    "Type",
+)
+
 
 def isplural(word):
     return word in OBJECT_NAMES.keys()
@@ -84,47 +117,46 @@ def singular(word):
 
 def parse_date(string, force_datetime=False):
     """Takes a Xero formatted date, e.g. /Date(1426849200000+1300)/"""
-    matches = DATE.match(string)
+    # Most strings in a response aren't dates; reject them without
+    # touching the regexes or the cache.
+    if string.startswith("/Date(") or string[4:5] == "-":
+        return _parse_date(string, force_datetime)
+    return None
+
+
+@functools.lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date(string, force_datetime):
+    matches = TIMESTAMP_DATE.match(string)
+    if matches:
+        timestamp, _, offset_h, offset_m = matches.groups()
+        # Sometimes Xero returns Date(0+0000). Return None for this case
+        if not int(timestamp):
+            return None
+
+        # The offset is applied as signed hours, plus (always positive)
+        # minutes; work in whole milliseconds to avoid float rounding.
+        milliseconds = int(timestamp)
+        if offset_h:
+            milliseconds += int(offset_h) * 3600000 + int(offset_m) * 60000
+        return EPOCH + datetime.timedelta(milliseconds=milliseconds)
+
+    matches = ISO_DATE.match(string)
     if not matches:
         return None
 
-    values = {
-        k: v if v[0] in "+-" else int(v)
-        for k, v in matches.groupdict().items()
-        if v and int(v)
-    }
-
-    if "timestamp" in values:
-        if sys.version_info < (3, 11):
-            value = datetime.datetime.utcfromtimestamp(0) + datetime.timedelta(
-                hours=int(values.get("offset_h", 0)),
-                minutes=int(values.get("offset_m", 0)),
-                seconds=int(values["timestamp"]) / 1000.0,
-            )
-        else:
-            value = datetime.datetime.fromtimestamp(
-                0, datetime.UTC
-            ) + datetime.timedelta(
-                hours=int(values.get("offset_h", 0)),
-                minutes=int(values.get("offset_m", 0)),
-                seconds=int(values["timestamp"]) / 1000.0,
-            )
-        return value
-
-    # I've made an assumption here, that a DateTime value will not
-    # ever be YYYY-MM-DDT00:00:00, which is probably bad. I'm not
-    # really sure how to handle this, other than to hard-code the
-    # names of the field that are actually Date rather than DateTime.
-    if len(values) > 3 or force_datetime:
-        return datetime.datetime(**values)
-
-    # Sometimes Xero returns Date(0+0000), so we end up with no
-    # values. Return None for this case
-    if not values:
+    year, month, day, hour, minute, second = map(int, matches.groups())
+    try:
+        # I've made an assumption here, that a DateTime value will not
+        # ever be YYYY-MM-DDT00:00:00, which is probably bad. I'm not
+        # really sure how to handle this, other than to hard-code the
+        # names of the field that are actually Date rather than DateTime.
+        if hour or minute or second or force_datetime:
+            return datetime.datetime(year, month, day, hour, minute, second)
+        return datetime.date(year, month, day)
+    except ValueError:
+        # Out of range values, e.g. 0000-00-00T00:00:00
         return None
 
-    return datetime.date(**values)
-
 
 def json_load_object_hook(dct):
     """Hook for json.parse(...) to parse Xero date formats."""
@@ -137,6 +169,77 @@ def json_load_object_hook(dct):
     return dct
 
 
+def make_object_hook(intern_fields=INTERNED_FIELDS):
+    """Build a hook for json.parse(...) that parses Xero date formats, and interns
+    repeated strings.
+
+    The keys of every object, and the values of `intern_fields`, are interned,
+    so a page of objects shares a single copy of each; values of `intern_fields`
+    aren't parsed as dates. If there are no fields to intern, this is the same
+    as `json_load_object_hook`.
+    """
+    if not intern_fields:
+        return json_load_object_hook
+
+    intern_fields = frozenset(intern_fields)
+
+    def object_hook(dct):
+        interned = {}
+        for key, value in dct.items():
+            key = intern(key)
+            if isinstance(value, str):
+                if key in intern_fields:
+                    value = intern(value)
+                else:
+                    value = parse_date(value) or value
+            interned[key] = value
+        return interned
+
+    return object_hook
+
+
+class DecoratedMethod:
+    """A descriptor exposing a manager's `_<name>` method, wrapped by the
+    manager's `_get_data` decorator.
+
+    The wrapper is built the first time it is accessed on an instance, and
+    cached on that instance. If `objects` is given, the method is only
+    available on managers whose name is one of `objects`.
+    """
+
+    def __init__(self, name, objects=None):
+        self.name = name
+        self.objects = objects
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        if self.objects is not None and instance.name not in self.objects:
+            raise AttributeError(
+                f"{type(instance).__name__!r} object for {instance.name!r} "
+                f"has no attribute {self.name!r}"
+            )
+        method = instance._get_data(getattr(instance, f"_{self.name}"))
+        instance.__dict__[self.name] = method
+        return method
+
+
+def decorate_methods(cls):
+    """Class decorator that installs a `DecoratedMethod` for each of the class's
+    DECORATED_METHODS and OBJECT_DECORATED_METHODS."""
+    for method_name in cls.DECORATED_METHODS:
+        setattr(cls, method_name, DecoratedMethod(method_name))
+
+    objects = {}
+    for name, method_names in getattr(cls, "OBJECT_DECORATED_METHODS", {}).items():
+        for method_name in method_names:
+            objects.setdefault(method_name, set()).add(name)
+    for method_name, names in objects.items():
+        setattr(cls, method_name, DecoratedMethod(method_name, frozenset(names)))
+
+    return cls
+
+
 def resolve_user_agent(user_agent, default_override=None):
     from xero import __version__ as VERSION
 
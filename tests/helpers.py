@@ -21,3 +21,16 @@ def assertXMLEqual(test_case, xml1, xml2, message=""):
     d1, d2 = tuple(map(xml_to_dict, cleaned))
 
     test_case.assertEqual(d1, d2, message)
+
+
+class FakeClock:
+    """A clock that only moves when it is told to, or slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import Mock
+
+from xero import Xero
+from xero.manager import Manager
+from xero.paymentmanager import PaymentManager
+
+
+class XeroTest(unittest.TestCase):
+    def setUp(self):
+        self.credentials = Mock(base_url="", user_agent=None)
+
+    def test_managers_are_lazy(self):
+        """Managers are created on first access, and then reused."""
+        xero = Xero(self.credentials, user_agent="test-agent")
+        self.assertNotIn("invoices", vars(xero))
+
+        invoices = xero.invoices
+        self.assertIsInstance(invoices, Manager)
+        self.assertEqual(invoices.name, "Invoices")
+        self.assertEqual(invoices.user_agent, "test-agent")
+        self.assertIs(xero.invoices, invoices)
+
+        self.assertIsInstance(xero.payments, PaymentManager)
+        self.assertIn("contacts", dir(xero))
+
+        with self.assertRaises(AttributeError):
+            xero.widgets  # noqa: B018
+
+    def test_sub_apis_are_lazy(self):
+        xero = Xero(self.credentials, unit_price_4dps=True)
+        self.assertNotIn("payrollAPI", vars(xero))
+
+        self.assertIs(xero.payrollAPI, xero.payrollAPI)
+        self.assertEqual(xero.payrollAPI.employees.extra_params, {"unitdp": 4})
+        self.assertEqual(xero.filesAPI.files.name, "Files")
+        self.assertEqual(xero.projectsAPI.projects.name, "Projects")
+
+    def test_object_decorated_methods(self):
+        """Object-specific methods are only available on their managers."""
+        xero = Xero(self.credentials)
+
+        self.assertTrue(callable(xero.invoices.email))
+        self.assertIs(xero.invoices.email, xero.invoices.email)
+        self.assertTrue(callable(xero.creditnotes.put_allocation))
+        self.assertFalse(hasattr(xero.contacts, "email"))
+        self.assertFalse(hasattr(xero.invoices, "put_allocation"))
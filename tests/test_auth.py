@@ -1,4 +1,6 @@
 import json
+import subprocess
+import sys
 import time
 import unittest
 from datetime import datetime, timedelta
@@ -805,3 +807,34 @@ class PKCECallbackHandlerTests(unittest.TestCase):
             },
             self.handler,
         )
+
+
+class DeferredImportTests(unittest.TestCase):
+    def test_heavy_modules_are_not_imported(self):
+        """OAuth1, PKCE and XML machinery isn't loaded by a plain `import xero`."""
+        deferred = [
+            "requests_oauthlib",
+            "oauthlib",
+            "http.server",
+            "webbrowser",
+            "xml.dom.minidom",
+            "xml.etree.ElementTree",
+        ]
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, xero; "
+                f"print([name for name in {deferred!r} if name in sys.modules])",
+            ],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+
+        self.assertEqual(output.strip(), "[]")
+
+    def test_pkce_receiver_is_importable(self):
+        from xero.pkce import PKCEAuthReceiver as Receiver
+
+        self.assertIs(PKCEAuthReceiver, Receiver)
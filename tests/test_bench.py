@@ -0,0 +1,116 @@
+import io
+import os
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from xero import Xero
+from xero.bench import load
+from xero.bench.simulator import Simulator
+from xero.budget import Budget
+from xero.exceptions import XeroBudgetExceeded, XeroCircuitOpen
+from xero.fake import FakeXero
+
+
+@patch.dict(os.environ, {"OAUTHLIB_INSECURE_TRANSPORT": "1"})
+class SimulatorTest(unittest.TestCase):
+    def setUp(self):
+        self.simulator = Simulator(FakeXero(contacts=10, invoices=120)).start()
+        self.addCleanup(self.simulator.stop)
+
+    def test_serves_api(self):
+        xero = Xero(load.credentials(self.simulator.url, "tenant"))
+
+        invoices = xero.invoices.filter(page=2)
+        self.assertEqual(len(invoices), 20)
+        self.assertEqual(invoices.response.headers["X-MinLimit-Remaining"], "59")
+
+        contact = xero.contacts.put({"Name": "New"})[0]
+        self.assertEqual(xero.contacts.get(contact["ContactID"])[0]["Name"], "New")
+
+    def test_load(self):
+        result = load.run(
+            "backfill",
+            self.simulator.url,
+            tenants=2,
+            workers=2,
+            middleware=load.middleware(retry=True),
+        )
+
+        # Two pages of invoices and six of journals, for each tenant.
+        self.assertEqual(result["requests"], 16)
+        self.assertEqual(result["errors"], 0)
+        self.assertLessEqual(result["p50"], result["p99"])
+
+        report = io.StringIO()
+        load.report([result], file=report)
+        self.assertIn("backfill", report.getvalue())
+
+    def test_load_without_memory(self):
+        result = load.run("fan-out", self.simulator.url, tenants=1, memory=False)
+
+        self.assertEqual(result["requests"], 3)
+        self.assertIsNone(result["peak_memory"])
+        report = io.StringIO()
+        load.report([result], file=report)
+        self.assertTrue(report.getvalue().rstrip().endswith("-"))
+
+    def test_workers_share_tasks(self):
+        """Each batch is a task of its own, so one tenant's batches are saved
+        by several workers at once."""
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def count(request, next):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            try:
+                return next(request)
+            finally:
+                with lock:
+                    in_flight[0] -= 1
+
+        self.simulator.fake.latency = 0.05
+        result = load.run(
+            "bulk-save",
+            self.simulator.url,
+            tenants=1,
+            workers=4,
+            middleware=[count],
+            options={"batches": 4},
+        )
+
+        self.assertEqual(result["requests"], 5)
+        self.assertGreater(peak[0], 1)
+        self.assertGreater(result["peak_memory"], 0)
+
+    def test_load_rate_limited(self):
+        self.simulator.fake.MINUTE_LIMIT = 2
+        result = load.run("fan-out", self.simulator.url, tenants=2, workers=2)
+
+        self.assertEqual(result["requests"], 6)
+        self.assertEqual(result["rate_limited"], 2)
+
+
+class CallTest(unittest.TestCase):
+    def test_errors(self):
+        """Failed calls return None, rather than ending the workload."""
+        for error in [
+            requests.ConnectionError(),
+            requests.Timeout(),
+            XeroBudgetExceeded(Budget(0)),
+            XeroCircuitOpen("api.xero.com", 30),
+        ]:
+            self.assertIsNone(load.call(Mock(side_effect=error)))
+        self.assertEqual(load.call(Mock(return_value=[1])), [1])
+
+
+class PercentileTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(load.percentile(values, 50), 51)
+        self.assertEqual(load.percentile(values, 99), 99)
+        self.assertIsNone(load.percentile([], 50))
@@ -0,0 +1,119 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from xero import Xero
+from xero.budget import budget
+from xero.exceptions import XeroBudgetExceeded, XeroException
+from xero.fake import FakeXero
+from xero.limiter import DAY, Limiter, MemoryBackend
+from xero.pipeline import Pipeline, RateLimit, Request, Retry
+from xero.transport import make_response
+
+
+class BudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = Mock(send=Mock(return_value=make_response(200)))
+        self.pipeline = Pipeline(transport=self.transport)
+
+    def call(self, tenant_id="a", operation="filter"):
+        request = Request(
+            "get",
+            "uri",
+            headers={"Xero-tenant-id": tenant_id},
+            resource="Invoices",
+            operation=operation,
+        )
+        return self.pipeline(request)
+
+    def test_budget(self):
+        with budget(3) as limit:
+            self.call(operation="filter")
+            self.call(operation="filter")
+            self.assertTrue(limit.allows(1))
+            self.assertFalse(limit.allows(2))
+            self.call(operation="get")
+            with self.assertRaises(XeroBudgetExceeded) as cm:
+                self.call()
+
+        self.assertIs(cm.exception.budget, limit)
+        self.assertIsInstance(cm.exception, XeroException)
+        self.assertEqual(limit.spent, {"Invoices.filter": 2, "Invoices.get": 1})
+        self.assertEqual(limit.calls, 3)
+        self.assertEqual(limit.remaining, 0)
+        self.assertEqual(self.transport.send.call_count, 3)
+
+        # Calls outside the block aren't limited.
+        self.call()
+        self.assertEqual(limit.calls, 3)
+
+    def test_tenant(self):
+        with budget(1, tenant="a") as limit:
+            self.call("a")
+            self.call("b")
+            with self.assertRaises(XeroBudgetExceeded):
+                self.call("a")
+        self.assertEqual(limit.calls, 1)
+
+    def test_nested(self):
+        """Nested budgets all apply, and a call refused by one isn't counted
+        by any."""
+        with budget(3) as outer:
+            self.call()
+            with budget(1) as inner:
+                self.call()
+                with self.assertRaises(XeroBudgetExceeded):
+                    self.call()
+            self.call()
+        self.assertEqual((outer.calls, inner.calls), (3, 1))
+
+    def test_retries(self):
+        """Each attempt counts."""
+        self.transport.send.side_effect = [
+            requests.ConnectionError(),
+            make_response(200),
+        ]
+        self.pipeline = Pipeline([Retry(sleep=Mock())], transport=self.transport)
+        with budget(5) as limit:
+            self.call()
+        self.assertEqual(limit.calls, 2)
+
+    def test_refused_before_middleware(self):
+        """A call that a budget will refuse doesn't wait for a rate limit, or
+        use up a quota, first."""
+        sleep = Mock()
+        limiter = Limiter(MemoryBackend(), per_minute=1, per_day=5, sleep=sleep)
+        self.pipeline = Pipeline(
+            [RateLimit(1, sleep=sleep), limiter], transport=self.transport
+        )
+        with budget(1):
+            self.call()
+            with self.assertRaises(XeroBudgetExceeded):
+                self.call()
+
+        sleep.assert_not_called()
+        self.assertEqual(limiter.backend.spend("day:a", 5, DAY, time.time()), 3)
+
+    def test_threads(self):
+        """Budgets don't apply to other threads, which have their own
+        context."""
+        with budget(1) as limit:
+            thread = threading.Thread(target=self.call, daemon=True)
+            thread.start()
+            thread.join()
+            self.call()
+        self.assertEqual(limit.calls, 1)
+
+    def test_api(self):
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        xero = Xero(credentials, transport=FakeXero(invoices=5))
+
+        with xero.budget(max_calls=2) as limit:
+            xero.invoices.all()
+            xero.contacts.filter(page=1)
+            with self.assertRaises(XeroBudgetExceeded):
+                xero.invoices.all()
+        self.assertEqual(limit.spent, {"Invoices.all": 1, "Contacts.filter": 1})
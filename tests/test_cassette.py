@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from xero import Xero
+from xero.cassette import Cassette, CassetteError
+from xero.fake import FakeXero
+from xero.transport import make_response
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cassette.jsonl")
+        self.credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+
+    def test_record_and_replay(self):
+        fake = FakeXero(latency=0.25, sleep=Mock())
+        recorder = Cassette(self.path, "record", transport=fake)
+        xero = Xero(self.credentials, transport=recorder)
+        invoices = xero.invoices.filter(page=2)
+        contact = xero.contacts.get(invoices[0]["Contact"]["ContactID"])
+        recorder.close()
+
+        sleep = Mock()
+        player = Cassette(self.path, timing=True, sleep=sleep)
+        xero = Xero(self.credentials, transport=player)
+        self.assertEqual(xero.invoices.filter(page=2), invoices)
+        self.assertEqual(xero.contacts.get(contact[0]["ContactID"]), contact)
+        # Each response takes as long as the original did.
+        sleep.assert_called_with(0.25)
+        self.assertEqual(sleep.call_count, 2)
+
+        with self.assertRaises(CassetteError):
+            xero.invoices.filter(page=3)
+        self.assertEqual(sum(fake.requests.values()), 2)
+
+    def test_responses_replayed_in_order(self):
+        transport = Mock()
+        transport.send.side_effect = [
+            make_response(200, b"first"),
+            make_response(200, b"\x89PNG"),
+        ]
+        recorder = Cassette(self.path, "record", transport=transport)
+        request = Mock(method="get", uri="https://x/a", params=None, tenant_id="t")
+        request.headers = {}
+        recorder.send(request)
+        recorder.send(request)
+        recorder.close()
+
+        player = Cassette(self.path)
+        self.assertEqual(player.send(request).content, b"first")
+        self.assertEqual(player.send(request).content, b"\x89PNG")
+        # The last response is repeated.
+        self.assertEqual(player.send(request).content, b"\x89PNG")
+
+    def test_credentials_redacted(self):
+        transport = Mock()
+        transport.send.return_value = make_response(
+            200, b"{}", {"Set-Cookie": "session=secret", "Content-Type": "text/json"}
+        )
+        recorder = Cassette(self.path, "record", transport=transport)
+        request = Mock(method="get", uri="https://x/a", params=None, tenant_id="t")
+        request.headers = {"Authorization": "Bearer secret", "Accept": "text/json"}
+        recorder.send(request)
+        recorder.close()
+
+        with open(self.path) as f:
+            contents = f.read()
+        self.assertNotIn("secret", contents)
+        entry = json.loads(contents)
+        self.assertEqual(entry["request"]["headers"]["Accept"], "text/json")
+        self.assertEqual(entry["response"]["headers"]["Set-Cookie"], "REDACTED")
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            Cassette(self.path, "rewind")
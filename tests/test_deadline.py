@@ -0,0 +1,129 @@
+import threading
+import unittest
+from unittest.mock import Mock
+
+import requests
+
+from xero import Xero
+from xero.deadline import deadline, remaining, timeout
+from xero.exceptions import (
+    XeroDeadlineExceeded,
+    XeroException,
+    XeroRateLimitExceeded,
+)
+from xero.fake import FakeXero
+from xero.pipeline import Pipeline, RateLimit, Request, Retry
+from xero.scheduler import Scheduler
+from xero.transport import make_response
+
+from .helpers import FakeClock
+
+
+class DeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.timeouts = []
+        self.responses = []
+
+    def send(self, request):
+        self.timeouts.append(request.timeout)
+        self.clock.now += 1
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return make_response(200)
+
+    def call(self, middleware=(), timeout=None):
+        pipeline = Pipeline(middleware, transport=Mock(send=self.send))
+        return pipeline(Request("get", "uri", timeout=timeout))
+
+    def test_timeout(self):
+        """Each request's timeout is reduced to the time remaining."""
+        with deadline(5, clock=self.clock) as limit:
+            self.call()
+            self.call(timeout=10)
+            self.call(timeout=1)
+            self.call(timeout=(10, 1))
+            self.assertEqual(limit.remaining, 1)
+            self.call()
+            with self.assertRaises(XeroDeadlineExceeded) as cm:
+                self.call()
+        self.assertIs(cm.exception.deadline, limit)
+        self.assertIsInstance(cm.exception, XeroException)
+        self.assertIsInstance(cm.exception, TimeoutError)
+        self.assertEqual(self.timeouts, [5, 4, 1, (2, 1), 1])
+
+        # Calls outside the block have no deadline.
+        self.call()
+        self.assertIsNone(self.timeouts[-1])
+        self.assertIsNone(remaining())
+        self.assertEqual(timeout(3), 3)
+
+    def test_nested(self):
+        """A nested deadline can shorten the time remaining, not extend it."""
+        with deadline(5, clock=self.clock):
+            with deadline(10, clock=self.clock) as inner:
+                self.assertEqual(inner.remaining, 5)
+            with deadline(2, clock=self.clock) as inner:
+                self.assertEqual(inner.remaining, 2)
+            self.assertEqual(remaining(), 5)
+
+    def test_retry(self):
+        """A request isn't retried if the delay would pass the deadline; the
+        last failure is reported instead."""
+        retry = Retry(backoff=1, sleep=self.clock.sleep)
+        self.responses = [
+            make_response(429),
+            make_response(429, headers={"Retry-After": "10"}),
+        ]
+        with deadline(5, clock=self.clock):
+            with self.assertRaises(XeroRateLimitExceeded):
+                self.call([retry])
+        self.assertEqual(len(self.timeouts), 2)
+
+        self.responses = [requests.ConnectionError(), requests.ConnectionError()]
+        with deadline(3, clock=self.clock):
+            with self.assertRaises(requests.ConnectionError):
+                self.call([retry])
+        self.assertEqual(len(self.timeouts), 4)
+
+    def test_rate_limit(self):
+        """Waiting for a rate limit that would outlast the deadline fails
+        immediately."""
+        rate_limit = RateLimit(1, clock=self.clock, sleep=self.clock.sleep)
+        with deadline(30, clock=self.clock):
+            self.call([rate_limit])
+            with self.assertRaises(XeroDeadlineExceeded):
+                self.call([rate_limit])
+        self.assertEqual(self.clock.now, 1)
+
+    def test_scheduler(self):
+        """A queued request is cancelled when its deadline passes."""
+        scheduler = Scheduler(concurrent=1)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def send(request):
+            release.wait()
+            return make_response(200)
+
+        pipeline = Pipeline([scheduler], transport=Mock(send=send))
+        thread = threading.Thread(target=pipeline, args=(Request("get", "a"),))
+        thread.daemon = True
+        thread.start()
+
+        with deadline(0.05):
+            with self.assertRaises(XeroDeadlineExceeded):
+                pipeline(Request("get", "b"))
+        self.assertEqual(scheduler.waiting, 0)
+        release.set()
+        thread.join()
+
+    def test_api(self):
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        xero = Xero(credentials, transport=FakeXero(invoices=1))
+        with xero.deadline(seconds=20) as limit:
+            xero.invoices.all()
+        self.assertLessEqual(limit.remaining, 20)
@@ -0,0 +1,161 @@
+import datetime
+import json
+import sys
+import unittest
+
+from xero.decoder import ArrayStreamParser, iter_array, project, projection
+
+
+class ArrayStreamParserTest(unittest.TestCase):
+    def setUp(self):
+        self.invoices = [
+            {"InvoiceID": "1", "Reference": 'Tricky "}]" ref', "LineItems": [{}]},
+            {"InvoiceID": "2", "Reference": "Also {[, tricky\\"},
+            {"InvoiceID": "3", "LineItems": [{"Tracking": [{"Name": "Region"}]}]},
+        ]
+        self.text = json.dumps(
+            {
+                "Id": "a3e5e2e4-5d06-4d3b-ae7b-3b8b4a6a4c1d",
+                "Status": "OK",
+                # A nested key with the same name shouldn't confuse the parser
+                "Other": {"Invoices": ["not", "these"]},
+                "Invoices": self.invoices,
+                "Trailing": True,
+            }
+        )
+
+    def test_whole_document(self):
+        """A document fed in a single piece yields every element."""
+        parser = ArrayStreamParser("Invoices")
+
+        self.assertEqual(parser.feed(self.text), self.invoices)
+        self.assertTrue(parser.done)
+
+    def test_chunked_document(self):
+        """Elements are yielded as soon as they are complete, regardless of where
+        the chunk boundaries fall."""
+        for size in (1, 2, 3, 7, 64):
+            parser = ArrayStreamParser("Invoices")
+            results = []
+            for i in range(0, len(self.text), size):
+                results.extend(parser.feed(self.text[i : i + size]))
+
+            self.assertEqual(results, self.invoices, f"chunk size {size}")
+            self.assertTrue(parser.done)
+
+    def test_element_available_before_end(self):
+        """The first element is returned before the rest of the array arrives."""
+        parser = ArrayStreamParser("Invoices")
+
+        self.assertEqual(parser.feed('{"Status": "OK", "Invoices": [{"A"'), [])
+        self.assertEqual(parser.feed(': 1}, {"B": '), [{"A": 1}])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed("2}]}"), [{"B": 2}])
+        self.assertTrue(parser.done)
+
+    def test_scalar_elements(self):
+        parser = ArrayStreamParser("Values")
+
+        self.assertEqual(
+            parser.feed('{"Values": [1, "two, ]", null, 4.5]}'),
+            [1, "two, ]", None, 4.5],
+        )
+
+    def test_single_object(self):
+        """If the key references an object, that object is the only element."""
+        parser = ArrayStreamParser("Reports")
+
+        self.assertEqual(
+            parser.feed('{"Reports": {"ReportID": "X"}, "Status": "OK"}'),
+            [{"ReportID": "X"}],
+        )
+        self.assertTrue(parser.done)
+
+    def test_dates_are_parsed(self):
+        parser = ArrayStreamParser("Invoices")
+        tzinfo = None if sys.version_info < (3, 11) else datetime.UTC
+
+        self.assertEqual(
+            parser.feed('{"Invoices": [{"Date": "/Date(1439204133355)/"}]}'),
+            [{"Date": datetime.datetime(2015, 8, 10, 10, 55, 33, 355000, tzinfo)}],
+        )
+
+    def test_truncated_response(self):
+        parser = ArrayStreamParser("Invoices")
+        parser.feed('{"Invoices": [{"A": 1}, {"B"')
+
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    def test_iter_array(self):
+        """Byte chunks are decoded incrementally, even when a multi-byte character
+        is split across chunks."""
+        data = json.dumps({"Contacts": [{"Name": "Zoë"}]}, ensure_ascii=False)
+        data = data.encode("utf-8")
+        split = data.index("ë".encode()) + 1
+
+        self.assertEqual(
+            list(iter_array([data[:split], data[split:]], "Contacts")),
+            [{"Name": "Zoë"}],
+        )
+
+
+class ProjectionTest(unittest.TestCase):
+    def test_projection(self):
+        """Dotted field names are combined into a tree."""
+        tree = projection(["InvoiceID", "Contact.ContactID", "Contact.Name", "Total"])
+
+        self.assertEqual(list(tree.fields), ["InvoiceID", "Contact", "Total"])
+        self.assertIsNone(tree.fields["InvoiceID"])
+        self.assertEqual(list(tree.fields["Contact"].fields), ["ContactID", "Name"])
+
+    def test_whole_field_wins(self):
+        """Requesting a whole field makes requests for its subfields redundant."""
+        tree = projection(["Contact", "Contact.Name"])
+        self.assertIsNone(tree.fields["Contact"])
+
+        tree = projection(["Contact.Name", "Contact"])
+        self.assertIsNone(tree.fields["Contact"])
+
+    def test_project(self):
+        text = json.dumps(
+            {
+                "InvoiceID": "1",
+                "Reference": "Skip, }] me",
+                "Contact": {"ContactID": "C1", "Name": "Acme", "Phones": [{}]},
+                "LineItems": [
+                    {"ItemCode": "A", "Tracking": [{"Name": "Region"}]},
+                    {"ItemCode": "B", "Tracking": []},
+                ],
+                "DueDate": "2015-04-29T00:00:00",
+                "Total": 10,
+            },
+            indent=2,
+        )
+
+        self.assertEqual(
+            project(
+                text,
+                projection(
+                    ["InvoiceID", "Contact.Name", "LineItems.ItemCode", "DueDate"]
+                ),
+            ),
+            {
+                "InvoiceID": "1",
+                "Contact": {"Name": "Acme"},
+                "LineItems": [{"ItemCode": "A"}, {"ItemCode": "B"}],
+                "DueDate": datetime.date(2015, 4, 29),
+            },
+        )
+
+    def test_streamed_projection(self):
+        parser = ArrayStreamParser("Invoices", fields=["InvoiceID"])
+        text = json.dumps(
+            {"Invoices": [{"InvoiceID": "1", "Total": 2}, {"InvoiceID": "3"}]}
+        )
+
+        results = []
+        for i in range(0, len(text), 5):
+            results.extend(parser.feed(text[i : i + 5]))
+
+        self.assertEqual(results, [{"InvoiceID": "1"}, {"InvoiceID": "3"}])
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import Mock
+
+from xero import Xero
+from xero.exceptions import XeroNotFound, XeroRateLimitExceeded
+from xero.fake import FakeXero
+
+from .helpers import FakeClock
+
+
+class FakeXeroTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fake = FakeXero(
+            contacts=10,
+            invoices=150,
+            journals=120,
+            latency=0.25,
+            clock=self.clock,
+            sleep=self.clock.sleep,
+        )
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        self.xero = Xero(credentials, transport=self.fake)
+
+    def test_paging(self):
+        self.assertEqual(len(self.xero.invoices.all()), 150)
+        self.assertEqual(len(self.xero.invoices.filter(page=1)), 100)
+        self.assertEqual(len(self.xero.invoices.filter(page=2)), 50)
+
+        journals = self.xero.journals.filter(offset=100)
+        self.assertEqual([j["JournalNumber"] for j in journals], list(range(101, 121)))
+
+    def test_data_is_deterministic(self):
+        """Objects are generated from the seed, and refer to each other."""
+        invoice = self.xero.invoices.filter(page=1)[0]
+        other = Xero(self.xero._credentials, transport=FakeXero(contacts=10))
+
+        self.assertEqual(other.invoices.filter(page=1)[0], invoice)
+        self.assertEqual(
+            self.xero.invoices.get(invoice["InvoiceID"])[0]["Total"], invoice["Total"]
+        )
+        contact_ids = {c["ContactID"] for c in self.xero.contacts.all()}
+        self.assertIn(invoice["Contact"]["ContactID"], contact_ids)
+
+        with self.assertRaises(XeroNotFound):
+            self.xero.contacts.get("missing")
+
+    def test_latency(self):
+        self.xero.contacts.all()
+        self.assertEqual(self.clock.now, 0.25)
+
+    def test_rate_limits(self):
+        """Responses report the remaining limits, and calls beyond the per-minute
+        limit are refused until the window moves on."""
+        contacts = self.xero.contacts.all()
+        self.assertEqual(contacts.response.headers["X-MinLimit-Remaining"], "59")
+        for _ in range(59):
+            self.xero.contacts.all()
+
+        with self.assertRaises(XeroRateLimitExceeded) as cm:
+            self.xero.contacts.all()
+        self.assertEqual(cm.exception.response.headers["Retry-After"], "45")
+
+        self.clock.now += 45
+        self.xero.contacts.all()
+        self.assertEqual(self.fake.requests["get", "Contacts", 429], 1)
+
+    def test_writes(self):
+        """Saved objects are stored; an idempotency key replays the response."""
+        created = self.xero.contacts.put({"Name": "New"}, idempotency_key="key")
+        replayed = self.xero.contacts.put({"Name": "New"}, idempotency_key="key")
+
+        self.assertEqual(created, replayed)
+        self.assertEqual(len(self.xero.contacts.all()), 11)
+        self.assertEqual(
+            self.xero.contacts.get(created[0]["ContactID"])[0]["Name"], "New"
+        )
+
+    def test_attachments(self):
+        invoice = self.xero.invoices.filter(page=1)[0]
+        saved = self.xero.invoices.put_attachment_data(
+            invoice["InvoiceID"], "receipt.pdf", b"%PDF", "application/pdf"
+        )
+        attachment = saved["Attachments"][0]
+
+        self.assertEqual(attachment["FileName"], "receipt.pdf")
+        self.assertEqual(attachment["ContentLength"], 4)
+        self.assertEqual(
+            self.xero.invoices.get_attachments(invoice["InvoiceID"])["Attachments"],
+            [attachment],
+        )
+        self.assertTrue(
+            self.xero.invoices.get(invoice["InvoiceID"])[0]["HasAttachments"]
+        )
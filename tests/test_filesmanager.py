@@ -5,6 +5,9 @@ from unittest.mock import Mock, patch
 
 from xero import Xero
 from xero.auth import OAuth2Credentials
+from xero.filesmanager import FilesManager
+from xero.projectmanager import ProjectManager
+from xero.transport import make_response
 
 
 class FilesManagerTest(unittest.TestCase):
@@ -26,6 +29,34 @@ class FilesManagerTest(unittest.TestCase):
     def tearDown(self):
         os.remove(self.filepath)
 
+    def test_results_carry_rate_limit(self):
+        """Files and Projects results carry the rate limits, as the other
+        APIs' results do."""
+        headers = {"Content-Type": "application/json", "X-MinLimit-Remaining": "42"}
+        credentials = Mock(base_url="https://api.xero.com")
+        for manager in [
+            FilesManager("Files", credentials),
+            ProjectManager("Projects", credentials),
+        ]:
+            with self.subTest(manager=type(manager).__name__):
+                results = [
+                    manager._decode_response(make_response(200, '{"Id": 1}', headers)),
+                    manager._decode_response(make_response(200, "[1, 2]", headers)),
+                    manager._decode_response(
+                        make_response(
+                            200,
+                            b"%PDF",
+                            {**headers, "Content-Type": "application/pdf"},
+                        )
+                    ),
+                    manager._decode_response(
+                        make_response(204, headers={"X-MinLimit-Remaining": "42"})
+                    ),
+                ]
+                self.assertEqual(results, [{"Id": 1}, [1, 2], b"%PDF", "Deleted"])
+                for result in results:
+                    self.assertEqual(result.rate_limit.minute_remaining, 42)
+
     @patch("requests.get")
     def test_tenant_is_used_in_xero_request(self, r_get):
         credentials = OAuth2Credentials(
@@ -35,6 +66,7 @@ class FilesManagerTest(unittest.TestCase):
         r_get.return_value = Mock(
             status_code=200,
             headers={"content-type": "text/html; charset=utf-8"},
+            content=b"",
         )
         xero.filesAPI.files.all()
 
@@ -49,6 +81,7 @@ class FilesManagerTest(unittest.TestCase):
         r_get.return_value = Mock(
             status_code=200,
             headers={"content-type": "text/html; charset=utf-8"},
+            content=b"",
         )
         xero.filesAPI.files.upload_file(path=self.filepath)
 
@@ -63,6 +96,7 @@ class FilesManagerTest(unittest.TestCase):
         r_get.return_value = Mock(
             status_code=200,
             headers={"content-type": "text/html; charset=utf-8"},
+            content=b"",
         )
 
         with open(self.filepath) as f:
@@ -0,0 +1,297 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+from xero.deadline import deadline
+from xero.exceptions import (
+    XeroDeadlineExceeded,
+    XeroException,
+    XeroQuotaExceeded,
+)
+from xero.limiter import (
+    DAY,
+    RELEASE,
+    Limiter,
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+    refill,
+)
+from xero.pipeline import Pipeline, Request
+from xero.transport import make_response
+
+
+class FakeRedis:
+    """A stand-in for the subset of the `redis.Redis` client that the backend
+    uses. Values are returned as bytes, as Redis returns them."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        value = self.data.get(name)
+        return None if value is None else str(value).encode()
+
+    def set(self, name, value, nx=False, px=None):
+        with self._lock:
+            if nx and name in self.data:
+                return None
+            self.data[name] = value
+            self.expiry[name] = px
+            return True
+
+    def eval(self, script, numkeys, *args):
+        # Only the backend's script to release a lock is supported.
+        assert script == RELEASE and numkeys == 1
+        lock, token = args
+        with self._lock:
+            if self.data.get(lock) == token:
+                del self.data[lock]
+                return 1
+            return 0
+
+    def incr(self, name):
+        with self._lock:
+            self.data[name] = int(self.data.get(name, 0)) + 1
+            return self.data[name]
+
+    def decr(self, name):
+        with self._lock:
+            self.data[name] = int(self.data.get(name, 0)) - 1
+            return self.data[name]
+
+    def expire(self, name, seconds):
+        self.expiry[name] = seconds * 1000
+
+
+class RefillTest(unittest.TestCase):
+    def test_refill(self):
+        # A new bucket is full.
+        self.assertEqual(refill(None, 0, 1, 5, 0), (4, 0))
+        # Tokens are gained over time, up to the capacity.
+        self.assertEqual(refill(0, 0, 0.5, 5, 4), (1, 0))
+        self.assertEqual(refill(0, 0, 0.5, 5, 100), (4, 0))
+        # An empty bucket reports how long until a token is available.
+        self.assertEqual(refill(0.5, 0, 0.5, 5, 0), (0.5, 1))
+
+
+class BackendTests:
+    """Tests shared by every backend; `make_backend()` returns a new backend
+    sharing the state of the others made by the test."""
+
+    def test_take(self):
+        backend = self.make_backend()
+        self.assertEqual(backend.take("a", 1, 2, 100), 0)
+        self.assertEqual(backend.take("a", 1, 2, 100), 0)
+        self.assertEqual(backend.take("a", 1, 2, 100), 1)
+        # Buckets are independent.
+        self.assertEqual(backend.take("b", 1, 2, 100), 0)
+        # A token becomes available with time.
+        self.assertEqual(backend.take("a", 1, 2, 100.5), 0.5)
+        self.assertEqual(backend.take("a", 1, 2, 101), 0)
+
+    def test_spend(self):
+        backend = self.make_backend()
+        self.assertEqual(backend.spend("a", 2, DAY, 10), 1)
+        self.assertEqual(backend.spend("a", 2, DAY, 20), 0)
+        self.assertIsNone(backend.spend("a", 2, DAY, 30))
+        self.assertIsNone(backend.spend("a", 2, DAY, 40))
+        self.assertEqual(backend.spend("b", 2, DAY, 40), 1)
+        # The quota resets at the start of the next period.
+        self.assertEqual(backend.spend("a", 2, DAY, DAY + 10), 1)
+
+    def test_shared(self):
+        """Backends sharing a store share their state, even when used from
+        several threads."""
+        backends = [self.make_backend() for _ in range(4)]
+        spent = []
+
+        def spend(backend):
+            for _ in range(10):
+                spent.append(backend.spend("a", 25, DAY, 0))
+
+        threads = [
+            threading.Thread(target=spend, args=(backend,), daemon=True)
+            for backend in backends
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(spent.count(None), 15)
+        self.assertEqual(sorted(r for r in spent if r is not None), list(range(25)))
+        self.assertEqual(backends[0].take("b", 1, 1, 0), 0)
+        self.assertEqual(backends[1].take("b", 1, 1, 0), 1)
+
+
+class MemoryBackendTest(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.backend = MemoryBackend()
+
+    def make_backend(self):
+        return self.backend
+
+
+class SQLiteBackendTest(BackendTests, unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "limits.db")
+
+    def make_backend(self):
+        return SQLiteBackend(self.path)
+
+
+class RedisBackendTest(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+
+    def make_backend(self):
+        return RedisBackend(self.client)
+
+    def test_expiry(self):
+        backend = self.make_backend()
+        backend.take("a", 0.5, 5, 0)
+        backend.spend("b", 5, DAY, 0)
+        # Buckets expire once they would be full again.
+        self.assertEqual(self.client.expiry["xero:a"], 10001)
+        self.assertEqual(self.client.expiry["xero:b:0"], DAY * 1000)
+        self.assertNotIn("xero:a:lock", self.client.data)
+
+    def test_lock_taken_over(self):
+        """A lock that expired, and was taken by another process, while the
+        bucket was updated isn't released."""
+        get = self.client.get
+
+        def expire_lock(name):
+            self.client.data["xero:a:lock"] = "other"
+            return get(name)
+
+        self.client.get = expire_lock
+        self.make_backend().take("a", 1, 5, 0)
+        self.assertEqual(self.client.data["xero:a:lock"], "other")
+
+    def test_lock_wait(self):
+        """The wait for a lock backs off, and gives up at the deadline."""
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        self.client.set("xero:a:lock", "other")
+        backend = RedisBackend(self.client, sleep=sleep)
+        with deadline(0.01, clock=lambda: now[0]):
+            with self.assertRaises(XeroDeadlineExceeded):
+                backend.take("a", 1, 5, 0)
+        self.assertEqual(slept, [0.001, 0.002, 0.004])
+
+
+class LimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+    def pipeline(self, limiter):
+        return Pipeline([limiter], transport=Mock(send=lambda r: make_response(200)))
+
+    def call(self, pipeline, tenant_id="a"):
+        request = Request("get", "uri", headers={"Xero-tenant-id": tenant_id})
+        pipeline(request)
+        return request
+
+    def test_per_minute(self):
+        limiter = Limiter(
+            MemoryBackend(),
+            per_minute=10,
+            burst=2,
+            clock=self.clock,
+            sleep=self.sleep,
+        )
+        pipeline = self.pipeline(limiter)
+
+        for _ in range(2):
+            self.call(pipeline)
+        self.assertEqual(self.slept, [])
+        # Once the burst is used, calls are paced to stay within the limit.
+        request = self.call(pipeline)
+        self.assertAlmostEqual(self.slept[0], 7.5)
+        self.assertAlmostEqual(request.timings["queue"], 7.5)
+        self.call(pipeline, "b")
+        self.assertEqual(len(self.slept), 1)
+
+    def test_per_minute_shared(self):
+        """Limiters sharing a backend share the limits."""
+        backend = MemoryBackend()
+        limiters = [
+            Limiter(backend, per_minute=4, burst=2, clock=self.clock, sleep=self.sleep)
+            for _ in range(2)
+        ]
+        self.call(self.pipeline(limiters[0]))
+        self.call(self.pipeline(limiters[1]))
+        self.assertEqual(self.slept, [])
+        self.call(self.pipeline(limiters[0]))
+        self.assertEqual(self.slept, [30])
+
+    def test_app_per_minute(self):
+        limiter = Limiter(
+            MemoryBackend(),
+            per_minute=None,
+            app_per_minute=2,
+            burst=1,
+            clock=self.clock,
+            sleep=self.sleep,
+        )
+        pipeline = self.pipeline(limiter)
+
+        self.call(pipeline, "a")
+        self.call(pipeline, "b")
+        self.assertEqual(self.slept, [60])
+
+    def test_per_day(self):
+        limiter = Limiter(MemoryBackend(), per_day=2, clock=self.clock)
+        pipeline = self.pipeline(limiter)
+
+        self.call(pipeline)
+        self.call(pipeline)
+        with self.assertRaises(XeroQuotaExceeded) as cm:
+            self.call(pipeline)
+        self.assertIsInstance(cm.exception, XeroException)
+        self.assertEqual(cm.exception.tenant_id, "a")
+        self.assertEqual(cm.exception.retry_after, DAY - 1000)
+        self.call(pipeline, "b")
+
+        self.now += DAY
+        self.call(pipeline)
+
+    def test_per_day_after_pacing(self):
+        """A call that gives up waiting for the rate limit isn't counted
+        against the daily quota."""
+        limiter = Limiter(
+            MemoryBackend(),
+            per_minute=10,
+            per_day=5,
+            burst=1,
+            clock=self.clock,
+            sleep=self.sleep,
+        )
+        pipeline = self.pipeline(limiter)
+
+        self.call(pipeline)
+        with deadline(1, clock=self.clock):
+            with self.assertRaises(XeroDeadlineExceeded):
+                self.call(pipeline)
+        self.assertEqual(limiter.backend.spend("day:a", 5, DAY, self.now), 3)
@@ -4,9 +4,13 @@ import unittest
 from io import BytesIO
 from unittest.mock import Mock, patch
 
-from xero.basemanager import XeroObjectList
+import requests
+
+from xero.basemanager import ResponseMetadata, Timings, XeroObject, XeroObjectList
 from xero.exceptions import XeroExceptionUnknown
+from xero.fake import FakeXero
 from xero.manager import Manager
+from xero.pipeline import Pipeline, Retry
 from xero.utils import generate_idempotency_key
 
 from .helpers import assertXMLEqual
@@ -350,7 +354,7 @@ class ManagerTest(unittest.TestCase):
         manager = Manager("Reports", credentials, user_agent="DemoCompany-1234567890")
         self.assertEqual(manager.user_agent, "DemoCompany-1234567890")
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_request_content_type(self, request):
         """The Content-Type should be application/xml."""
         # Default used when no user_agent set on manager and credentials has
@@ -376,7 +380,7 @@ class ManagerTest(unittest.TestCase):
 
         self.assertTrue(body, "<Invoice><bing>bong</bing></Invoice>")
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_idempotency_key_absent(self, mock_post):
         """No idempotency key header is inclduded if a key isn't provided."""
         credentials = Mock(base_url="", user_agent=None)
@@ -397,7 +401,7 @@ class ManagerTest(unittest.TestCase):
         # Header should not exist.
         assert "Idempotency-Key" not in mock_post.mock_calls[0][2]["headers"]
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_idempotency_key_is_string(self, _):
         """Idempotency keys must be strings."""
         credentials = Mock(base_url="", user_agent=None)
@@ -411,7 +415,7 @@ class ManagerTest(unittest.TestCase):
                 idempotency_key=12345,
             )
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_idempotency_key_length(self, _):
         """Idempotency keys must be no longer than 128 characters."""
         credentials = Mock(base_url="", user_agent=None)
@@ -426,7 +430,7 @@ class ManagerTest(unittest.TestCase):
                 idempotency_key=bad_key,
             )
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_idempotency_key_on_save(self, mock_post):
         """An idempotency key can be included on a Manager.save() call."""
         credentials = Mock(base_url="", user_agent=None)
@@ -449,7 +453,7 @@ class ManagerTest(unittest.TestCase):
         headers = mock_post.mock_calls[0][2]["headers"]
         self.assertEqual(headers["Idempotency-Key"], idempotency_key)
 
-    @patch("xero.basemanager.requests.put")
+    @patch("requests.put")
     def test_idempotency_key_on_put(self, mock_put):
         """An idempotency key can be included on a Manager.put() call."""
         credentials = Mock(base_url="", user_agent=None)
@@ -472,7 +476,7 @@ class ManagerTest(unittest.TestCase):
         headers = mock_put.mock_calls[0][2]["headers"]
         self.assertEqual(headers["Idempotency-Key"], idempotency_key)
 
-    @patch("xero.basemanager.requests.put")
+    @patch("requests.put")
     def test_idempotency_key_on_upload_attachment(self, mock_put):
         """An idempotency key can be included on a Manager.put_attachment() call."""
         credentials = Mock(base_url="", user_agent=None)
@@ -496,7 +500,7 @@ class ManagerTest(unittest.TestCase):
         headers = mock_put.mock_calls[0][2]["headers"]
         self.assertEqual(headers["Idempotency-Key"], idempotency_key)
 
-    @patch("xero.basemanager.requests.put")
+    @patch("requests.put")
     def test_history_note_is_string(self, _):
         """Manager.put_history expects a string as "details"."""
         credentials = Mock(base_url="", user_agent=None)
@@ -510,7 +514,7 @@ class ManagerTest(unittest.TestCase):
                 },
             )
 
-    @patch("xero.basemanager.requests.post")
+    @patch("requests.post")
     def test_history_note_length(self, _):
         """History notes are limited to 2500 characters."""
         credentials = Mock(base_url="", user_agent=None)
@@ -526,7 +530,7 @@ class ManagerTest(unittest.TestCase):
                 details=long_details,
             )
 
-    @patch("xero.basemanager.requests.put")
+    @patch("requests.put")
     def test_idempotency_key_on_put_history(self, mock_put):
         """Generate a valid idempotency key and use it on a Manager.put_history() call.
 
@@ -551,7 +555,7 @@ class ManagerTest(unittest.TestCase):
         headers = mock_put.mock_calls[0][2]["headers"]
         self.assertEqual(headers["Idempotency-Key"], idempotency_key)
 
-    @patch("xero.basemanager.requests.get")
+    @patch("requests.get")
     def test_list_response_type(self, mock_get):
         """Responses should be instances of XeroObjectList and also instances of
         list."""
@@ -574,7 +578,7 @@ class ManagerTest(unittest.TestCase):
         # is also instance of list
         self.assertIsInstance(result, list)
 
-    @patch("xero.basemanager.requests.get")
+    @patch("requests.get")
     def test_empty_list_response_type(self, mock_get):
         """Empty responses should be instances of XeroObjectList and also instances of
         list."""
@@ -597,7 +601,7 @@ class ManagerTest(unittest.TestCase):
         # is also instance of list
         self.assertIsInstance(result, list)
 
-    @patch("xero.basemanager.requests.get")
+    @patch("requests.get")
     def test_list_response_behaves_like_list(self, mock_get):
         """Responses should behave like lists."""
         mock_get.return_value = Mock(
@@ -641,7 +645,7 @@ class ManagerTest(unittest.TestCase):
         # have datetimes in them and these can't be serialized by default)
         json.dumps(result)
 
-    @patch("xero.basemanager.requests.get")
+    @patch("requests.get")
     def test_list_response_carries_response_object(self, mock_get):
         """Xero list responses should carry the requests.response object and expose the
         headers provided by Xero (in this case, Xero-Correlation-Id)"""
@@ -671,7 +675,7 @@ class ManagerTest(unittest.TestCase):
             "5fe9659e-e5cc-4747-ad01-47adb038bf34",
         )
 
-    @patch("xero.basemanager.requests.get")
+    @patch("requests.get")
     def test_empty_list_response_carries_response_object(self, mock_get):
         """Empty list responses should carry the requests.response object and expose the
         headers provided by Xero (in this case, Xero-Correlation-Id)"""
@@ -700,3 +704,210 @@ class ManagerTest(unittest.TestCase):
             result.response.headers["Xero-Correlation-Id"],
             "5fe9659e-e5cc-4747-ad01-47adb038bf34",
         )
+
+    @patch("requests.get")
+    def test_streamed_response(self, mock_get):
+        """A streamed response yields objects as they are received."""
+        chunks = [
+            b'{"Status": "OK", "Contacts": [{"Name": "A"}',
+            b', {"Name": "B"}]}',
+        ]
+        mock_get.return_value = Mock(
+            status_code=200,
+            encoding="utf-8",
+            headers={"content-type": "application/json"},
+        )
+        mock_get.return_value.iter_content.return_value = iter(chunks)
+        credentials = Mock(base_url="", user_agent=None)
+        manager = Manager("Contacts", credentials)
+
+        result = manager.filter(Name="A", stream=True)
+
+        self.assertTrue(mock_get.call_args[1]["stream"])
+        self.assertIs(result.response, mock_get.return_value)
+        self.assertEqual(next(result), {"Name": "A"})
+        self.assertEqual(list(result), [{"Name": "B"}])
+        mock_get.return_value.close.assert_called_once_with()
+
+    @patch("requests.get")
+    def test_list_response_without_retained_body(self, mock_get):
+        """If responses aren't retained, list responses carry only the response
+        metadata, not the response body."""
+        mock_get.return_value = Mock(
+            status_code=200,
+            encoding="utf-8",
+            text='{"Status": "OK", "Contacts": [{"Name": "A"}, {"Name": "B"}]}',
+            headers={
+                "content-type": "application/json",
+                "Xero-Correlation-Id": "5fe9659e-e5cc-4747-ad01-47adb038bf34",
+                "X-MinLimit-Remaining": "57",
+                "X-DayLimit-Remaining": "4321",
+            },
+        )
+        credentials = Mock(base_url="", user_agent=None)
+        manager = Manager("Contacts", credentials, retain_responses=False)
+
+        result = manager.all()
+
+        self.assertListEqual(result, [{"Name": "A"}, {"Name": "B"}])
+        self.assertIsInstance(result.response, ResponseMetadata)
+        self.assertFalse(hasattr(result.response, "text"))
+        self.assertEqual(result.response.status_code, 200)
+        self.assertEqual(
+            result.response.headers["Xero-Correlation-Id"],
+            "5fe9659e-e5cc-4747-ad01-47adb038bf34",
+        )
+        self.assertEqual(result.response.min_limit_remaining, 57)
+        self.assertEqual(result.response.day_limit_remaining, 4321)
+        self.assertIsNone(result.response.retry_after)
+
+    @patch("requests.get")
+    def test_field_projection(self, mock_get):
+        """Only the requested fields are decoded from the response."""
+        invoices = [
+            {
+                "InvoiceID": "1",
+                "Total": 10.5,
+                "Status": "PAID",
+                "Date": "/Date(1439204133355)/",
+                "Contact": {"ContactID": "C1", "Name": "Acme"},
+                "LineItems": [{"Description": "Widget"}],
+            },
+            {"InvoiceID": "2", "Total": 0, "LineItems": []},
+        ]
+        mock_get.return_value = Mock(
+            status_code=200,
+            encoding="utf-8",
+            text=json.dumps({"Status": "OK", "Invoices": invoices}),
+            headers={"content-type": "application/json"},
+        )
+        credentials = Mock(base_url="", user_agent=None)
+        manager = Manager("Invoices", credentials)
+
+        result = manager.filter(
+            summaryOnly=True,
+            fields=["InvoiceID", "Total", "Status", "Contact.ContactID"],
+        )
+
+        self.assertEqual(mock_get.call_args[1]["params"], {"summaryOnly": "true"})
+        self.assertIsInstance(result, XeroObjectList)
+        self.assertEqual(
+            result,
+            [
+                {
+                    "InvoiceID": "1",
+                    "Total": 10.5,
+                    "Status": "PAID",
+                    "Contact": {"ContactID": "C1"},
+                },
+                {"InvoiceID": "2", "Total": 0},
+            ],
+        )
+
+    @patch("requests.get")
+    def test_interned_values(self, mock_get):
+        """Repeated enum-like values share a single string across responses."""
+        credentials = Mock(base_url="", user_agent=None)
+        results = []
+        for intern_fields in (None, ["Status"], ()):
+            manager = Manager("Invoices", credentials, intern_fields=intern_fields)
+            for _ in range(2):
+                mock_get.return_value = Mock(
+                    status_code=200,
+                    encoding="utf-8",
+                    text=json.dumps(
+                        {"Status": "OK", "Invoices": [{"Status": "AUTHORISED"}]}
+                    ),
+                    headers={"content-type": "application/json"},
+                )
+                results.append(manager.all()[0]["Status"])
+
+        self.assertEqual(results, ["AUTHORISED"] * 6)
+        # Interned by default, and when explicitly requested
+        self.assertIs(results[0], results[1])
+        self.assertIs(results[2], results[3])
+        # Not interned when disabled
+        self.assertIsNot(results[4], results[5])
+
+    def test_recorded_timings(self):
+        """Results carry the time spent in each phase of the call, if asked."""
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        pipeline = Pipeline(transport=FakeXero(invoices=5))
+        manager = Manager("Invoices", credentials, pipeline=pipeline)
+        self.assertIsNone(manager.all().timings)
+
+        manager = Manager(
+            "Invoices", credentials, pipeline=pipeline, record_timings=True
+        )
+        invoices = manager.all()
+        self.assertIsInstance(invoices.timings, Timings)
+        # The invoices have dates, so some time was spent parsing them.
+        self.assertGreater(invoices.timings.dates, 0)
+        self.assertGreater(invoices.timings.decode, 0)
+        self.assertEqual(invoices.timings.queue, 0)
+        self.assertAlmostEqual(
+            invoices.timings.total, sum(invoices.timings.as_dict().values())
+        )
+
+        # Single objects are returned as a dict that carries the timings.
+        attachments = manager.get_attachments(invoices[0]["InvoiceID"])
+        self.assertIsInstance(attachments, XeroObject)
+        self.assertEqual(attachments["Attachments"], [])
+        self.assertIsInstance(attachments.timings, Timings)
+
+    def test_priority(self):
+        """The priority of a call is passed to the pipeline, not to Xero."""
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        requests = []
+
+        def record(request, next):
+            requests.append(request)
+            return next(request)
+
+        pipeline = Pipeline([record], transport=FakeXero(invoices=1))
+        manager = Manager("Invoices", credentials, pipeline=pipeline)
+
+        manager.all()
+        manager.all(priority="background")
+        self.assertEqual([r.priority for r in requests], ["default", "background"])
+        self.assertEqual(requests[1].params, {})
+
+        with self.assertRaises(ValueError):
+            manager.all(priority="urgent")
+
+    def test_auto_idempotency(self):
+        """Writes are given an idempotency key, which makes them safe to retry:
+        a write whose response is lost is only applied once."""
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        fake = FakeXero(invoices=0, journals=0)
+        sent = []
+
+        def send(request):
+            sent.append(request)
+            response = fake.send(request)
+            if len(sent) == 1:
+                # The invoice was saved, but the response never arrived.
+                raise requests.ConnectionError()
+            return response
+
+        pipeline = Pipeline([Retry(sleep=Mock())], transport=Mock(send=send))
+        manager = Manager(
+            "Invoices", credentials, pipeline=pipeline, auto_idempotency=True
+        )
+        manager.save({"Type": "ACCREC", "Reference": "A1"})
+
+        self.assertEqual(len(sent), 2)
+        key = sent[0].headers["Idempotency-Key"]
+        self.assertEqual(len(key), 128)
+        self.assertEqual(sent[1].headers["Idempotency-Key"], key)
+        self.assertEqual(len(manager.all()), 1)
+        # Reads aren't given a key
+        self.assertNotIn("Idempotency-Key", sent[-1].headers)
+
+        # Each call has its own key, unless one is given.
+        manager.put({"Type": "ACCREC", "Reference": "A2"})
+        self.assertNotEqual(sent[-1].headers["Idempotency-Key"], key)
+        manager.put({"Type": "ACCREC"}, idempotency_key="mine")
+        self.assertEqual(sent[-1].headers["Idempotency-Key"], "mine")
+        headers = manager._put_allocation("id", {"Amount": 1}, idempotency_key="k")[4]
+        self.assertEqual(headers, {"Idempotency-Key": "k"})
@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import Mock
+
+from xero import Xero
+from xero.exceptions import XeroNotFound, XeroRateLimitExceeded
+from xero.fake import FakeXero
+from xero.metrics import Collector
+
+from .helpers import FakeClock
+
+
+class CollectorTest(unittest.TestCase):
+    def setUp(self):
+        clock = FakeClock()
+        self.fake = FakeXero(contacts=5, clock=clock, sleep=clock.sleep)
+        credentials = Mock(base_url="https://api.xero.com", user_agent=None)
+        self.xero = Xero(credentials, transport=self.fake)
+        self.metrics = Collector(buckets=(0.5, 60))
+        self.metrics.install(self.xero)
+
+    def test_requests(self):
+        self.xero.contacts.all()
+        self.xero.contacts.all()
+        with self.assertRaises(XeroNotFound):
+            self.xero.contacts.get("missing")
+
+        text = self.metrics.render()
+        self.assertIn(
+            'xero_requests_total{manager="Contacts",method="all",status="200"} 2',
+            text,
+        )
+        self.assertIn(
+            'xero_requests_total{manager="Contacts",method="get",status="404"} 1',
+            text,
+        )
+        self.assertIn(
+            'xero_errors_total{manager="Contacts",method="get",'
+            'exception="XeroNotFound"} 1',
+            text,
+        )
+        self.assertIn(
+            'xero_request_duration_seconds_bucket{manager="Contacts",method="all",'
+            'le="60"} 2',
+            text,
+        )
+        self.assertIn(
+            'xero_request_duration_seconds_count{manager="Contacts",method="all"} 2',
+            text,
+        )
+        self.assertIn("# TYPE xero_request_duration_seconds histogram", text)
+
+    def test_rate_limits(self):
+        self.fake.MINUTE_LIMIT = 1
+        self.xero.contacts.all()
+        with self.assertRaises(XeroRateLimitExceeded):
+            self.xero.contacts.all()
+
+        text = self.metrics.render()
+        self.assertIn('xero_rate_limit_minute_remaining{tenant=""} 0', text)
+        self.assertIn('xero_rate_limit_day_remaining{tenant=""} 4999', text)
+        self.assertIn("xero_rate_limit_app_minute_remaining 9999", text)
+        self.assertIn('exception="XeroRateLimitExceeded"} 1', text)
@@ -0,0 +1,214 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import Mock
+
+import requests
+
+from xero import Xero
+from xero.budget import budget
+from xero.fake import FakeXero
+from xero.outbox import FAILED, SENDING, SENT, Outbox
+from xero.transport import make_response
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "outbox.db")
+        self.fake = FakeXero(contacts=0, invoices=0, journals=0)
+        self.sent = []
+        self.lost = 0
+        self.now = 1000.0
+
+    def send(self, request):
+        self.sent.append(request)
+        response = self.fake.send(request)
+        if self.lost:
+            # The write was applied, but the response never arrived.
+            self.lost -= 1
+            raise requests.ConnectionError()
+        return response
+
+    def outbox(self, **kwargs):
+        credentials = Mock(
+            base_url="https://api.xero.com", user_agent=None, tenant_id=None
+        )
+        xero = Xero(credentials, transport=Mock(send=self.send))
+        kwargs.setdefault("sleep", Mock())
+        return Outbox(xero, self.path, clock=lambda: self.now, **kwargs)
+
+    def test_enqueue(self):
+        outbox = self.outbox()
+        first = outbox.enqueue("Invoices", {"Type": "ACCREC", "Reference": "A"})
+        others = outbox.enqueue(
+            "Invoices",
+            [
+                {"Type": "ACCREC", "Reference": "B"},
+                {"Type": "ACCREC", "Date": datetime(2024, 1, 2, 3, 4, 5)},
+            ],
+        )
+        contact = outbox.enqueue("Contacts", {"Name": "Basket Case"})
+        self.assertEqual(self.sent, [])
+        self.assertEqual(outbox.pending(), 4)
+
+        # Writes to the same resource are batched together.
+        self.assertEqual(outbox.drain(), 3)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0].method, "post")
+        self.assertEqual(self.sent[0].priority, "background")
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(outbox.pending(), 0)
+
+        entry = outbox.get(first)
+        self.assertEqual(entry.status, SENT)
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.result["Reference"], "A")
+        self.assertIn("InvoiceID", entry.result)
+        # Dates survive being queued.
+        self.assertEqual(
+            outbox.get(others[1]).data["Date"], datetime(2024, 1, 2, 3, 4, 5)
+        )
+        self.assertIn("ContactID", outbox.get(contact).result)
+        self.assertEqual(len(self.fake.objects("Invoices")), 3)
+
+    def test_accessor(self):
+        """A Xero object given a path has an outbox for its tenant."""
+        credentials = Mock(
+            base_url="https://api.xero.com", user_agent=None, tenant_id="a"
+        )
+        xero = Xero(credentials, transport=Mock(send=self.send), outbox=self.path)
+
+        self.assertIs(xero.outbox, xero.outbox)
+        self.assertEqual(xero.outbox.path, self.path)
+        self.assertEqual(xero.outbox.tenant_id, "a")
+        xero.outbox.enqueue("Invoices", {"Type": "ACCREC"})
+        self.assertEqual(xero.outbox.drain(), 1)
+
+        with self.assertRaises(ValueError):
+            Xero(credentials).outbox.enqueue("Invoices", {})
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            self.outbox().enqueue("Invoices", {}, method="delete")
+        with self.assertRaises(ValueError):
+            self.outbox().enqueue("Widgets", {})
+
+    def test_rejected(self):
+        """Objects that Xero rejects are recorded as failed."""
+        body = {
+            "Status": "OK",
+            "Invoices": [
+                {"InvoiceID": "1", "StatusAttributeString": "OK"},
+                {
+                    "StatusAttributeString": "ERROR",
+                    "ValidationErrors": [{"Message": "Contact is required"}],
+                },
+            ],
+        }
+        self.fake.send = Mock(
+            return_value=make_response(
+                200, json.dumps(body), {"Content-Type": "application/json"}
+            )
+        )
+        outbox = self.outbox()
+        ok, rejected = outbox.enqueue("Invoices", [{"Reference": "A"}, {}])
+        outbox.drain()
+
+        self.assertEqual(outbox.get(ok).status, SENT)
+        self.assertEqual(outbox.get(rejected).status, FAILED)
+        self.assertEqual(outbox.get(rejected).error, "Contact is required")
+        self.assertEqual([e.id for e in outbox.failed()], [rejected])
+        params = self.fake.send.call_args[0][0].params
+        self.assertEqual(params["summarizeErrors"], "false")
+
+    def test_transient_failure(self):
+        """A batch that fails in transit is sent again with the same key, so
+        it is only applied once."""
+        self.lost = 1
+        outbox = self.outbox(backoff=2)
+        item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+
+        self.assertEqual(outbox.drain(), 0)
+        outbox.sleep.assert_called_once_with(2)
+        self.assertEqual(outbox.get(item).status, SENDING)
+        self.assertEqual(outbox.drain(), 1)
+
+        self.assertEqual(outbox.get(item).status, SENT)
+        self.assertEqual(outbox.get(item).attempts, 2)
+        keys = {request.headers["Idempotency-Key"] for request in self.sent}
+        self.assertEqual(len(keys), 1)
+        self.assertEqual(len(self.fake.objects("Invoices")), 1)
+
+    def test_refused_locally(self):
+        """A batch refused before it reaches Xero, such as by a budget, is sent
+        again later with the same key."""
+        outbox = self.outbox()
+        item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+        with budget(0):
+            self.assertEqual(outbox.drain(), 0)
+        self.assertEqual(outbox.get(item).status, SENDING)
+        self.assertIn("XeroBudgetExceeded", outbox.get(item).error)
+
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.get(item).status, SENT)
+
+    def test_batch_rejected(self):
+        """A batch that Xero rejects as a whole is recorded as failed."""
+        body = {"Type": "ValidationException", "Message": "Invalid data"}
+        self.fake.send = Mock(
+            return_value=make_response(
+                400, json.dumps(body), {"Content-Type": "application/json"}
+            )
+        )
+        outbox = self.outbox()
+        item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.get(item).status, FAILED)
+        self.assertEqual(outbox.pending(), 0)
+
+    def test_unexpected_error(self):
+        """Other errors are raised, and the batch is sent again later."""
+        send = self.fake.send
+        self.fake.send = Mock(side_effect=RuntimeError("bug"))
+        outbox = self.outbox()
+        item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+
+        with self.assertRaises(RuntimeError):
+            outbox.drain()
+        self.assertEqual(outbox.get(item).status, SENDING)
+
+        self.fake.send = send
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.get(item).status, SENT)
+        keys = {request.headers["Idempotency-Key"] for request in self.sent}
+        self.assertEqual(len(keys), 1)
+
+    def test_restart(self):
+        """A batch claimed by a process that stopped is sent again once its
+        lease expires."""
+        outbox = self.outbox()
+        item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+        key, entries = outbox._claim()
+        self.assertEqual([e.id for e in entries], [item])
+
+        restarted = self.outbox(lease=60)
+        self.assertEqual(restarted.drain(), 0)
+        self.now += 60
+        self.assertEqual(restarted.drain(), 1)
+        self.assertEqual(self.sent[0].headers["Idempotency-Key"], key)
+        self.assertEqual(restarted.get(item).status, SENT)
+
+    def test_background(self):
+        with self.outbox(interval=0.01) as outbox:
+            item = outbox.enqueue("Invoices", {"Type": "ACCREC"})
+            deadline = time.monotonic() + 5
+            while outbox.pending() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(outbox.get(item).status, SENT)
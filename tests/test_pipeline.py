@@ -0,0 +1,527 @@
+import io
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import requests
+
+from xero import Xero
+from xero.auth import OAuth2Credentials
+from xero.deadline import deadline
+from xero.exceptions import (
+    XeroCircuitOpen,
+    XeroDeadlineExceeded,
+    XeroException,
+    XeroInternalError,
+    XeroNotAvailable,
+    XeroNotFound,
+    XeroRateLimitExceeded,
+    XeroTenantIdNotSet,
+    XeroUnsupportedMediaType,
+)
+from xero.fake import FakeXero
+from xero.pipeline import (
+    AdaptiveConcurrency,
+    Cache,
+    CircuitBreaker,
+    Metrics,
+    Pipeline,
+    RateLimit,
+    Request,
+    Retry,
+)
+from xero.transport import make_response
+
+from .helpers import FakeClock
+
+TOKEN = {"access_token": "1234567890", "token_type": "Bearer", "expires_at": 0}
+
+
+def response(status_code=200, headers=None):
+    return Mock(
+        status_code=status_code,
+        headers={"content-type": "text/plain", **(headers or {})},
+        text="",
+    )
+
+
+class PipelineTest(unittest.TestCase):
+    def test_middleware_order(self):
+        """Middleware runs in order, between authentication and the transport."""
+        calls = []
+
+        def middleware(name):
+            def handle(request, next):
+                calls.append(name)
+                return next(request)
+
+            return handle
+
+        send = Mock(return_value=response())
+        pipeline = Pipeline(
+            [middleware("a"), middleware("b")], transport=Mock(send=send)
+        )
+        credentials = Mock()
+
+        result = pipeline(Request("get", "/", credentials=credentials))
+
+        self.assertEqual(calls, ["a", "b"])
+        self.assertIs(result, send.return_value)
+        self.assertIs(send.call_args[0][0].auth, credentials.oauth)
+
+    def test_decoder(self):
+        pipeline = Pipeline(transport=Mock(send=Mock(return_value=response())))
+
+        result = pipeline(Request("get", "/", decoder=lambda r: r.status_code))
+
+        self.assertEqual(result, 200)
+
+    def test_errors_are_mapped(self):
+        """Error statuses are mapped to the same exceptions for every API."""
+        for status_code, exception in [
+            (415, XeroUnsupportedMediaType),
+            (429, XeroRateLimitExceeded),
+        ]:
+            transport = Mock(send=Mock(return_value=response(status_code)))
+            pipeline = Pipeline(transport=transport)
+            with self.assertRaises(exception):
+                pipeline(Request("get", "/"))
+
+    def test_tenant_is_required(self):
+        credentials = OAuth2Credentials("client_id", "client_secret", token=TOKEN)
+        pipeline = Pipeline(transport=Mock(send=Mock(return_value=response())))
+
+        with self.assertRaises(XeroTenantIdNotSet):
+            pipeline(Request("get", "/", credentials=credentials))
+
+        credentials.tenant_id = "12345"
+        pipeline(Request("get", "/", credentials=credentials))
+        request = pipeline.transport.send.call_args[0][0]
+        self.assertEqual(request.headers["Xero-tenant-id"], "12345")
+
+    @patch("requests.get")
+    def test_projects_use_the_pipeline(self, r_get):
+        """The Projects API sends the tenant and timeout like the other APIs."""
+        credentials = OAuth2Credentials(
+            "client_id", "client_secret", token=TOKEN, tenant_id="12345"
+        )
+        r_get.return_value = response(headers={"content-type": "application/json"})
+        r_get.return_value.json.return_value = {"items": []}
+
+        result = Xero(credentials).projectsAPI.projects.all(timeout=5)
+
+        self.assertEqual(result, {"items": []})
+        self.assertEqual(r_get.call_args[1]["headers"]["Xero-tenant-id"], "12345")
+        self.assertEqual(r_get.call_args[1]["timeout"], 5)
+
+
+class RateLimitTest(unittest.TestCase):
+    def test_requests_are_delayed(self):
+        """Requests beyond the limit wait for the window to move on."""
+        clock = FakeClock()
+        limit = RateLimit(2, clock=clock, sleep=clock.sleep)
+        pipeline = Pipeline([limit], transport=Mock(send=Mock(return_value=response())))
+        times = []
+
+        for tenant in ["a", "a", "b", "a"]:
+            pipeline(Request("get", "/", headers={"Xero-tenant-id": tenant}))
+            times.append(clock.now)
+
+        self.assertEqual(times, [0, 0, 0, 60])
+
+    def test_priority(self):
+        """A waiting request of a higher priority is sent first, even if a
+        lower priority request stops waiting before it does."""
+        clock = FakeClock()
+        sleeps = []
+
+        def sleep(seconds):
+            event = threading.Event()
+            sleeps.append((threading.current_thread().name, seconds, event))
+            event.wait(5)
+
+        def wait_for(count):
+            for _ in range(500):
+                if len(sleeps) == count:
+                    return
+                time.sleep(0.01)
+            self.fail(f"Expected {count} waits, got {sleeps}")
+
+        sent = []
+        transport = Mock(
+            send=lambda request: sent.append(request.priority) or response()
+        )
+        pipeline = Pipeline([RateLimit(1, clock=clock, sleep=sleep)], transport)
+
+        def call(priority):
+            pipeline(
+                Request("get", "/", headers={"Xero-tenant-id": "a"}, priority=priority)
+            )
+
+        call("default")
+        threads = {}
+        for priority in ["background", "interactive"]:
+            threads[priority] = threading.Thread(
+                target=call, args=(priority,), name=priority, daemon=True
+            )
+            threads[priority].start()
+            wait_for(len(threads))
+        self.addCleanup(lambda: [event.set() for _, _, event in sleeps])
+
+        # The background request wakes first, and makes way.
+        clock.now = 60
+        sleeps[0][2].set()
+        wait_for(3)
+        self.assertEqual(sleeps[2][:2], ("background", 60))
+        sleeps[1][2].set()
+        threads["interactive"].join(5)
+
+        clock.now = 120
+        sleeps[2][2].set()
+        threads["background"].join(5)
+        self.assertEqual(sent, ["default", "interactive", "background"])
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.retry = Retry(2, backoff=1, sleep=self.clock.sleep)
+
+    def test_get_is_retried(self):
+        send = Mock(
+            side_effect=[
+                requests.ConnectionError(),
+                response(503, headers={"Retry-After": "10"}),
+                response(),
+            ]
+        )
+        result = Pipeline([self.retry], transport=Mock(send=send))(Request("get", "/"))
+
+        self.assertEqual(result.status_code, 200)
+        # Exponential backoff, then the Retry-After
+        self.assertEqual(self.clock.now, 11)
+
+    def test_retries_are_limited(self):
+        send = Mock(return_value=response(429))
+
+        with self.assertRaises(XeroRateLimitExceeded):
+            Pipeline([self.retry], transport=Mock(send=send))(Request("get", "/"))
+        self.assertEqual(send.call_count, 3)
+
+    def test_post_is_not_retried(self):
+        send = Mock(return_value=response(503))
+
+        with self.assertRaises(XeroNotAvailable):
+            Pipeline([self.retry], transport=Mock(send=send))(Request("post", "/"))
+        self.assertEqual(send.call_count, 1)
+
+    def test_keyed_post_is_retried(self):
+        """Requests with an idempotency key are retried with the same key,
+        and the same body."""
+        sent = []
+
+        def send(request):
+            sent.append((request.headers["Idempotency-Key"], request.body.read()))
+            if len(sent) == 1:
+                raise requests.ConnectionError()
+            return response()
+
+        request = Request(
+            "put", "/", body=io.BytesIO(b"data"), headers={"Idempotency-Key": "k"}
+        )
+        result = Pipeline([self.retry], transport=Mock(send=send))(request)
+
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(sent, [("k", b"data"), ("k", b"data")])
+
+        send = Mock(side_effect=requests.ConnectionError())
+        retry = Retry(keyed=False, sleep=self.clock.sleep)
+        request = Request("post", "/", headers={"Idempotency-Key": "k"})
+        with self.assertRaises(requests.ConnectionError):
+            Pipeline([retry], transport=Mock(send=send))(request)
+        self.assertEqual(send.call_count, 1)
+
+
+class CacheTest(unittest.TestCase):
+    def test_responses_are_cached(self):
+        clock = FakeClock()
+        send = Mock(side_effect=lambda request: response())
+        pipeline = Pipeline([Cache(ttl=30, clock=clock)], transport=Mock(send=send))
+
+        first = pipeline(Request("get", "/", params={"page": 1}))
+        self.assertIs(pipeline(Request("get", "/", params={"page": 1})), first)
+        self.assertIsNot(pipeline(Request("get", "/", params={"page": 2})), first)
+        self.assertEqual(send.call_count, 2)
+
+        # Entries expire
+        clock.now = 31
+        self.assertIsNot(pipeline(Request("get", "/", params={"page": 1})), first)
+        self.assertEqual(send.call_count, 3)
+
+    def test_writes_invalidate(self):
+        send = Mock(side_effect=lambda request: response())
+        pipeline = Pipeline([Cache()], transport=Mock(send=send))
+
+        pipeline(Request("get", "/"))
+        pipeline(Request("post", "/"))
+        pipeline(Request("get", "/"))
+        self.assertEqual(send.call_count, 3)
+
+
+class MetricsTest(unittest.TestCase):
+    def test_requests_are_counted(self):
+        metrics = Metrics()
+        send = Mock(side_effect=[response(), requests.ConnectionError()])
+        pipeline = Pipeline([metrics], transport=Mock(send=send))
+
+        pipeline(Request("get", "/", resource="Invoices"))
+        with self.assertRaises(requests.ConnectionError):
+            pipeline(Request("get", "/", resource="Invoices"))
+
+        self.assertEqual(
+            metrics.requests,
+            {("Invoices", "get", 200): 1, ("Invoices", "get", None): 1},
+        )
+        self.assertIn(("Invoices", "get"), metrics.seconds)
+
+
+class HooksTest(unittest.TestCase):
+    def setUp(self):
+        self.credentials = OAuth2Credentials(
+            "client_id", "client_secret", token=TOKEN, tenant_id="12345"
+        )
+        self.events = []
+
+    def test_events(self):
+        xero = Xero(self.credentials, transport=FakeXero(contacts=5))
+        for hook in (xero.on_request, xero.on_response, xero.on_error):
+            hook(self.events.append)
+
+        xero.contacts.filter(page=1)
+        request, response = self.events
+        self.assertEqual((response.manager, response.method), ("Contacts", "filter"))
+        self.assertEqual(response.http_method, "get")
+        self.assertEqual(response.tenant_id, "12345")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.bytes_sent, 0)
+        self.assertGreater(response.bytes_received, 0)
+        self.assertLessEqual({"serialize", "network", "decode"}, set(response.timings))
+        # The request event is emitted before it is sent.
+        self.assertIsNone(request.status)
+        self.assertNotIn("network", request.timings)
+
+        self.events.clear()
+        with self.assertRaises(XeroNotFound):
+            xero.contacts.get("missing")
+        error = self.events[-1]
+        self.assertEqual((error.method, error.status), ("get", 404))
+        self.assertIsInstance(error.error, XeroNotFound)
+
+    def test_retry_event(self):
+        send = Mock(
+            side_effect=[make_response(503, "", {"Retry-After": "2"}), response()]
+        )
+        pipeline = Pipeline([Retry(sleep=Mock())], transport=Mock(send=send))
+        pipeline.on("retry", self.events.append)
+
+        pipeline(Request("get", "/"))
+
+        (event,) = self.events
+        self.assertEqual((event.status, event.attempt, event.delay), (503, 1, 2.0))
+
+    def test_unknown_event(self):
+        with self.assertRaises(ValueError):
+            Pipeline().on("redirect", print)
+
+
+class AdaptiveConcurrencyTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.latency = 1
+
+    def send(self, response):
+        def send(request):
+            self.clock.now += self.latency
+            return response
+
+        return send
+
+    def call(self, concurrency, result, times=1):
+        pipeline = Pipeline([concurrency], transport=Mock(send=self.send(result)))
+        for _ in range(times):
+            try:
+                pipeline(Request("get", "/", headers={"Xero-tenant-id": "a"}))
+            except XeroRateLimitExceeded:
+                pass
+
+    def test_increase(self):
+        """The limit grows while latency is steady, up to the maximum."""
+        concurrency = AdaptiveConcurrency(clock=self.clock)
+        self.call(concurrency, response(), times=2)
+        self.assertEqual(concurrency.limits["a"], 2.5)
+
+        self.call(concurrency, response(), times=20)
+        self.assertEqual(concurrency.limits["a"], 5)
+
+    def test_no_headroom(self):
+        concurrency = AdaptiveConcurrency(2, clock=self.clock)
+        self.call(concurrency, response(headers={"X-MinLimit-Remaining": "1"}))
+        self.assertEqual(concurrency.limits["a"], 2)
+
+    def test_decrease(self):
+        """The limit is halved by a 429 response, or a latency spike."""
+        concurrency = AdaptiveConcurrency(4, clock=self.clock)
+        self.call(concurrency, response(429))
+        self.assertEqual(concurrency.limits["a"], 2)
+
+        self.call(concurrency, response())
+        self.latency = 5
+        self.call(concurrency, response())
+        self.assertEqual(concurrency.limits["a"], 1.25)
+
+    def test_refused_locally(self):
+        """Calls refused before they are sent, such as by a deadline, aren't
+        a sign of overload, and leave the limit alone."""
+        concurrency = AdaptiveConcurrency(4, clock=self.clock)
+        with deadline(0):
+            for _ in range(3):
+                with self.assertRaises(XeroDeadlineExceeded):
+                    self.call(concurrency, response())
+        self.assertEqual(concurrency.limits["a"], 4)
+
+        # A connection error is a sign of overload.
+        pipeline = Pipeline(
+            [concurrency], transport=Mock(send=Mock(side_effect=requests.Timeout()))
+        )
+        with self.assertRaises(requests.Timeout):
+            pipeline(Request("get", "/", headers={"Xero-tenant-id": "a"}))
+        self.assertEqual(concurrency.limits["a"], 2)
+
+    def test_requests_in_flight_are_limited(self):
+        concurrency = AdaptiveConcurrency(2)
+        release = threading.Event()
+        in_flight = []
+        lock = threading.Lock()
+
+        def send(request):
+            with lock:
+                in_flight.append(request)
+            release.wait()
+            return response()
+
+        pipeline = Pipeline([concurrency], transport=Mock(send=send))
+        threads = [
+            threading.Thread(target=pipeline, args=(Request("get", "/"),))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        self.assertEqual(len(in_flight), 2)
+
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(in_flight), 3)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failures=2, reset=30, clock=self.clock)
+        self.transport = Mock()
+        self.pipeline = Pipeline([self.breaker], transport=self.transport)
+
+    def call(self, result, uri="https://api.xero.com/api.xro/2.0/Invoices"):
+        if isinstance(result, Exception):
+            self.transport.send = Mock(side_effect=result)
+        else:
+            self.transport.send = Mock(return_value=result)
+        self.pipeline(Request("get", uri))
+
+    def test_open(self):
+        """Consecutive failures open the breaker, which then fails fast."""
+        with self.assertRaises(XeroInternalError):
+            self.call(make_response(500))
+        self.call(make_response(200))
+        with self.assertRaises(requests.ConnectionError):
+            self.call(requests.ConnectionError())
+        self.assertEqual(self.breaker.states, {"api.xero.com": "closed"})
+        with self.assertRaises(XeroNotAvailable):
+            self.call(make_response(503))
+        self.assertEqual(self.breaker.states, {"api.xero.com": "open"})
+
+        self.clock.now += 10
+        with self.assertRaises(XeroCircuitOpen) as cm:
+            self.call(make_response(200))
+        self.assertIsInstance(cm.exception, XeroException)
+        self.assertEqual(cm.exception.host, "api.xero.com")
+        self.assertEqual(cm.exception.retry_after, 20)
+        self.transport.send.assert_not_called()
+
+        # Other hosts are unaffected.
+        self.call(make_response(200), uri="https://api.xero.com.au/")
+
+    def test_rate_limits(self):
+        """Rate limited responses aren't outages."""
+        for _ in range(3):
+            with self.assertRaises(XeroRateLimitExceeded):
+                self.call(make_response(429))
+            with self.assertRaises(XeroRateLimitExceeded):
+                self.call(
+                    make_response(
+                        503,
+                        "oauth_problem=rate%20limit%20exceeded"
+                        "&oauth_problem_advice=wait",
+                        {"X-Rate-Limit-Problem": "minute"},
+                    )
+                )
+        self.assertEqual(self.breaker.states, {"api.xero.com": "closed"})
+
+    def test_half_open(self):
+        """Once reset, a probe is let through; it closes the breaker if it
+        succeeds, and opens it again if it fails."""
+        for _ in range(2):
+            with self.assertRaises(XeroInternalError):
+                self.call(make_response(500))
+
+        self.clock.now += 30
+        self.assertEqual(self.breaker.states, {"api.xero.com": "half-open"})
+        with self.assertRaises(requests.Timeout):
+            self.call(requests.Timeout())
+        self.assertEqual(self.breaker.states, {"api.xero.com": "open"})
+
+        self.clock.now += 30
+        self.call(make_response(200))
+        self.assertEqual(self.breaker.states, {"api.xero.com": "closed"})
+
+    def test_probes(self):
+        """Only `probes` requests are let through while half open."""
+        breaker = CircuitBreaker(failures=1, clock=self.clock)
+        release = threading.Event()
+        sent = []
+
+        def send(request):
+            sent.append(request)
+            release.wait()
+            return make_response(200)
+
+        pipeline = Pipeline([breaker], transport=Mock(send=send))
+        self.transport.send = Mock(return_value=make_response(500))
+        with self.assertRaises(XeroInternalError):
+            Pipeline([breaker], transport=self.transport)(Request("get", "https://h/"))
+        self.clock.now += 30
+
+        self.addCleanup(release.set)
+        thread = threading.Thread(
+            target=pipeline, args=(Request("get", "https://h/"),), daemon=True
+        )
+        thread.start()
+        while not sent:
+            time.sleep(0.001)
+        with self.assertRaises(XeroCircuitOpen):
+            pipeline(Request("get", "https://h/"))
+        release.set()
+        thread.join()
+        self.assertEqual(breaker.states, {"h": "closed"})
@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from xero import Xero
+from xero.auth import OAuth2Credentials
+from xero.basemanager import XeroContent, XeroObject
+from xero.exceptions import XeroRateLimitExceeded
+from xero.fake import FakeXero
+from xero.ratelimit import RateLimitState
+from xero.transport import make_response
+
+TOKEN = {"access_token": "1234567890", "token_type": "Bearer"}
+
+
+class RateLimitStateTest(unittest.TestCase):
+    def test_from_headers(self):
+        state = RateLimitState.from_headers(
+            {
+                "X-MinLimit-Remaining": "0",
+                "X-DayLimit-Remaining": "4321",
+                "X-AppMinLimit-Remaining": "9000",
+                "Retry-After": "12",
+                "X-Rate-Limit-Problem": "minute",
+            }
+        )
+        self.assertEqual(
+            state, RateLimitState(0, 4321, 9000, retry_after=12, problem="minute")
+        )
+        self.assertTrue(state.exhausted)
+
+        state = RateLimitState.from_headers({"X-MinLimit-Remaining": "garbage"})
+        self.assertIsNone(state.minute_remaining)
+        self.assertFalse(state.exhausted)
+
+    def test_hash(self):
+        """Equal states hash equally, so they can be used in sets."""
+        states = {RateLimitState(1, 2, 3), RateLimitState(1, 2, 3), RateLimitState()}
+        self.assertEqual(len(states), 2)
+
+
+class RateLimitResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeXero(contacts=5, invoices=5)
+        self.xero = Xero(
+            OAuth2Credentials("id", "secret", token=TOKEN, tenant_id="a"),
+            transport=self.fake,
+        )
+
+    def test_results(self):
+        """Every kind of result carries the rate limit state."""
+        invoices = self.xero.invoices.all()
+        self.assertEqual(invoices.rate_limit.minute_remaining, 59)
+
+        # A response that isn't a list of objects
+        attachments = self.xero.invoices.get_attachments(invoices[0]["InvoiceID"])
+        self.assertIsInstance(attachments, XeroObject)
+        self.assertEqual(attachments.rate_limit.minute_remaining, 58)
+
+        stream = self.xero.invoices.filter(page=1, stream=True)
+        self.assertEqual(stream.rate_limit.day_remaining, 4997)
+        stream.close()
+
+    @patch("requests.get")
+    def test_content(self, mock_get):
+        mock_get.return_value = make_response(
+            200,
+            b"%PDF",
+            {"content-type": "application/pdf", "X-DayLimit-Remaining": "12"},
+        )
+        xero = Xero(Mock(base_url="https://api.xero.com", user_agent=None))
+
+        pdf = xero.invoices.get("1234", headers={"Accept": "application/pdf"})
+
+        self.assertIsInstance(pdf, XeroContent)
+        self.assertEqual(pdf, b"%PDF")
+        self.assertEqual(pdf.rate_limit.day_remaining, 12)
+
+    def test_exception(self):
+        self.fake.MINUTE_LIMIT = 1
+        self.xero.contacts.all()
+        with self.assertRaises(XeroRateLimitExceeded) as cm:
+            self.xero.contacts.all()
+
+        state = cm.exception.rate_limit
+        self.assertEqual((state.minute_remaining, state.problem), (0, "minute"))
+        self.assertGreater(state.retry_after, 0)
+
+    def test_collected_per_tenant(self):
+        other = OAuth2Credentials("id", "secret", token=TOKEN, tenant_id="b")
+        self.xero.contacts.all()
+        self.xero.contacts.all()
+        Xero(other, pipeline=self.xero._pipeline).contacts.all()
+
+        self.assertEqual(
+            {t: s.minute_remaining for t, s in self.xero.rate_limits.items()},
+            {"a": 58, "b": 59},
+        )
+        self.assertEqual(Xero(Mock()).rate_limits, {})
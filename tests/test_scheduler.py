@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+
+from xero.pipeline import Pipeline, Request
+from xero.scheduler import Scheduler, shared
+from xero.transport import make_response
+
+from .helpers import FakeClock
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sent = []
+        self.release = threading.Event()
+        self.threads = []
+        self.slow = {"b1"}
+        self.addCleanup(self.join)
+
+    def send(self, request):
+        self.sent.append(request.uri)
+        if request.uri == "a1":
+            self.release.wait()
+        # A minute passes while the request is in flight.
+        if request.uri in self.slow:
+            self.clock.now += 60
+        return make_response(200)
+
+    def call(self, pipeline, tenant_id, name, priority="default"):
+        """Make a call from another thread, and wait until it is queued or
+        sent."""
+        scheduler = pipeline.middleware[-1]
+        expected = scheduler.waiting + len(self.sent) + 1
+        request = Request(
+            "get", name, headers={"Xero-tenant-id": tenant_id}, priority=priority
+        )
+        thread = threading.Thread(target=pipeline, args=(request,), daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        while scheduler.waiting + len(self.sent) < expected:
+            time.sleep(0.001)
+
+    def join(self):
+        self.release.set()
+        for thread in self.threads:
+            thread.join()
+
+    def test_fair_between_tenants(self):
+        """While the app's allowance is used up, tenants take turns, however
+        many requests each has queued."""
+        names = ["a1", "a2", "a3", "a4", "b1", "b2"]
+        self.slow = set(names)
+        scheduler = Scheduler(app_per_minute=1, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+
+        for name in names:
+            self.call(pipeline, name[0], name)
+        self.assertEqual(self.sent, ["a1"])
+        self.join()
+
+        self.assertEqual(self.sent, ["a1", "b1", "a2", "b2", "a3", "a4"])
+
+    def test_weights(self):
+        names = ["a1", "a2", "a3", "b2", "b3", "b4", "b5"]
+        self.slow = set(names)
+        scheduler = Scheduler(app_per_minute=1, weights={"b": 2}, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+
+        for name in names:
+            self.call(pipeline, name[0], name)
+        self.join()
+
+        self.assertEqual(self.sent, ["a1", "b2", "b3", "a2", "b4", "b5", "a3"])
+
+    def test_minute_limit(self):
+        """A tenant that has used its minute allowance doesn't hold up the
+        others."""
+        scheduler = Scheduler(per_minute=1, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+        self.release.set()
+
+        self.call(pipeline, "a", "a0")
+        self.call(pipeline, "a", "a2")
+        self.assertEqual(scheduler.waiting, 1)
+        self.call(pipeline, "b", "b1")
+        self.join()
+
+        self.assertEqual(self.sent, ["a0", "b1", "a2"])
+
+    def test_app_limit(self):
+        scheduler = Scheduler(app_per_minute=1, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+        self.release.set()
+
+        self.call(pipeline, "a", "a0")
+        self.call(pipeline, "b", "b1")
+        self.assertEqual(scheduler.waiting, 1)
+        self.clock.now += 60
+        self.call(pipeline, "a", "a2")
+        self.join()
+
+        self.assertEqual(self.sent, ["a0", "b1", "a2"])
+
+    def test_priority(self):
+        """Queued interactive requests go before queued background requests,
+        whichever tenant they are for."""
+        self.slow = {"a1", "a2", "a3", "b1", "b2"}
+        scheduler = Scheduler(concurrent=1, app_per_minute=1, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+
+        self.call(pipeline, "a", "a1")
+        self.call(pipeline, "a", "a2", "background")
+        self.call(pipeline, "b", "b1", "background")
+        self.call(pipeline, "a", "a3")
+        self.call(pipeline, "b", "b2", "interactive")
+        self.join()
+
+        self.assertEqual(self.sent, ["a1", "b2", "a3", "b1", "a2"])
+
+    def test_reserve(self):
+        """Only interactive requests can use the reserved allowance."""
+        self.slow = {"a1"}
+        scheduler = Scheduler(per_minute=2, reserve=1, clock=self.clock)
+        pipeline = Pipeline([scheduler], transport=Mock(send=self.send))
+        self.release.set()
+
+        self.call(pipeline, "a", "a0", "background")
+        self.call(pipeline, "a", "a2", "background")
+        self.assertEqual(scheduler.waiting, 1)
+        # The background request waits for the next minute.
+        self.call(pipeline, "a", "a1", "interactive")
+        self.join()
+
+        self.assertEqual(self.sent, ["a0", "a1", "a2"])
+
+    def test_shared(self):
+        self.assertIs(shared(), shared())
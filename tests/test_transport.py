@@ -0,0 +1,69 @@
+import asyncio
+import subprocess
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from xero.pipeline import Request
+from xero.transport import CoroutineTransport, RequestsTransport, make_response
+
+
+class RequestsTransportTest(unittest.TestCase):
+    @patch("requests.get")
+    def test_send(self, r_get):
+        request = Request("get", "http://example.com", params={"page": 1}, timeout=5)
+
+        self.assertIs(RequestsTransport().send(request), r_get.return_value)
+        self.assertEqual(r_get.call_args[0], ("http://example.com",))
+        self.assertEqual(r_get.call_args[1]["params"], {"page": 1})
+        self.assertEqual(r_get.call_args[1]["timeout"], 5)
+        self.assertNotIn("files", r_get.call_args[1])
+
+    def test_session(self):
+        """Requests are sent with the session, if one is provided."""
+        session = Mock()
+        transport = RequestsTransport(session)
+        transport.send(Request("post", "http://example.com", files={"a": "b"}))
+
+        self.assertEqual(session.post.call_args[1]["files"], {"a": "b"})
+        transport.close()
+        session.close.assert_called_once_with()
+
+
+class CoroutineTransportTest(unittest.TestCase):
+    def setUp(self):
+        async def send(request):
+            await asyncio.sleep(0)
+            return make_response(200, request.uri, {"Content-Type": "text/plain"})
+
+        self.transport = CoroutineTransport(send)
+        self.addCleanup(self.transport.close)
+
+    def test_send(self):
+        response = self.transport.send(Request("get", "http://example.com"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, "http://example.com")
+
+    def test_send_async(self):
+        async def main():
+            return await self.transport.send_async(Request("get", "http://a.com"))
+
+        self.assertEqual(asyncio.run(main()).text, "http://a.com")
+
+    def test_lazy_import(self):
+        """Importing xero doesn't import asyncio, which is slow to import."""
+        code = "import sys, xero; print('asyncio' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code], text=True)
+
+        self.assertEqual(output.strip(), "False")
+
+
+class MakeResponseTest(unittest.TestCase):
+    def test_make_response(self):
+        response = make_response(200, '{"a": 1}', {"content-type": "application/json"})
+
+        self.assertEqual(response.json(), {"a": 1})
+        self.assertEqual(response.headers["Content-Type"], "application/json")
+        self.assertEqual(b"".join(response.iter_content(3)), b'{"a": 1}')
+        response.close()
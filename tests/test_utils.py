@@ -99,6 +99,52 @@ class UtilsTest(unittest.TestCase):
         # Weird Date output from Xero
         self.assertEqual(xero.utils.parse_date("/Date(0+0000)/"), None)
 
+        # Negative offsets apply signed hours, and positive minutes
+        self.assertEqual(
+            xero.utils.parse_date("/Date(1430913600000-0530)/"),
+            datetime.datetime(2015, 5, 6, 7, 30, tzinfo=tzinfo),
+        )
+
+        # Out of range values aren't dates
+        self.assertEqual(xero.utils.parse_date("0000-00-00T00:00:00"), None)
+
+        # Dates can be forced to datetimes
+        self.assertEqual(
+            xero.utils.parse_date("2015-04-29T00:00:00", force_datetime=True),
+            datetime.datetime(2015, 4, 29),
+        )
+
+    def test_parse_date_cache(self):
+        """Repeated date strings are parsed once; other strings aren't cached."""
+        xero.utils._parse_date.cache_clear()
+
+        first = xero.utils.parse_date("/Date(1439204133355)/")
+        self.assertIs(xero.utils.parse_date("/Date(1439204133355)/"), first)
+        xero.utils.parse_date("not a date")
+
+        info = xero.utils._parse_date.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_interning_object_hook(self):
+        """The interning hook shares repeated keys and values, and parses dates."""
+        hook = xero.utils.make_object_hook(["Status"])
+
+        # Build strings at runtime, so they aren't shared constants
+        first = hook({"".join(["Sta", "tus"]): "".join(["PA", "ID"]), "Name": "A"})
+        second = hook({"".join(["Sta", "tus"]): "".join(["PA", "ID"]), "Name": "B"})
+
+        self.assertEqual(first, {"Status": "PAID", "Name": "A"})
+        self.assertIs(first["Status"], second["Status"])
+        self.assertIs(list(first)[0], list(second)[0])
+
+        # Dates are still parsed
+        self.assertEqual(
+            hook({"Date": "2015-04-29T00:00:00"}), {"Date": datetime.date(2015, 4, 29)}
+        )
+
+        # Without any fields to intern, the plain hook is used
+        self.assertIs(xero.utils.make_object_hook(()), xero.utils.json_load_object_hook)
+
     def test_generate_idempotency_key(self):
         key = xero.utils.generate_idempotency_key()
 